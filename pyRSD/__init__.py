@@ -29,16 +29,33 @@ on_rtd = os.environ.get('READTHEDOCS') == 'True'
 
 # every module uses numpy
 import numpy
+import importlib
 
-try:
-    from pyRSD import pygcl
-except Exception as msg:
-    if on_rtd:
-        pygcl = None
-    else:
-        import traceback
-        tb = traceback.format_exc()
-        raise ImportError("Cannot use package without pygcl\n%s" %tb)
+# the subpackages, which are imported on first access
+_submodules = ['data', 'gcl', 'pygcl', 'rsd', 'rsdfit', 'quickstart']
+
+def __getattr__(name):
+    """
+    Import the subpackages lazily (PEP 562), such that ``import pyRSD``
+    does not load the ``gcl`` extension and the model classes
+    """
+    if name not in _submodules:
+        raise AttributeError("module '%s' has no attribute '%s'" %(__name__, name))
+
+    # the gcl extension is always initialized through pygcl
+    if name in ['gcl', 'pygcl']:
+        try:
+            importlib.import_module('.pygcl', __name__)
+        except Exception:
+            if on_rtd:
+                return None
+            import traceback
+            tb = traceback.format_exc()
+            raise ImportError("Cannot use package without pygcl\n%s" %tb)
+    return importlib.import_module('.' + name, __name__)
+
+def __dir__():
+    return sorted(list(globals()) + _submodules)
 
 def get_data_files():
     """
@@ -57,20 +74,4 @@ def get_data_files():
     )
     return r
 
-def _init():
-    r = get_data_files()
-
-    # setting static variables with swig is tricky.
-    # see http://www.swig.org/Doc3.0/SWIGDocumentation.html#Python_nn20
-
-    from .gcl import cvar
-
-    cvar.ClassEngine_Alpha_inf_hyrec_file = r['Alpha_inf_hyrec_file']
-    cvar.ClassEngine_R_inf_hyrec_file = r['R_inf_hyrec_file']
-    cvar.ClassEngine_two_photon_tables_hyrec_file = r['two_photon_tables_hyrec_file']
-    cvar.ClassEngine_sBBN_file = r['sBBN_file']
-
-if pygcl is not None:
-    _init(); del _init
-
 from .version import __version__
@@ -4,7 +4,6 @@ Simulation data for dark matter power spectra at 3 redshifts, z = 0, 0.509, 0.98
 For more, see the detailed description of these simulations in Okumura et al. 2012.
 """
 from .. import data_dir, numpy as np, os as _os
-import pandas as pd
 
 __all__ = ['load',
            'P00_mu0_z_0_000',
@@ -341,6 +340,7 @@ def Pmu2_correction_data():
     as measured from the runPB simulations
     """
     fname = _os.path.join(data_dir, 'simulation_fits/Pmu2_residual_data.pickle')
+    import pandas as pd
     return pd.read_pickle(fname)
 
 def Pmu4_correction_data():
@@ -350,6 +350,7 @@ def Pmu4_correction_data():
     as measured from the runPB simulations
     """
     fname = _os.path.join(data_dir, 'simulation_fits/Pmu4_residual_data.pickle')
+    import pandas as pd
     return pd.read_pickle(fname)
 
 def nonlinear_bias_data(kind, name):
@@ -366,6 +367,7 @@ def vlah_nonlinear_bias_fits():
     Return the fits for the the Vlah et al. nonlinear biasing
     """
     fname = _os.path.join(data_dir, 'simulation_fits/nonlinear_biases_fits_runPB.json')
+    import pandas as pd
     return pd.read_json(fname)
 
 def velocity_dispersion_data():
@@ -375,6 +377,7 @@ def velocity_dispersion_data():
     velocity dispersion, as measured from the runPB simulations
     """
     fname = _os.path.join(data_dir, 'simulation_fits/runPB_vel_disp.pickle')
+    import pandas as pd
     return pd.read_pickle(fname)
 
 def auto_stochasticity_data():
@@ -384,6 +387,7 @@ def auto_stochasticity_data():
     as measured from the runPB simulations
     """
     fname = _os.path.join(data_dir, 'simulation_fits/auto_stochasticity_runPB.pickle')
+    import pandas as pd
     return pd.read_pickle(fname)
 
 def cross_stochasticity_data():
@@ -393,4 +397,5 @@ def cross_stochasticity_data():
     as measured from the runPB simulations
     """
     fname = _os.path.join(data_dir, 'simulation_fits/cross_stochasticity_runPB.pickle')
+    import pandas as pd
     return pd.read_pickle(fname)
@@ -1,6 +1,9 @@
 from pyRSD import data_dir
 import os
 from six import add_metaclass, string_types
+from collections import OrderedDict
+import threading
+import hashlib
 
 from pyRSD import gcl
 from .gcl import ClassEngine
@@ -18,6 +21,22 @@ from .gcl import ComputeXiLM, compute_xilm_fftlog as ComputeXiLM_fftlog
 from .gcl import IntegrationMethods
 from .gcl import SimpsIntegrate, TrapzIntegrate
 
+def _init():
+    from pyRSD import get_data_files
+    r = get_data_files()
+
+    # setting static variables with swig is tricky.
+    # see http://www.swig.org/Doc3.0/SWIGDocumentation.html#Python_nn20
+
+    from .gcl import cvar
+
+    cvar.ClassEngine_Alpha_inf_hyrec_file = r['Alpha_inf_hyrec_file']
+    cvar.ClassEngine_R_inf_hyrec_file = r['R_inf_hyrec_file']
+    cvar.ClassEngine_two_photon_tables_hyrec_file = r['two_photon_tables_hyrec_file']
+    cvar.ClassEngine_sBBN_file = r['sBBN_file']
+
+_init(); del _init
+
 class DocFixer(type):
 
     def __new__(cls, name, bases, dct):
@@ -43,6 +62,51 @@ def FindFilename(fname):
         fname = fname_
     return fname
 
+#-------------------------------------------------------------------------------
+# cache of CLASS outputs
+
+# whether :func:`pyRSD.rsd.cosmology.Cosmology.to_class` uses the cache by
+# default, which can be enabled by setting ``PYRSD_CLASS_CACHE=1``
+CLASS_CACHE = os.environ.get('PYRSD_CLASS_CACHE', '0') == '1'
+
+# the maximum number of cosmologies held in the cache
+CLASS_CACHE_SIZE = int(os.environ.get('PYRSD_CLASS_CACHE_SIZE', 8))
+
+_class_outputs = OrderedDict()
+_class_lock = threading.Lock()
+
+def class_params_key(pars, *args):
+    """
+    Return a hash key identifying the CLASS parameters ``pars``, and
+    any additional arguments
+
+    The parameters are normalized, such that the key does not depend on
+    their order, the string formatting of numbers, or the outputs that
+    are always added by :class:`Cosmology`
+    """
+    items = []
+    for k, v in dict(pars).items():
+        k = str(k).strip()
+        if k == 'output':
+            v = ",".join(sorted(set(o.strip() for o in str(v).split(',')) | {'dTk', 'mPk'}))
+        else:
+            try:
+                v = repr(float(v))
+            except (TypeError, ValueError):
+                v = str(v).strip()
+        items.append((k, v))
+    if 'output' not in dict(items):
+        items.append(('output', 'dTk,mPk'))
+    key = repr(sorted(items)) + repr([repr(float(a)) if a is not None else None for a in args])
+    return hashlib.sha1(key.encode()).hexdigest()
+
+def clear_class_cache():
+    """
+    Remove all cosmologies from the cache of CLASS outputs
+    """
+    with _class_lock:
+        _class_outputs.clear()
+
 #-------------------------------------------------------------------------------
 # Cosmology
 @add_metaclass(DocFixer)
@@ -67,6 +131,62 @@ class Cosmology(gcl.Cosmology, PickalableSWIG):
         args[0] = ClassParams.from_dict(args[0])
         self.__init__(*state['args'])
 
+    def __reduce__(self):
+        return (_restore_cosmology, (self.__getstate__()['args'], self.read_only))
+
+    # whether the object is shared by the cache of CLASS outputs, and
+    # cannot be modified in place
+    read_only = False
+
+    @classmethod
+    def cached(cls, pars, tf=transfers.CLASS, sigma8=None):
+        """
+        Return the Cosmology for the CLASS parameters ``pars`` and the
+        transfer function ``tf``, only running CLASS if it is not in the
+        cache of CLASS outputs
+
+        The cache is keyed by the normalized parameters, and holds the
+        :data:`CLASS_CACHE_SIZE` most recently used cosmologies, which
+        can be set with the ``PYRSD_CLASS_CACHE_SIZE`` environment variable.
+
+        .. note::
+            The returned object is shared, and is read-only; the methods that
+            modify it in place raise a :class:`ValueError`. Use :func:`clone`
+            to get a copy that can be modified
+
+        Parameters
+        ----------
+        pars : ClassParams, dict
+            the CLASS parameters
+        tf : int, optional
+            the transfer function type, see ``transfers``
+        sigma8 : float, optional
+            if not `None`, normalize the power spectrum to this value;
+            otherwise, the CLASS value is used
+        """
+        if isinstance(pars, dict):
+            pars = ClassParams.from_dict(dict(pars))
+        key = class_params_key(pars, tf, sigma8)
+
+        with _class_lock:
+            toret = _class_outputs.pop(key, None)
+            if toret is not None:
+                _class_outputs[key] = toret
+                return toret
+
+        # run CLASS, outside of the lock
+        toret = cls(pars, tf)
+        if sigma8 is not None:
+            toret.SetSigma8(sigma8)
+        toret.read_only = True
+
+        with _class_lock:
+            if CLASS_CACHE_SIZE > 0:
+                toret = _class_outputs.setdefault(key, toret)
+                while len(_class_outputs) > CLASS_CACHE_SIZE:
+                    _class_outputs.popitem(last=False)
+        return toret
+
     def clone(self, tf=None):
         """
         Copy the Cosmology object, optionally changing the Transfer Function
@@ -94,6 +214,34 @@ class Cosmology(gcl.Cosmology, PickalableSWIG):
             if callable(f): return f()
         raise KeyError("Sorry, cannot return parameter '%s' in dict-like fashion" %key)
 
+def _read_only_method(name):
+    """
+    Return the method ``name`` of ``gcl.Cosmology``, which modifies the
+    object in place, raising an exception for read-only objects
+    """
+    f = getattr(gcl.Cosmology, name)
+    def method(self, *args, **kwargs):
+        if self.read_only:
+            msg = "cannot call '%s' on a read-only Cosmology, shared by the cache of CLASS outputs; " %name
+            raise ValueError(msg + "use clone() to get a copy that can be modified")
+        return f(self, *args, **kwargs)
+    method.__name__ = name
+    method.__doc__ = f.__doc__
+    return method
+
+for name in ['SetTransferFunction', 'NormalizeTransferFunction', 'SetSigma8', 'update', 'compute', 'Clean']:
+    setattr(Cosmology, name, _read_only_method(name))
+del name
+
+def _restore_cosmology(args, read_only=False):
+    """
+    Unpickle a :class:`Cosmology`; read-only objects are restored from the
+    cache of CLASS outputs, and the others are rebuilt as new objects
+    """
+    if read_only and args[1] != transfers.FromArrays:
+        return Cosmology.cached(args[0], args[1], args[2])
+    return Cosmology(ClassParams.from_dict(args[0]), *args[1:])
+
 #-------------------------------------------------------------------------------
 # CorrelationFunction
 @add_metaclass(DocFixer)
@@ -3,29 +3,68 @@ from __future__ import print_function
 INTERP_KMIN = 5e-6
 INTERP_KMAX = 1.0
 
-# global AP effect lock
+# AP effect lock
 import threading
-APLock = threading.Lock()
 
-# compute the RSD model version with git string
-from ..extern.astropy_helpers.git_helpers import get_git_devstr
-from .. import pkg_dir
+class _APLock(threading.local):
+    """
+    The lock marking that the AP effect was already applied, which is
+    held separately by each thread, such that threads evaluating
+    different models do not skip the AP distortion of each other
+    """
+    depth = 0
+
+    def locked(self):
+        return self.depth > 0
+
+    def __enter__(self):
+        self.depth += 1
+        return self
+
+    def __exit__(self, *exc):
+        self.depth -= 1
+
+APLock = _APLock()
 
-# compute the version
+# the RSD model version, with the git hash written at build time
 __version__ = '0.3.1'
-_githash = get_git_devstr(sha=True, show_warning=False, path=pkg_dir)[:7]
+try:
+    from ._githash import githash as _githash
+except ImportError:
+    _githash = ''
 if _githash:
     __version__ += ".dev." + _githash
 
-# import model classes
-from .power.dm     import DarkMatterSpectrum
-from .power.biased import BiasedSpectrum, HaloSpectrum
-from .power.gal    import GalaxySpectrum
-from .power.qso    import QuasarSpectrum
+# the model classes, imported on first access
+_lazy_attrs = {'DarkMatterSpectrum': '.power.dm',
+               'BiasedSpectrum': '.power.biased',
+               'HaloSpectrum': '.power.biased',
+               'GalaxySpectrum': '.power.gal',
+               'QuasarSpectrum': '.power.qso',
+               'ExtrapolatedPowerSpectrum': '.power_extrapolator',
+               'SmoothedXiMultipoles': '.correlation',
+               'XiMultipoleTransform': '.correlation'}
 
-from . import transfers
-from .power_extrapolator import ExtrapolatedPowerSpectrum
-from .correlation import SmoothedXiMultipoles
+# the submodules, imported on first access
+_submodules = ['cosmology', 'correlation', 'hzpt', 'power', 'simulation', 'snapshot', 'tools', 'transfers']
+
+def __getattr__(name):
+    """
+    Import the model classes and submodules lazily (PEP 562), such that
+    ``import pyRSD.rsd`` does not load the ``gcl`` extension and the
+    simulation data
+    """
+    import importlib
+    if name in _lazy_attrs:
+        toret = getattr(importlib.import_module(_lazy_attrs[name], __name__), name)
+        globals()[name] = toret
+        return toret
+    if name in _submodules:
+        return importlib.import_module('.' + name, __name__)
+    raise AttributeError("module '%s' has no attribute '%s'" %(__name__, name))
+
+def __dir__():
+    return sorted(list(globals()) + list(_lazy_attrs) + _submodules)
 
 def print_version():
     """
@@ -46,10 +85,16 @@ class OutdatedModelWarning(UserWarning):
 
 def load_model(filename, show_warning=True):
     """
-    Load a model from a npy
+    Load a model from a npy file, or from a snapshot directory
+    (see :mod:`pyRSD.rsd.snapshot`)
     """
     from .. import os, numpy
 
+    # load a snapshot
+    if os.path.isdir(filename):
+        from .snapshot import load_snapshot
+        return load_snapshot(filename, show_warning=show_warning)
+
     # check the filename extension
     _, ext = os.path.splitext(filename)
     desired_ext = os.path.extsep + 'npy'
@@ -1,10 +1,14 @@
 from .. import numpy
-from ._interpolate import InterpolationDomainError
+from ._interpolate import InterpolationDomainError, MultiSpline
 
 import functools
 from collections import OrderedDict
+import contextlib
 import inspect
+import itertools
 import fnmatch
+import time
+import json
 from six import add_metaclass, PY3, string_types
 
 try:
@@ -14,6 +18,10 @@ except ImportError:
 
 import types
 
+# the source of cache versions, shared by all instances such that
+# a version number is never reused
+_versions = itertools.count(1)
+
 if not PY3:
     def _pickle_method(m):
         if m.im_self is None:
@@ -177,12 +185,239 @@ class CacheSchema(type):
         for name in cls._cachemap:
             invert_cachemap(name, cls._cachemap[name])
 
+class CacheStatistics(object):
+    """
+    Class to record the cache statistics of a :class:`Cache` instance
+
+    This tracks, for each cached node (i.e., ``cached_property`` and
+    ``interpolated_function`` attributes), the number of cache hits and
+    misses and the wall time spent recomputing the node, and for each
+    parameter, the number of times its value changed and the cached nodes
+    that were invalidated as a result.
+
+    Recompute times are recorded as both the inclusive time and the
+    exclusive (``self``) time, which excludes the time spent recomputing
+    other cached nodes.
+
+    Parameters
+    ----------
+    cls : type
+        the :class:`Cache` subclass whose dependency graph is tracked
+    """
+    def __init__(self, cls):
+        self.cls = cls
+        self.reset()
+
+    def reset(self):
+        """
+        Reset all statistics
+        """
+        self.nodes = {}
+        self.invalidations = {}
+        self._stack = []
+
+    def _node(self, name):
+        if name not in self.nodes:
+            self.nodes[name] = {'hits':0, 'misses':0, 'time':0., 'self_time':0.}
+        return self.nodes[name]
+
+    def hit(self, name):
+        """
+        Record a cache hit for ``name``
+        """
+        self._node(name)['hits'] += 1
+
+    def compute(self, name, f, *args):
+        """
+        Record a cache miss for ``name``, timing the evaluation of ``f(*args)``
+        """
+        node = self._node(name)
+        node['misses'] += 1
+
+        self._stack.append(0.)
+        start = time.perf_counter()
+        try:
+            return f(*args)
+        finally:
+            elapsed = time.perf_counter() - start
+            children = self._stack.pop()
+            node['time'] += elapsed
+            node['self_time'] += elapsed - children
+            if len(self._stack):
+                self._stack[-1] += elapsed
+
+    def invalidate(self, name, popped):
+        """
+        Record that the parameter ``name`` changed, invalidating
+        the cached nodes in ``popped``
+        """
+        if name not in self.invalidations:
+            self.invalidations[name] = {'changes':0, 'fanout':0, 'nodes':{}}
+        d = self.invalidations[name]
+        d['changes'] += 1
+        d['fanout'] += len(popped)
+        for dep in popped:
+            d['nodes'][dep] = d['nodes'].get(dep, 0) + 1
+
+    def summary(self, sort_by='self_time'):
+        """
+        Return a string summarizing the statistics, with nodes sorted by
+        the ``sort_by`` column in decreasing order
+        """
+        lines = ["%-35s %8s %8s %12s %12s" %('node', 'hits', 'misses', 'time [s]', 'self [s]')]
+        nodes = sorted(self.nodes.items(), key=lambda x: x[1][sort_by], reverse=True)
+        for name, d in nodes:
+            lines.append("%-35s %8d %8d %12.4g %12.4g" %(name, d['hits'], d['misses'], d['time'], d['self_time']))
+
+        lines.append("")
+        lines.append("%-35s %8s %8s" %('parameter', 'changes', 'fanout'))
+        params = sorted(self.invalidations.items(), key=lambda x: x[1]['fanout'], reverse=True)
+        for name, d in params:
+            lines.append("%-35s %8d %8d" %(name, d['changes'], d['fanout']))
+        return "\n".join(lines)
+
+    def to_dict(self):
+        """
+        Return the dependency graph, with the statistics attached, as a
+        dictionary with ``nodes`` and ``edges`` keys
+        """
+        nodes = []
+        for name in sorted(self.cls._param_names):
+            d = {'name':name, 'type':'parameter'}
+            d.update(self.invalidations.get(name, {'changes':0, 'fanout':0, 'nodes':{}}))
+            nodes.append(d)
+        for name in sorted(self.cls._cachemap):
+            d = {'name':name, 'type':'cached'}
+            d.update(self.nodes.get(name, {'hits':0, 'misses':0, 'time':0., 'self_time':0.}))
+            nodes.append(d)
+
+        edges = []
+        for name, parents in self.cls._cachemap.items():
+            for parent in parents:
+                edges.append({'source':parent, 'target':name})
+
+        return {'class':self.cls.__name__, 'nodes':nodes, 'edges':edges}
+
+    def to_json(self, filename=None):
+        """
+        Export the dependency graph with statistics to JSON, returning the
+        string if no ``filename`` is provided
+        """
+        toret = json.dumps(self.to_dict(), indent=2)
+        if filename is None:
+            return toret
+        with open(filename, 'w') as ff:
+            ff.write(toret)
+
+    def to_dot(self, filename=None):
+        """
+        Export the dependency graph with statistics in the DOT format of
+        graphviz, returning the string if no ``filename`` is provided
+
+        Only nodes that were recomputed or invalidated are included.
+        """
+        active = set(self.nodes) | set(self.invalidations)
+        for d in self.invalidations.values():
+            active |= set(d['nodes'])
+
+        lines = ["digraph %s {" %self.cls.__name__, "    rankdir=LR;"]
+        for name in sorted(active):
+            if name in self.cls._param_names:
+                d = self.invalidations.get(name, {'changes':0, 'fanout':0})
+                label = "%s\\nchanges=%d fanout=%d" %(name, d['changes'], d['fanout'])
+                lines.append('    "%s" [shape=box, label="%s"];' %(name, label))
+            else:
+                d = self.nodes.get(name, {'hits':0, 'misses':0, 'self_time':0.})
+                label = "%s\\nhits=%d misses=%d\\nself=%.3gs" %(name, d['hits'], d['misses'], d['self_time'])
+                lines.append('    "%s" [label="%s"];' %(name, label))
+
+        for name, parents in self.cls._cachemap.items():
+            for parent in parents:
+                if name in active and parent in active:
+                    lines.append('    "%s" -> "%s";' %(parent, name))
+        lines.append("}")
+
+        toret = "\n".join(lines)
+        if filename is None:
+            return toret
+        with open(filename, 'w') as ff:
+            ff.write(toret)
+
+class MemoCache(object):
+    """
+    A bounded, least-recently-used memo of function return values, keyed
+    by the identity of the arguments and the cache version of a model
+
+    Arrays are keyed by their ``id``, rather than by hashing their contents,
+    and each result is stored with references to its arguments, such that
+    the identity of a memoized argument cannot be reused. The arguments are
+    assumed not to be modified in place while memoized.
+
+    Parameters
+    ----------
+    maxsize : int, optional
+        the maximum number of return values to store
+    """
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def clear(self):
+        """
+        Remove all stored values and reset the hit and miss counters
+        """
+        self._data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def info(self):
+        """
+        Return a dictionary with the number of hits and misses,
+        and the current and maximum size
+        """
+        return {'hits':self.hits, 'misses':self.misses, 'maxsize':self.maxsize, 'currsize':len(self)}
+
+    @staticmethod
+    def _key(a):
+        if a is None or numpy.isscalar(a):
+            return a
+        return id(a)
+
+    def evaluate(self, name, version, f, *args, **kws):
+        """
+        Return ``f(*args, **kws)``, memoized with the key ``name``,
+        the cache ``version``, and the identity of the arguments
+        """
+        key = (name, version) + tuple(self._key(a) for a in args)
+        key += tuple((k, self._key(kws[k])) for k in sorted(kws))
+
+        # move hits to the end, i.e., most recently used
+        if key in self._data:
+            self.hits += 1
+            entry = self._data.pop(key)
+            self._data[key] = entry
+            return entry[1]
+
+        self.misses += 1
+        val = f(*args, **kws)
+        self._data[key] = ((args, kws), val)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+        return val
+
 @add_metaclass(CacheSchema)
 class Cache(object):
     """
     The main class to do handle caching of parameters; this is the
     class that should serve as the base class
     """
+    _cache_stats = None
+    _cache_version = 0
+    _memo = None
+
     def __new__(cls, *args, **kwargs):
         obj = object.__new__(cls)
         obj._cache = {}
@@ -191,6 +426,86 @@ class Cache(object):
     def __init__(self, *args, **kwargs):
         super(Cache, self).__init__(*args, **kwargs)
 
+    @property
+    def cache_stats(self):
+        """
+        The :class:`CacheStatistics` recording the cache usage, or ``None``
+        if the statistics are not enabled
+        """
+        return self._cache_stats
+
+    def enable_cache_stats(self):
+        """
+        Start recording the per-node cache statistics, returning the
+        :class:`CacheStatistics` object
+        """
+        if self._cache_stats is None:
+            self._cache_stats = CacheStatistics(self.__class__)
+        return self._cache_stats
+
+    def disable_cache_stats(self):
+        """
+        Stop recording the cache statistics
+        """
+        self.__dict__.pop('_cache_stats', None)
+
+    @property
+    def cache_version(self):
+        """
+        The version of the cached state, which changes whenever a parameter
+        changes value; see :class:`MemoCache`
+        """
+        return self._cache_version
+
+    def bump_cache_version(self):
+        """
+        Start a new cache version, such that previously memoized
+        return values are no longer used
+        """
+        self._cache_version = next(_versions)
+
+    @contextlib.contextmanager
+    def use_cache(self, maxsize=128):
+        """
+        Memoize repeated calls to functions decorated with
+        :func:`~pyRSD.rsd.tools.cacheable`, assuming the input `k`
+        and `mu` arrays are not modified in place
+
+        Return values are keyed by the identity of the input arrays and the
+        cache version of this model, which changes whenever a parameter
+        changes. This yields the :class:`MemoCache`, which records the
+        number of hits and misses.
+
+        Parameters
+        ----------
+        maxsize : int, optional
+            the maximum number of memoized return values
+        """
+        # nested contexts share the outer memo
+        if self._memo is not None:
+            yield self._memo
+            return
+
+        self._memo = MemoCache(maxsize=maxsize)
+        try:
+            yield self._memo
+        finally:
+            del self._memo
+
+    @contextlib.contextmanager
+    def track_cache(self):
+        """
+        Context manager that records fresh cache statistics for the code
+        executed inside the context, yielding the :class:`CacheStatistics`
+        """
+        enabled = self._cache_stats is not None
+        stats = self.enable_cache_stats()
+        stats.reset()
+        try:
+            yield stats
+        finally:
+            if not enabled: self.disable_cache_stats()
+
 def obj_eq(new_val, old_val):
     """
     Test the equality of an old and new value
@@ -232,10 +547,16 @@ def parameter(f, **kwargs):
         if doset or not obj_eq(val, old_val):
             setattr(self, _name, val)
 
+            # record the invalidated cache
+            stats = getattr(self, '_cache_stats', None)
+            if stats is not None:
+                stats.invalidate(name, [dep for dep in deps if dep in self._cache])
+
             # clear the cache of any parameters that depend
             # on this attribute
             for dep in deps:
                 self._cache.pop(dep, None)
+            self._cache_version = next(_versions)
         return val
 
     @functools.wraps(f)
@@ -269,6 +590,11 @@ def cached_property(*parents, **kws):
     """
     Decorator to represent a model parameter will be cached
     and automatically updated if any of its dependencies change
+
+    If the name is in the ``_shared_names`` of the instance, the value is
+    also looked up in, and saved to, the dictionary returned by the
+    ``_shared_cache(name)`` method of the instance, which is shared
+    with other instances
     """
     _lru_cache = kws.pop('lru_cache', False)
     maxsize = kws.pop('maxsize', 128)
@@ -284,11 +610,20 @@ def cached_property(*parents, **kws):
                 return self._cache_overrides[name]
 
             # add to cache
+            stats = self._cache_stats
             if name not in self._cache:
-                val = f(self)
-                if _lru_cache and callable(val):
-                    val = lru_cache(maxsize=maxsize)(val)
+                shared = self._shared_cache(name) if name in getattr(self, '_shared_names', ()) else None
+                if shared is not None and name in shared:
+                    val = shared[name]
+                    if stats is not None: stats.hit(name)
+                else:
+                    val = f(self) if stats is None else stats.compute(name, f, self)
+                    if _lru_cache and callable(val):
+                        val = lru_cache(maxsize=maxsize)(val)
+                    if shared is not None: shared[name] = val
                 self._cache[name] = val
+            elif stats is not None:
+                stats.hit(name)
 
             # return the cached value
             return self._cache[name]
@@ -311,6 +646,9 @@ class InterpolatedFunction(object):
     A callable class (as a function of wavenumber) that will
     either evaluate a spline or evaluate the underlying function,
     if a domain error occurs
+
+    If the spline is a :class:`MultiSpline` (or a list of splines),
+    calling returns the list of the values of each function
     """
     def __init__(self, spline, name):
         self.spline   = spline
@@ -346,6 +684,12 @@ def interpolated_function(*parents, **kwargs):
     A decorator that represents a cached property that
     is a function of `k`. The cached property that is stored
     is a spline that predicts the function as a function of `k`
+
+    If the function returns a tuple, the functions are stored
+    as a single :class:`MultiSpline`
+
+    As for :func:`cached_property`, the spline is shared with other instances
+    if the name is in the ``_shared_names`` of the instance
     """
     def wrapper(f):
         name = f.__name__
@@ -361,21 +705,35 @@ def interpolated_function(*parents, **kwargs):
                 return f(self, *args)
 
             # the spline isn't in the cache, make the spline
+            stats = self._cache_stats
             if name not in self._cache:
 
+                # use the spline shared with other instances
+                shared = self._shared_cache(name) if name in getattr(self, '_shared_names', ()) else None
+                if shared is not None and name in shared:
+                    self._cache[name] = shared[name]
+                    if stats is not None: stats.hit(name)
+                    return self._cache[name](*args, **kws)
+
                 # make the spline
                 interp_domain = getattr(self, kwargs.get("interp", "k_interp"))
-                val = f(self, interp_domain)
+                if stats is None:
+                    val = f(self, interp_domain)
+                else:
+                    val = stats.compute(name, f, self, interp_domain)
                 spline_kwargs = getattr(self, 'spline_kwargs', {})
 
-                # tuple of splines
+                # tuple of functions share a single spline
                 if isinstance(val, tuple):
-                    splines = [self.spline(interp_domain, x, **spline_kwargs) for x in val]
-                    self._cache[name] = InterpolatedFunction(splines, name)
+                    spl = MultiSpline(interp_domain, val, **spline_kwargs)
+                    self._cache[name] = InterpolatedFunction(spl, name)
                 # single spline
                 else:
                     spl = self.spline(interp_domain, val, **spline_kwargs)
                     self._cache[name] = InterpolatedFunction(spl, name)
+                if shared is not None: shared[name] = self._cache[name]
+            elif stats is not None:
+                stats.hit(name)
 
             return self._cache[name](*args, **kws)
 
@@ -0,0 +1,215 @@
+"""
+A simple, content-addressed store of numpy arrays on disk, used to persist
+expensive model ingredients (i.e., PT integrals) across processes.
+
+The location of the cache can be set with the ``PYRSD_CACHE_DIR`` environment
+variable, and the cache can be disabled entirely by setting
+``PYRSD_DISK_CACHE=0``.
+"""
+from .. import numpy as np, os
+import tempfile
+import shutil
+
+# default maximum size of each store, in bytes
+DEFAULT_MAX_SIZE = 512 * 1024**2
+
+def user_cache_dir(appname):
+    r"""
+    Return full path to the user-specific cache dir for this application.
+
+    This function is adapted from:
+    https://github.com/pypa/pip/blob/master/pip/utils/appdirs.py
+
+    Parameters
+    ----------
+    appname : str
+        the name of application
+
+    Notes
+    -----
+    Typical user cache directories are:
+
+        - Mac OS X: ~/Library/Caches/<AppName>
+        - Unix: ~/.cache/<AppName> (XDG default)
+    """
+    from os.path import expanduser
+    import sys
+
+    if sys.platform == "darwin":
+        path = expanduser("~/Library/Caches")
+    else:
+        path = os.getenv("XDG_CACHE_HOME", expanduser("~/.cache"))
+    return os.path.join(path, appname)
+
+def cache_root():
+    """
+    The root directory of the disk cache
+    """
+    return os.environ.get('PYRSD_CACHE_DIR', user_cache_dir('pyRSD'))
+
+def enabled():
+    """
+    Whether the disk cache is enabled, as set by the ``PYRSD_DISK_CACHE``
+    environment variable
+    """
+    val = os.environ.get('PYRSD_DISK_CACHE', '1')
+    return val.lower() not in ['0', 'false', 'no', 'off']
+
+class DiskCache(object):
+    """
+    A content-addressed store of numpy arrays on disk
+
+    Each entry is a directory named by its key, holding one ``.npy``
+    file per array. Arrays are written to a temporary file and then renamed,
+    so that concurrent writers (i.e., several MPI ranks) never expose partially
+    written files, and they are loaded as memory maps, such that processes
+    on the same node share a single copy through the page cache.
+
+    When the total size of the store exceeds ``max_size``, the least recently
+    used entries are removed.
+
+    Parameters
+    ----------
+    name : str
+        the name of the store, which is a sub-directory of :func:`cache_root`
+    max_size : int, optional
+        the maximum size of the store in bytes; default is set by the
+        ``PYRSD_CACHE_MAXSIZE`` environment variable, or 512 MB
+    root : str, optional
+        the root directory; default is :func:`cache_root`
+    """
+    def __init__(self, name, max_size=None, root=None):
+        self.name = name
+        self._root = root
+        if max_size is None:
+            max_size = int(os.environ.get('PYRSD_CACHE_MAXSIZE', DEFAULT_MAX_SIZE))
+        self.max_size = max_size
+
+    @property
+    def path(self):
+        """
+        The directory holding the store
+        """
+        root = self._root if self._root is not None else cache_root()
+        return os.path.join(root, self.name)
+
+    def _entry(self, key, name=None):
+        toret = os.path.join(self.path, key)
+        if name is not None:
+            toret = os.path.join(toret, name + '.npy')
+        return toret
+
+    def keys(self):
+        """
+        The keys of the entries in the store
+        """
+        if not os.path.isdir(self.path):
+            return []
+        return [k for k in os.listdir(self.path) if os.path.isdir(self._entry(k))]
+
+    def size(self, key=None):
+        """
+        The size in bytes of the entry ``key``, or of the whole store
+        """
+        keys = self.keys() if key is None else [key]
+        toret = 0
+        for k in keys:
+            dirname = self._entry(k)
+            for f in os.listdir(dirname):
+                try:
+                    toret += os.path.getsize(os.path.join(dirname, f))
+                except OSError:
+                    pass
+        return toret
+
+    def __contains__(self, key):
+        return os.path.isdir(self._entry(key))
+
+    def load(self, key, name, mmap_mode='r'):
+        """
+        Load the array ``name`` from the entry ``key``, returning ``None``
+        if it does not exist
+        """
+        path = self._entry(key, name)
+        if not os.path.exists(path):
+            return None
+        try:
+            toret = np.load(path, mmap_mode=mmap_mode)
+        except (IOError, OSError, ValueError):
+            return None
+
+        # mark the entry as recently used
+        try:
+            os.utime(self._entry(key), None)
+        except OSError:
+            pass
+        return toret
+
+    def save(self, key, name, value):
+        """
+        Save the array ``value`` as ``name`` in the entry ``key``
+
+        Returns ``False`` if the array could not be written, i.e., on
+        a read-only file system.
+        """
+        dirname = self._entry(key)
+        try:
+            if not os.path.isdir(dirname):
+                try:
+                    os.makedirs(dirname)
+                except OSError:
+                    if not os.path.isdir(dirname): raise
+
+            # write to a temporary file and then atomically rename
+            fd, tmp = tempfile.mkstemp(dir=dirname, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as ff:
+                    np.save(ff, np.asarray(value))
+                os.rename(tmp, self._entry(key, name))
+            except:
+                if os.path.exists(tmp): os.remove(tmp)
+                raise
+        except (IOError, OSError):
+            return False
+
+        self.evict(keep=key)
+        return True
+
+    def evict(self, keep=None):
+        """
+        Remove the least recently used entries until the size of the store
+        is below :attr:`max_size`
+
+        Parameters
+        ----------
+        keep : str, optional
+            the key of an entry that should never be removed
+        """
+        entries = []
+        for k in self.keys():
+            try:
+                entries.append((os.path.getmtime(self._entry(k)), k, self.size(k)))
+            except OSError:
+                pass
+
+        total = sum(e[-1] for e in entries)
+        for _, k, size in sorted(entries):
+            if total <= self.max_size:
+                break
+            if k == keep:
+                continue
+            shutil.rmtree(self._entry(k), ignore_errors=True)
+            total -= size
+
+    def remove(self, key):
+        """
+        Remove the entry ``key`` from the store
+        """
+        shutil.rmtree(self._entry(key), ignore_errors=True)
+
+    def clear(self):
+        """
+        Remove all entries from the store
+        """
+        for k in self.keys():
+            self.remove(k)
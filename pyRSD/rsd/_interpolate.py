@@ -228,3 +228,83 @@ def _ndim_coords_from_arrays(points, ndim=None):
                 points = points.reshape(-1, ndim)
     return points
 #-------------------------------------------------------------------------------
+
+#-------------------------------------------------------------------------------
+# spline of several functions sharing the same knots
+#-------------------------------------------------------------------------------
+class MultiSpline(object):
+    """
+    An interpolating spline of several functions of the same ``x`` domain
+
+    The spline coefficients of all of the functions are stored on a shared
+    knot vector, such that the interval of each input point is located once,
+    and all functions are evaluated in a single pass.
+
+    Parameters
+    ----------
+    x : (N,) array_like
+        the domain points, which must be increasing
+    y : list of (N,) array_like
+        the values of each function at ``x``
+    k : int, optional
+        the degree of the spline; default is 3
+    bounds_error : bool, optional
+        if `True`, raise an :class:`InterpolationDomainError` when evaluating
+        outside of the domain; otherwise, return ``fill_value``
+    fill_value : float, optional
+        the value returned outside of the domain if ``bounds_error`` is `False`
+    """
+    def __init__(self, x, y, k=3, bounds_error=True, fill_value=0., **kwargs):
+        from scipy.interpolate import make_interp_spline
+
+        self.x = np.asarray(x)
+        self.bounds_error = bounds_error
+        self.fill_value = fill_value
+
+        # the (N, Nfunc) coefficients on a shared knot vector
+        y = np.column_stack([np.broadcast_to(yy, self.x.shape) for yy in y])
+        self._bspline = make_interp_spline(self.x, y, k=k)
+        self._derivative = None
+
+    def __len__(self):
+        return self._bspline.c.shape[1]
+
+    @classmethod
+    def _from_bspline(cls, x, bspline, bounds_error, fill_value):
+        toret = cls.__new__(cls)
+        toret.x = x
+        toret.bounds_error = bounds_error
+        toret.fill_value = fill_value
+        toret._bspline = bspline
+        toret._derivative = None
+        return toret
+
+    def __call__(self, x_new):
+        """
+        Return the list of the interpolated values of each function
+        """
+        x_new = np.asarray(x_new, dtype=float)
+        flat = x_new.ravel()
+
+        below = flat < self.x[0]
+        above = flat > self.x[-1]
+        out_of_bounds = below | above
+        if out_of_bounds.any():
+            if self.bounds_error:
+                raise InterpolationDomainError(above_bounds=above.any(), below_bounds=below.any())
+            flat = np.where(out_of_bounds, self.x[0], flat)
+
+        # shape is (Nfunc, len(x_new)), with contiguous rows
+        y = np.ascontiguousarray(self._bspline(flat, extrapolate=False).T)
+        if out_of_bounds.any():
+            y[:, out_of_bounds] = self.fill_value
+        return [yy.reshape(x_new.shape) for yy in y]
+
+    def derivative(self):
+        """
+        Return the :class:`MultiSpline` of the first derivative of each function
+        """
+        if self._derivative is None:
+            self._derivative = self._from_bspline(self.x, self._bspline.derivative(),
+                                                  self.bounds_error, self.fill_value)
+        return self._derivative
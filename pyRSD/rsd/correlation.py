@@ -6,10 +6,129 @@
     __email__  : nhand@berkeley.edu
     __desc__   : compute the smoothed correlation function multipoles
 """
-from .. import pygcl, numpy as np
+from .. import numpy as np
 from . import ExtrapolatedPowerSpectrum
+from ..extern.mcfit import kernels
+
+from scipy.interpolate import make_interp_spline
 
 KMAX = 10.
+
+class XiMultipoleTransform(object):
+    r"""
+    The FFTLog transform from power spectrum multipoles to (smoothed)
+    correlation function multipoles, for a fixed configuration
+    of ``k``, ``ells``, ``r``, and smoothing radii ``R``
+
+    :math: \Xi_\ell(r) = i^\ell \int (dk/2\pi^2) k^2 W(k*R) P_\ell(k) j_\ell(k*r)
+
+    The FFTLog kernels, smoothing kernels, and the spline interpolation
+    to ``r`` are computed once on initialization, such that a stack of
+    multipoles, e.g., for many models, is transformed with a single
+    batched FFT and matrix multiplication.
+
+    Parameters
+    ----------
+    k : array_like, (Nk,)
+        the log-spaced wavenumbers where the power multipoles are defined
+    ells : int, array_like
+        the multipole numbers
+    r : array_like, (Nr,), optional
+        the separations to compute the correlation function at; if `None`,
+        use the separations of the FFTLog (:attr:`y`)
+    R : float, array_like (NR,), optional
+        the radius of the Gaussian smoothing kernel, :math:`W(x) = e^{-x^2}`;
+        if array_like, the result is computed for each radius
+    q : float, optional
+        the power-law tilt of the FFTLog
+    N : int, optional
+        the length of the FFT, with the input zero-padded; default is the
+        smallest power of 2 that doubles the length of ``k``
+    """
+    def __init__(self, k, ells, r=None, R=0., q=1.5, N=None):
+
+        k = np.asarray(k, dtype=float)
+        self.k = k
+        self.ells = [ells] if np.isscalar(ells) else list(ells)
+        self.R = R
+        self.q = q
+
+        Nk = len(k)
+        if Nk < 2:
+            raise ValueError("at least 2 values of `k` required for the FFTLog")
+        Delta = np.log(k[-1]/k[0]) / (Nk-1)
+        if not np.allclose(k[1:]/k[:-1], np.exp(Delta), rtol=1e-3):
+            raise ValueError("the input `k` values must be log-spaced for the FFTLog")
+
+        if N is None:
+            N = 2**(int(np.ceil(np.log2(Nk))) + 1)
+        if N < Nk:
+            raise ValueError("the FFT length `N` must be at least the length of `k`")
+        self.N = N
+
+        # the output separations, shared by all multipoles
+        self.y = np.exp(-Delta) / k[::-1]
+
+        # the Mellin transforms of the spherical Bessel kernels, (Nell, N//2+1)
+        m = np.arange(N//2 + 1)
+        z = q + 2j*np.pi/N/Delta * m
+        self._u = np.array([kernels.Mellin_SphericalBesselJ(ell)(z) for ell in self.ells])
+
+        # input and output factors
+        self._prefac = k**(3-q) / (2*np.pi)**1.5
+        self._postfac = np.array([(-1)**(ell//2) for ell in self.ells])[:,None] * self.y**(-q)
+
+        # the Gaussian smoothing kernels, (NR, Nk)
+        self._smoothing = np.exp(-(k[None,:]*np.atleast_1d(R)[:,None])**2)
+
+        # the interpolation from the FFTLog separations to r
+        if r is None:
+            self.r = self.y
+            self._interp = None
+        else:
+            self.r = np.atleast_1d(np.asarray(r, dtype=float))
+            if self.r.min() < self.y[0] or self.r.max() > self.y[-1]:
+                args = (self.y[0], self.y[-1])
+                raise ValueError("`r` values must be in the range [%.3e, %.3e], given the input `k`" %args)
+            self._interp = make_interp_spline(self.y, np.eye(Nk), k=3)(self.r)
+
+    def __call__(self, Pell):
+        """
+        Transform the power multipoles
+
+        Parameters
+        ----------
+        Pell : array_like, (..., Nk, Nell)
+            the power multipoles, with any number of leading dimensions
+
+        Returns
+        -------
+        xi : array_like, (..., [NR,] Nr, Nell)
+            the correlation function multipoles; if ``R`` is array_like,
+            the axis before the separations is the smoothing radius
+        """
+        Pell = np.asarray(Pell, dtype=float)
+        if Pell.ndim < 2 or Pell.shape[-2:] != (len(self.k), len(self.ells)):
+            args = (len(self.k), len(self.ells), str(Pell.shape))
+            raise ValueError("input multipoles should have trailing shape (%d, %d), not %s" %args)
+
+        # (..., NR, Nell, Nk), zero-padded symmetrically to N
+        f = np.swapaxes(Pell, -1, -2)[...,None,:,:] * (self._smoothing * self._prefac)[:,None,:]
+        Npad = self.N - len(self.k)
+        pad = [(0, 0)]*(f.ndim-1) + [(Npad//2, Npad - Npad//2)]
+        f = np.pad(f, pad, mode='constant')
+
+        # the batched convolution
+        g = np.fft.hfft(np.fft.rfft(f, axis=-1) * self._u, self.N, axis=-1) / self.N
+        xi = g[...,Npad - Npad//2 : self.N - Npad//2] * self._postfac
+
+        # interpolate to r
+        if self._interp is not None:
+            xi = np.einsum('rk,...k->...r', self._interp, xi)
+
+        xi = np.swapaxes(xi, -1, -2)
+        return xi if np.ndim(self.R) else xi[...,0,:,:]
+
         
 def SmoothedXiMultipoles(power_model, r, ells, R=0., **kwargs):
     """
@@ -31,8 +150,9 @@ def SmoothedXiMultipoles(power_model, r, ells, R=0., **kwargs):
         to integrate over
     ells : int or array_like
         the desired multipole numbers to compute
-    R : float, optional
-        the radius of the Gaussian smoothig kernel to use; default is `0`
+    R : float, array_like, optional
+        the radius of the Gaussian smoothig kernel to use; default is `0`.
+        If array_like, the multipoles are computed for each radius
     kwargs: passed to `ExtrapolatedPowerSpectrum` constructor
             model_func : str, optional (`Pgal`)
                 the name of the function, which is a class method of ``model``
@@ -56,13 +176,7 @@ def SmoothedXiMultipoles(power_model, r, ells, R=0., **kwargs):
     # compute the power spectrum multipoles
     k_spline = np.logspace(-5, np.log10(KMAX), 1000)
     poles = extrap_model.to_poles(k_spline, ells)
-    
-    toret = []
-    for i, ell in enumerate(ells):
-        xi = pygcl.pk_to_xi(int(ell), k_spline, poles[:,i], r, smoothing=R)
-        toret.append(xi)
-        
-    toret = np.vstack(toret).T
-    return np.squeeze(toret)
-    
 
+    # and the FFTLog to the correlation function
+    transform = XiMultipoleTransform(k_spline, ells, r=r, R=R)
+    return np.squeeze(transform(poles))
@@ -360,13 +360,25 @@ class Cosmology(dict):
         # return a new Cosmology instance
         return self.from_astropy(new_engine, **extras)
 
-    def to_class(self, transfer=transfers.CLASS, linear_power_file=None, **class_config):
+    def to_class(self, transfer=transfers.CLASS, linear_power_file=None, cache=None, **class_config):
         """
         Convert the object to a :class:`pyRSD.pygcl.Cosmology` instance in
         order to interface with the CLASS code
 
+        If ``cache`` is `True`, CLASS is only run once for each set of
+        parameters, and the returned object is shared by the cache of CLASS
+        outputs (see :func:`pyRSD.pygcl.Cosmology.cached`); it is read-only
+
         Parameters
         ----------
+        transfer : int, optional
+            the transfer function type, see ``pygcl.transfers``
+        linear_power_file : str, optional
+            the name of a file holding the linear power spectrum to use
+        cache : bool, optional
+            whether to use the cache of CLASS outputs; the default is
+            `False`, unless the ``PYRSD_CLASS_CACHE`` environment variable
+            is set to `1`
         **class_config : key/value pairs
             keywords to pass to the CLASS engine; defaults are `z_max_pk=2.0`
             and `P_k_max_h/Mpc=20.0`
@@ -376,7 +388,7 @@ class Cosmology(dict):
         cosmo : pygcl.Cosmology
             the pygcl Cosmology object which interfaces with CLASS
         """
-        from pyRSD.pygcl import Cosmology, ClassParams
+        from pyRSD.pygcl import Cosmology, ClassParams, CLASS_CACHE
 
         # set some default CLASS config params
         class_config.setdefault('z_max_pk', 2.0)
@@ -389,6 +401,8 @@ class Cosmology(dict):
         if linear_power_file is not None:
             k, Pk = np.loadtxt(linear_power_file, unpack=True)
             cosmo = Cosmology.from_power(linear_power_file, k, Pk)
+        elif cache or (cache is None and CLASS_CACHE):
+            return Cosmology.cached(pars, transfer, self.sigma8)
         else:
             cosmo = Cosmology(pars, transfer)
 
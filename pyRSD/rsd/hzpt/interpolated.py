@@ -1,9 +1,14 @@
 from . import parameter
-from .. import INTERP_KMIN, INTERP_KMAX
+from .. import INTERP_KMIN, INTERP_KMAX, __version__
 from ... import pygcl, numpy as np
 from .._interpolate import RegularGridInterpolator, InterpolationDomainError
+from .._disk_cache import DiskCache
+from .. import _disk_cache
+from ..tools import get_hash_key, can_fork
 from . import HaloZeldovichP00, HaloZeldovichP01, HaloZeldovichP11, HaloZeldovichPhm
 
+import os
+
 
 def zeldovich_from_table(self, interpolator, k):
     """
@@ -18,55 +23,163 @@ def zeldovich_from_table(self, interpolator, k):
     except InterpolationDomainError:
         return np.nan_to_num(self.zeldovich(k))
 
+#------------------------------------------------------------------------------
+# building the interpolation tables
+#------------------------------------------------------------------------------
+# the disk cache holding the tables
+_tables_cache = DiskCache('hzpt_tables')
+
+# the Zel'dovich terms that are tabulated
+ZELDOVICH_TERMS = ['P00', 'P01', 'P11']
+
+def evaluate_zeldovich_terms(args):
+    """
+    Evaluate the Zel'dovich terms :data:`ZELDOVICH_TERMS` for several
+    values of sigma8(z)
+
+    Parameters
+    ----------
+    args : tuple
+        tuple of the base :class:`pygcl.ZeldovichPS` object, the sigma8(z)
+        values, and the ``k`` values
+
+    Returns
+    -------
+    toret : array_like, (3, len(sigma8s), len(k))
+        the Zel'dovich P00, P01, and P11 terms
+    """
+    base, sigma8s, k = args
+    classes = [pygcl.ZeldovichP00, pygcl.ZeldovichP01, pygcl.ZeldovichP11]
+
+    toret = np.empty((len(classes), len(sigma8s), len(k)))
+    for i, cls in enumerate(classes):
+        zel = cls(base)
+        zel.SetLowKApprox()
+        for j, s8 in enumerate(sigma8s):
+            zel.SetSigma8AtZ(s8)
+            toret[i,j] = np.nan_to_num(zel(k)) # set any NaNs to zero
+    return toret
+
+def compute_zeldovich_tables(base, sigma8s, k, pool='serial', nprocs=None):
+    """
+    Evaluate the Zel'dovich terms :data:`ZELDOVICH_TERMS` on a grid of
+    sigma8(z) and ``k``, splitting the sigma8(z) values between
+    a pool of workers
+
+    Parameters
+    ----------
+    base : pygcl.ZeldovichPS
+        the Zel'dovich object holding the linear power
+    sigma8s : array_like
+        the sigma8(z) values
+    k : array_like
+        the wavenumbers
+    pool : {'serial', 'process', 'thread'}, optional
+        the type of pool; default is to evaluate the terms serially.
+        The Zel'dovich integrals hold the GIL, so threads only help if
+        the extension releases it; process pools fall back to serial
+        evaluation in pool workers and MPI ranks
+    nprocs : int, optional
+        the number of workers; default is the number of cores
+
+    Returns
+    -------
+    toret : array_like, (3, len(sigma8s), len(k))
+        the stacked tables
+    """
+    if nprocs is None:
+        nprocs = os.cpu_count() or 1
+    nprocs = min(nprocs, len(sigma8s))
+    if pool == 'process' and not can_fork():
+        pool = 'serial'
+    if pool == 'serial' or nprocs == 1:
+        return evaluate_zeldovich_terms((base, sigma8s, k))
+
+    if pool == 'process':
+        from concurrent.futures import ProcessPoolExecutor as Executor
+    elif pool == 'thread':
+        from concurrent.futures import ThreadPoolExecutor as Executor
+    else:
+        raise ValueError("pool type should be one of ['process', 'thread', 'serial'], not '%s'" %pool)
+
+    tasks = [(base, s8, k) for s8 in np.array_split(sigma8s, nprocs)]
+    with Executor(max_workers=nprocs) as executor:
+        results = list(executor.map(evaluate_zeldovich_terms, tasks))
+    return np.concatenate(results, axis=1)
+
 class InterpolationTable(dict):
     """
     Dict that returns an interpolation table for
     the given Zel'dovich terms
+
+    The tables of all terms are computed together, as a single stacked
+    array :attr:`values`, and saved to the disk cache, keyed by the linear
+    power spectrum. Phm uses the same Zel'dovich term as P00.
+
+    The tables are computed with the ``pool`` and ``nprocs`` of the
+    :class:`InterpolatedHZPTModels`; see :func:`compute_zeldovich_tables`.
     """
     grid = {}
     grid['sigma8_z'] = np.linspace(0.3, 1.0, 100)
     grid['k'] = np.logspace(np.log10(INTERP_KMIN), np.log10(INTERP_KMAX), 300)
 
+    # the rows of the stacked tables holding each term
+    index = {'P00':0, 'P01':1, 'P11':2, 'Phm':0}
+
     def __init__(self, models):
         self.models = models
 
-    def __missing__(self, key):
+    @property
+    def key(self):
+        """
+        The key of the tables in the disk cache, computed from the linear
+        power spectrum and the interpolation grid
         """
-        Evaluate the Zeldovich terms and store in an interpolation table.
+        try:
+            return self._key
+        except AttributeError:
+            k = np.asarray(self.grid['k'], dtype='f8')
+            Plin = np.asarray(pygcl.LinearPS(self.models.cosmo, 0.)(k), dtype='f8')
+            args = ('HZPTTables', __version__, np.asarray(self.grid['sigma8_z'], dtype='f8'), k, Plin)
+            self._key = get_hash_key(*args)
+            return self._key
+
+    @property
+    def values(self):
+        """
+        The stacked tables of the Zel'dovich terms, with shape
+        (3, ``len(grid['sigma8_z'])``, ``len(grid['k'])``)
 
         Notes
         -----
         This does not depend on redshift, as we are interpolating as a function
         of sigma8(z)
         """
-        if key == 'P00':
-            model = self.models._P00
-        elif key == 'P01':
-            model = self.models._P01
-        elif key == 'P11':
-            model = self.models._P11
-        elif key == 'Phm':
-            model = self.models._Phm
-        else:
-            raise KeyError("key '%s' not understood" %key)
+        try:
+            return self._values
+        except AttributeError:
+            pass
 
-        # save the original sigma8_z to restore later
-        original_s8z = model.sigma8_z
+        use_disk = _disk_cache.enabled()
+        toret = _tables_cache.load(self.key, 'zeldovich') if use_disk else None
+        if toret is None:
+            args = (self.models._base_zeldovich, self.grid['sigma8_z'], self.grid['k'])
+            toret = compute_zeldovich_tables(*args, pool=self.models.pool, nprocs=self.models.nprocs)
+            if use_disk:
+                _tables_cache.save(self.key, 'zeldovich', toret)
 
-        # the interpolation grid points
-        sigma8s = self.grid['sigma8_z']
-        ks      = self.grid['k']
+        self._values = toret
+        return toret
 
-        # get the grid values
-        grid_vals = []
-        for i, s8 in enumerate(sigma8s):
-            model._driver.SetSigma8AtZ(s8)
-            grid_vals += list(model.zeldovich(ks))
-        grid_vals = np.array(grid_vals).reshape((len(sigma8s), len(ks)))
+    def __missing__(self, key):
+        """
+        Return the interpolation table for the term ``key``
+        """
+        if key not in self.index:
+            raise KeyError("key '%s' not understood" %key)
 
-        # create the interpolator
-        model.sigma8_z = original_s8z
-        interpolator = RegularGridInterpolator((sigma8s, ks), grid_vals)
+        grid = (self.grid['sigma8_z'], self.grid['k'])
+        interpolator = RegularGridInterpolator(grid, self.values[self.index[key]])
 
         super(InterpolationTable, self).__setitem__(key, interpolator)
         return interpolator
@@ -76,7 +189,11 @@ class InterpolatedHZPTModels(object):
     """
     Class to handle interpolating HZPT models
     """
-    def __init__(self, cosmo, sigma8_z, f, interpolate=True):
+    # how the interpolation tables are computed
+    pool = 'serial'
+    nprocs = None
+
+    def __init__(self, cosmo, sigma8_z, f, interpolate=True, pool='serial', nprocs=None):
         """
         Parameters
         ----------
@@ -88,6 +205,10 @@ class InterpolatedHZPTModels(object):
             the growth rate
         interpolate : bool, optional
             whether to turn on interpolation
+        pool : {'serial', 'process', 'thread'}, optional
+            the type of pool used to compute the interpolation tables
+        nprocs : int, optional
+            the number of workers of the pool; default is the number of cores
         """
         # the base Zel'dovich object
         self._base_zeldovich = pygcl.ZeldovichPS(cosmo, 0.)
@@ -96,6 +217,8 @@ class InterpolatedHZPTModels(object):
         self.sigma8_z        = sigma8_z
         self.f               = f
         self.interpolate     = interpolate
+        self.pool            = pool
+        self.nprocs          = nprocs
 
         # the interpolation table
         self.table = InterpolationTable(self)
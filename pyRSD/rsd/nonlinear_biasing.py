@@ -75,7 +75,7 @@ class NonlinearBiasingMixin(object):
         """
         Interpolator from simulation data for nonlinear biases
         """
-        return NonlinearBiasFits()
+        return NonlinearBiasFits(use_grid=getattr(self, 'use_gp_tables', False))
     
     @parameter
     def nonlinear_bias_types(self, val):
@@ -139,7 +139,7 @@ class NonlinearBiasingMixin(object):
     def b2_00_a__4(self, val):
         return val
         
-    @cached_property("b2_00_a__0", "b2_00_a__2", "b2_00_a__4", "nonlinear_bias_types", lru_cache=True, maxsize=100)
+    @cached_property("b2_00_a__0", "b2_00_a__2", "b2_00_a__4", "nonlinear_bias_types", "use_gp_tables", lru_cache=True, maxsize=100)
     def b2_00_a(self):
         """
         The nonlinear bias term that enters into Phm
@@ -162,7 +162,7 @@ class NonlinearBiasingMixin(object):
     def b2_00_b__4(self, val):
         return val
         
-    @cached_property("b2_00_b__0", "b2_00_b__2", "b2_00_b__4", "nonlinear_bias_types")
+    @cached_property("b2_00_b__0", "b2_00_b__2", "b2_00_b__4", "nonlinear_bias_types", "use_gp_tables")
     def b2_00_b(self):
         """
         The nonlinear bias term that enters into (P11+P02)[mu2]
@@ -185,7 +185,7 @@ class NonlinearBiasingMixin(object):
     def b2_00_c__4(self, val):
         return val
         
-    @cached_property("b2_00_c__0", "b2_00_c__2", "b2_00_c__4", "nonlinear_bias_types")
+    @cached_property("b2_00_c__0", "b2_00_c__2", "b2_00_c__4", "nonlinear_bias_types", "use_gp_tables")
     def b2_00_c(self):
         """
         The nonlinear bias term that enters into P02[mu4]
@@ -208,7 +208,7 @@ class NonlinearBiasingMixin(object):
     def b2_00_d__4(self, val):
         return val
         
-    @cached_property("b2_00_d__0", "b2_00_d__2", "b2_00_d__4", "nonlinear_bias_types")
+    @cached_property("b2_00_d__0", "b2_00_d__2", "b2_00_d__4", "nonlinear_bias_types", "use_gp_tables")
     def b2_00_d(self):
         """
         The nonlinear bias term that enters into (P13+P22+P04)[mu4]
@@ -231,7 +231,7 @@ class NonlinearBiasingMixin(object):
     def b2_01_a__2(self, val):
         return val
         
-    @cached_property("b2_01_a__0", "b2_01_a__1", "b2_01_a__2", "nonlinear_bias_types", lru_cache=True, maxsize=100)
+    @cached_property("b2_01_a__0", "b2_01_a__1", "b2_01_a__2", "nonlinear_bias_types", "use_gp_tables", lru_cache=True, maxsize=100)
     def b2_01_a(self):
         """
         The nonlinear bias term that enters into P01[mu2]
@@ -254,7 +254,7 @@ class NonlinearBiasingMixin(object):
     def b2_01_b__2(self, val):
         return val
         
-    @cached_property("b2_01_b__0", "b2_01_b__1", "b2_01_b__2", "nonlinear_bias_types")
+    @cached_property("b2_01_b__0", "b2_01_b__1", "b2_01_b__2", "nonlinear_bias_types", "use_gp_tables")
     def b2_01_b(self):
         """
         The nonlinear bias term that enters into (P12+P03)[mu4]
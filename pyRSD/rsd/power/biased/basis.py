@@ -0,0 +1,177 @@
+from pyRSD import numpy as np
+
+class BiasBasis(object):
+    """
+    The bias-independent spectra entering the ``mu`` terms of
+    :class:`BiasedSpectrum`, evaluated once on the interpolation
+    domain ``k`` of the model
+
+    The terms :func:`BiasedSpectrum.P_mu0`, ..., :func:`BiasedSpectrum.P_mu6`
+    are sums of these spectra, weighted by coefficients that only depend
+    on the linear biases of the two tracers (and the nonlinear biases and
+    velocity dispersions that are functions of them). :func:`P_mu` assembles
+    the terms for any pair of linear biases, without changing ``b1`` or
+    ``b1_bar`` of the model and thus without invalidating its cached splines.
+
+    Parameters
+    ----------
+    model : BiasedSpectrum
+        the model instance
+    """
+    def __init__(self, model):
+        self.model = m = model
+        self.k = k = m.k
+
+        # P00 and P01 terms
+        self.P00     = m.P00.mu0(k)
+        self.K00     = m.K00(k)
+        self.K00s    = m.K00s(k)
+        self.P01     = m.P01.mu2(k)
+        self.Pdv     = m.Pdv(k)
+        self.K10     = m.K10(k)
+        self.K10s    = m.K10s(k)
+        self.K11     = m.K11(k)
+        self.K11s    = m.K11s(k)
+
+        # P02 terms
+        self.P02_mu2 = m.P02.mu2.no_velocity(k)
+        self.P02_mu4 = m.P02.mu4.no_velocity(k)
+        self.K20_a   = m.K20_a(k)
+        self.K20s_a  = m.K20s_a(k)
+        self.K20_b   = m.K20_b(k)
+        self.K20s_b  = m.K20s_b(k)
+
+        # P11 terms
+        self.C11_mu2 = m.Ivvdd_h01(k) + m.Idvdv_h03(k)
+        self.C11_mu4 = m.Ivvdd_h02(k) + m.Idvdv_h04(k)
+        self.P11_mu4 = m.P11.mu4(k)
+        self.Pvv     = m.Pvv(k)
+
+        # P12 terms
+        self.P12_mu4 = m.P12.mu4.no_velocity(k)
+        self.I03     = m.I03(k)
+        self.I21     = m.I21(k)
+        self.I30     = m.I30(k)
+        self.J20     = m.J20(k)
+        self.Plin    = m.normed_power_lin(k)
+
+        # P22 terms
+        self.P22_mu4 = m.P22.mu4.no_velocity(k)
+        self.P22_mu6 = m.P22.mu6.no_velocity(k)
+        self.Pdd     = m.Pdd(k)
+        self.sigmasq = m.sigmasq_k(k)
+
+        # P_mu6
+        self.I32     = m.I32(k)
+
+    def tracer(self, b1):
+        """
+        The coefficients that depend on the linear bias of a single tracer
+
+        Parameters
+        ----------
+        b1 : float
+            the (internally used) linear bias of the tracer
+
+        Returns
+        -------
+        dict :
+            the linear and tidal biases, the nonlinear biases, and the
+            squared velocity dispersion of the tracer
+        """
+        m = self.model
+
+        toret = {'b1':b1}
+        toret['bs'] = -2./7 * (b1 - 1.) if m.use_tidal_bias else 0.
+        for name in ['b2_00_a', 'b2_00_b', 'b2_00_c', 'b2_00_d', 'b2_01_a', 'b2_01_b']:
+            toret[name] = getattr(m, name)(b1)
+
+        if m.vel_disp_from_sims:
+            toret['sigsq'] = m.vel_disp_fitter(b1=b1, sigma8_z=m.sigma8_z)**2
+        else:
+            toret['sigsq'] = m.sigma_v**2
+        return toret
+
+    def Phh(self, t1, t2, b2):
+        """
+        The 1-loop halo density auto-correlation, using the nonlinear bias ``b2``
+        """
+        term1 = t1['b1']*t2['b1'] * self.P00
+        term2 = (t1['b1']*t2[b2] + t2['b1']*t1[b2]) * self.K00
+        term3 = (t1['bs']*t2[b2] + t2['bs']*t1[b2]) * self.K00s
+        return term1 + term2 + term3
+
+    def P01_mu2(self, t1, t2, b2):
+        """
+        The halo density - halo momentum correlation, using the nonlinear bias ``b2``
+        """
+        f = self.model.f
+        b1, b1_bar = t1['b1'], t2['b1']
+
+        term1 = b1*b1_bar * self.P01
+        term2 = -self.Pdv * (b1*(1. - b1_bar) + b1_bar*(1. - b1))
+        term3 = f*((t1[b2] + t2[b2])*self.K10 + (t1['bs'] + t2['bs'])*self.K10s)
+        term4 = f*((b1_bar*t1[b2] + b1*t2[b2])*self.K11 + (b1_bar*t1['bs'] + b1*t2['bs'])*self.K11s)
+        return term1 + term2 + term3 + term4
+
+    def P_mu(self, b1, b1_bar):
+        """
+        The ``mu^0``, ``mu^2``, ``mu^4``, and ``mu^6`` terms of the power
+        spectrum of two tracers with linear biases ``b1`` and ``b1_bar``,
+        evaluated on :attr:`k`
+
+        Returns
+        -------
+        tuple of array_like :
+            the four terms, equal to :func:`BiasedSpectrum.P_mu0`, etc.
+            evaluated with the model biases set to ``b1`` and ``b1_bar``
+        """
+        m = self.model
+        k, f = self.k, m.f
+
+        # the internally used biases
+        if m.use_mean_bias:
+            b1 = b1_bar = (b1*b1_bar)**0.5
+        t1, t2 = self.tracer(b1), self.tracer(b1_bar)
+        sigsq, sigsq_bar = t1['sigsq'], t2['sigsq']
+        A = (f*k)**2
+
+        # mu^0: P00_ss
+        Phm, Phm_bar = m._Phm(b1, k), m._Phm(b1_bar, k)
+        P_mu0 = (Phm/self.P00) * (Phm_bar/self.P00) * self.P00 + m._stochasticity(b1, b1_bar, k)
+
+        # mu^2: P01_ss, P11_ss, P02_ss
+        P11_mu2 = b1*b1_bar*f**2 * self.C11_mu2
+        P02_mu2 = 0.5*(b1 + b1_bar)*self.P02_mu2 - 0.5*A*(sigsq + sigsq_bar)*self.Phh(t1, t2, 'b2_00_c') \
+                    + 0.5*f**2*((t1['b2_00_c'] + t2['b2_00_c'])*self.K20_a + (t1['bs'] + t2['bs'])*self.K20s_a)
+        P_mu2 = self.P01_mu2(t1, t2, 'b2_01_a') + P11_mu2 + P02_mu2
+        if m.correct_mu2:
+            P_mu2 = P_mu2 + m._model_correction(m.Pmu2_correction, b1, b1_bar, k)
+
+        # mu^4: P11_ss, P02_ss, P12_ss, P03_ss, P22_ss, P13_ss, P04_ss
+        P01_b = self.P01_mu2(t1, t2, 'b2_01_b')
+        Phh_d = self.Phh(t1, t2, 'b2_00_d')
+
+        P11_mu4 = 0.5*(b1 + b1_bar)*self.P11_mu4 - 0.5*((b1 - 1) + (b1_bar - 1))*self.Pvv \
+                    + f**2*self.C11_mu4*(b1*b1_bar - 0.5*(b1 + b1_bar))
+        P02_mu4 = 0.5*(b1 + b1_bar)*self.P02_mu4 \
+                    + 0.5*f**2*((t1['b2_00_b'] + t2['b2_00_b'])*self.K20_b + (t1['bs'] + t2['bs'])*self.K20s_b)
+        P12_mu4 = self.P12_mu4 - 0.5*A*0.5*(sigsq + sigsq_bar)*self.P01 \
+                    - 0.5*((b1 - 1.) + (b1_bar - 1.))*f**3*self.I03 \
+                    - 0.25*A*(sigsq + sigsq_bar)*(P01_b - self.P01)
+        P03_mu4 = -0.25*A*(sigsq + sigsq_bar)*P01_b
+        P22_mu4 = self.P22_mu4 + 0.5*A**2*(b1*b1_bar*self.Pdd)*self.sigmasq**2 \
+                    - 0.25*A*(sigsq + sigsq_bar)*(0.5*(b1 + b1_bar)*self.P02_mu2) \
+                    + 0.125*A**2*(sigsq**2 + sigsq_bar**2)*Phh_d
+        P13_mu4 = -0.5*A*(sigsq + sigsq_bar)*P11_mu2
+        P04_mu4 = -0.125*(b1 + b1_bar)*A*(sigsq + sigsq_bar)*self.P02_mu2 \
+                    + (1./12)*A**2*Phh_d*(3.*0.5*(sigsq**2 + sigsq_bar**2) + m.velocity_kurtosis)
+        P_mu4 = P11_mu4 + P02_mu4 + P12_mu4 + P03_mu4 + P22_mu4 + P13_mu4 + P04_mu4
+        if m.correct_mu4:
+            P_mu4 = P_mu4 + m._model_correction(m.Pmu4_correction, b1, b1_bar, k)
+
+        # mu^6: P12_ss
+        P12_mu6 = f**3*(self.I21 - 0.5*(b1 + b1_bar)*self.I30 + 2*k**2*self.J20*self.Plin)
+        P_mu6 = P12_mu6 + 1./8*f**4*self.I32
+
+        return P_mu0, P_mu2, P_mu4, P_mu6
@@ -6,6 +6,9 @@ from scipy.interpolate import InterpolatedUnivariateSpline as spline
 
 # tools
 from pyRSD.rsd._cache import parameter, cached_property, interpolated_function, CachedProperty
+from pyRSD.rsd._cache import InterpolatedFunction
+from pyRSD.rsd._interpolate import MultiSpline
+from pyRSD.rsd import tools
 from pyRSD.rsd.tools import BiasToSigmaRelation
 
 # base model
@@ -34,6 +37,8 @@ class BiasedSpectrum(DarkMatterSpectrum, NonlinearBiasingMixin):
                        correct_mu2=False,
                        correct_mu4=False,
                        use_vlah_biasing=True,
+                       use_bias_basis=True,
+                       use_gp_tables=False,
                        **kwargs):
 
         # initalize the dark matter power spectrum
@@ -56,6 +61,12 @@ class BiasedSpectrum(DarkMatterSpectrum, NonlinearBiasingMixin):
         # whether to use Vlah et al nonlinear biasing
         self.use_vlah_biasing = use_vlah_biasing
 
+        # whether to evaluate pairs of biases from the bias basis
+        self.use_bias_basis = use_bias_basis
+
+        # whether to tabulate the simulation-calibrated Gaussian processes
+        self.use_gp_tables = use_gp_tables
+
         # set b1_bar, unless we are fixed
         try: self.b1_bar = 2.
         except: pass
@@ -95,9 +106,13 @@ class BiasedSpectrum(DarkMatterSpectrum, NonlinearBiasingMixin):
                 raise ValueError("'%s' is not a valid cached property" %k)
             self._cache_overrides[k] = kws[k]
 
-        yield
-
-        del self._cache_overrides
+        # overrides change return values without changing parameters
+        self.bump_cache_version()
+        try:
+            yield
+        finally:
+            del self._cache_overrides
+            self.bump_cache_version()
 
     @parameter
     def correct_mu2(self, val):
@@ -161,6 +176,28 @@ class BiasedSpectrum(DarkMatterSpectrum, NonlinearBiasingMixin):
         """
         return val
 
+    @parameter(default=True)
+    def use_bias_basis(self, val):
+        """
+        If `True`, evaluate the power for a given pair of linear biases
+        by combining the bias-independent spectra in :attr:`bias_basis`,
+        rather than by setting `b1` and `b1_bar`; see :func:`power_for_biases`
+        """
+        return val
+
+    @parameter(default=False)
+    def use_gp_tables(self, val):
+        """
+        If `True`, interpolate the predictions of the simulation-calibrated
+        Gaussian processes (velocity dispersion, nonlinear biases,
+        stochasticity, and model corrections) from tables on regular grids,
+        which are computed once and saved to disk
+        """
+        models = ['vel_disp_fitter', 'Pmu2_correction', 'Pmu4_correction',
+                  'auto_stochasticity_fits', 'cross_stochasticity_fits', 'nonlinear_bias_fitter']
+        self._update_models('use_grid', models, val)
+        return val
+
     @parameter
     def b1(self, val):
         """
@@ -183,35 +220,35 @@ class BiasedSpectrum(DarkMatterSpectrum, NonlinearBiasingMixin):
         """
         Interpolator from simulation data for linear velocity dispersion of halos
         """
-        return VelocityDispersionFits()
+        return VelocityDispersionFits(use_grid=self.use_gp_tables)
 
     @cached_property()
     def Pmu2_correction(self):
         """
         The parameters for the halo P[mu2] correction
         """
-        return Pmu2ResidualCorrection()
+        return Pmu2ResidualCorrection(use_grid=self.use_gp_tables)
 
     @cached_property()
     def Pmu4_correction(self):
         """
         The parameters for the halo P[mu4] correction
         """
-        return Pmu4ResidualCorrection()
+        return Pmu4ResidualCorrection(use_grid=self.use_gp_tables)
 
     @cached_property()
     def auto_stochasticity_fits(self):
         """
         The prediction for the auto stochasticity from a GP
         """
-        return AutoStochasticityFits()
+        return AutoStochasticityFits(use_grid=self.use_gp_tables)
 
     @cached_property()
     def cross_stochasticity_fits(self):
         """
         The prediction for the cross stochasticity from a GP
         """
-        return CrossStochasticityFits()
+        return CrossStochasticityFits(use_grid=self.use_gp_tables)
 
     #---------------------------------------------------------------------------
     # cached properties
@@ -265,7 +302,7 @@ class BiasedSpectrum(DarkMatterSpectrum, NonlinearBiasingMixin):
         """
         return BiasToSigmaRelation(self.z, self.cosmo, interpolate=self.interpolate)
 
-    @cached_property("sigma_v", "sigma_lin", "vel_disp_from_sims", "_ib1", "sigma8_z")
+    @cached_property("sigma_v", "sigma_lin", "vel_disp_from_sims", "_ib1", "sigma8_z", "use_gp_tables")
     def sigmav_halo(self):
         """
         The velocity dispersion for halos, possibly as a function of bias
@@ -275,7 +312,7 @@ class BiasedSpectrum(DarkMatterSpectrum, NonlinearBiasingMixin):
         else:
             return self.sigma_v
 
-    @cached_property("sigma_v", "sigma_lin", "vel_disp_from_sims", "_ib1_bar", "sigma8_z")
+    @cached_property("sigma_v", "sigma_lin", "vel_disp_from_sims", "_ib1_bar", "sigma8_z", "use_gp_tables")
     def sigmav_halo_bar(self):
         """
         The velocity dispersion for halos, possibly as a function of bias
@@ -307,43 +344,55 @@ class BiasedSpectrum(DarkMatterSpectrum, NonlinearBiasingMixin):
     #---------------------------------------------------------------------------
     # power term attributes
     #---------------------------------------------------------------------------
-    @interpolated_function("_ib1", "P00", "use_Phm_model", "sigma8_z", "b2_00_a", "k", interp="k")
-    def Phm(self, k):
+    def _Phm(self, b1, k):
         """
-        The halo - matter cross correlation for the 1st tracer
+        The halo - matter cross correlation for a tracer with linear bias `b1`
         """
         if self.use_Phm_model:
-            toret = self.hzpt.Phm(b1=self._ib1, k=k)
+            toret = self.hzpt.Phm(b1=b1, k=k)
         else:
             # the bias values to use
-            b1, b2_00 = self._ib1, self.b2_00_a(self._ib1)
+            b2_00 = self.b2_00_a(b1)
+            bs = -2./7 * (b1 - 1.) if self.use_tidal_bias else 0.
 
             term1 = b1*self.P00.mu0(k)
             term2 = b2_00*self.K00(k)
-            term3 = self.bs*self.K00s(k)
+            term3 = bs*self.K00s(k)
             toret = term1 + term2 + term3
 
         return toret
 
+    @interpolated_function("_ib1", "P00", "use_Phm_model", "sigma8_z", "b2_00_a", "k", interp="k")
+    def Phm(self, k):
+        """
+        The halo - matter cross correlation for the 1st tracer
+        """
+        return self._Phm(self._ib1, k)
+
     @interpolated_function("_ib1_bar", "P00", "use_Phm_model", "sigma8_z", "b2_00_a", "k", interp="k")
     def Phm_bar(self, k):
         """
         The halo - matter cross correlation for the 2nd tracer
         """
-        if self.use_Phm_model:
-            toret = self.hzpt.Phm(b1=self._ib1_bar, k=k)
-        else:
-            # the bias values to use
-            b1_bar, b2_00_bar = self._ib1_bar, self.b2_00_a(self._ib1_bar)
+        return self._Phm(self._ib1_bar, k)
 
-            term1 = b1_bar*self.P00.mu0(k)
-            term2 = b2_00_bar*self.K00(k)
-            term3 = self.bs_bar*self.K00s(k)
-            toret = term1 + term2 + term3
+    def _stochasticity(self, b1, b1_bar, k):
+        """
+        The (type B) stochasticity of two tracers with linear biases
+        `b1` and `b1_bar`, predicted by a Gaussian process
+        """
+        _k = np.logspace(np.log10(self.k.min()), np.log10(self.k.max()), GP_NK)
 
-        return toret
+        params = {'sigma8_z' : self.sigma8_z, 'k':_k}
+        if b1 != b1_bar:
+            b1_1, b1_2 = sorted([b1, b1_bar])
+            toret = self.cross_stochasticity_fits(b1_1=b1_1, b1_2=b1_2, **params)
+        else:
+            toret = self.auto_stochasticity_fits(b1=b1, **params)
 
-    @interpolated_function("_ib1", "_ib1_bar", "z", "sigma8_z", "k", interp="k")
+        return spline(_k, toret)(k)
+
+    @interpolated_function("_ib1", "_ib1_bar", "z", "sigma8_z", "use_gp_tables", "k", interp="k")
     def stochasticity(self, k):
         """
         The isotropic (type B) stochasticity term due to the discreteness of the
@@ -354,16 +403,7 @@ class BiasedSpectrum(DarkMatterSpectrum, NonlinearBiasingMixin):
         *   The model for the (type B) stochasticity, interpolated as a function
             of sigma8(z), b1, and k using a Gaussian process
         """
-        _k = np.logspace(np.log10(self.k.min()), np.log10(self.k.max()), GP_NK)
-
-        params = {'sigma8_z' : self.sigma8_z, 'k':_k}
-        if self._ib1 != self._ib1_bar:
-            b1_1, b1_2 = sorted([self._ib1, self._ib1_bar])
-            toret = self.cross_stochasticity_fits(b1_1=b1_1, b1_2=b1_2, **params)
-        else:
-            toret = self.auto_stochasticity_fits(b1=self._ib1, **params)
-
-        return spline(_k, toret)(k)
+        return self._stochasticity(self._ib1, self._ib1_bar, k)
 
     @cached_property("P00_ss_no_stoch", "stochasticity")
     def P00_ss(self):
@@ -459,25 +499,28 @@ class BiasedSpectrum(DarkMatterSpectrum, NonlinearBiasingMixin):
         from .P04 import P04PowerTerm
         return P04PowerTerm(self)
 
-    @interpolated_function("_ib1", "_ib1_bar", "sigma8_z", "f", "k", interp="k")
-    def mu2_model_correction(self, k):
+    def _model_correction(self, correction, b1, b1_bar, k):
         """
-        The mu2 correction to the model evaluated at `k`
+        Evaluate the simulation-calibrated `correction` at the mean
+        bias of two tracers with linear biases `b1` and `b1_bar`
         """
-        b1, b1_bar = self._ib1, self._ib1_bar
         mean_bias = (b1*b1_bar)**0.5
         params = {'b1':mean_bias, 'sigma8_z':self.sigma8_z, 'k':k, 'f':self.f}
-        return self.Pmu2_correction(**params)
+        return correction(**params)
+
+    @interpolated_function("_ib1", "_ib1_bar", "sigma8_z", "f", "use_gp_tables", "k", interp="k")
+    def mu2_model_correction(self, k):
+        """
+        The mu2 correction to the model evaluated at `k`
+        """
+        return self._model_correction(self.Pmu2_correction, self._ib1, self._ib1_bar, k)
 
-    @interpolated_function("_ib1", "_ib1_bar", "sigma8_z", "f", "k", interp="k")
+    @interpolated_function("_ib1", "_ib1_bar", "sigma8_z", "f", "use_gp_tables", "k", interp="k")
     def mu4_model_correction(self, k):
         """
         The mu4 correction to the model evaluated at `k`
         """
-        b1, b1_bar = self._ib1, self._ib1_bar
-        mean_bias = (b1*b1_bar)**0.5
-        params = {'b1':mean_bias, 'sigma8_z':self.sigma8_z, 'k':k, 'f':self.f}
-        return self.Pmu4_correction(**params)
+        return self._model_correction(self.Pmu4_correction, self._ib1, self._ib1_bar, k)
 
     #---------------------------------------------------------------------------
     # power as a function of mu
@@ -523,3 +566,111 @@ class BiasedSpectrum(DarkMatterSpectrum, NonlinearBiasingMixin):
         from P12_ss, P13_ss, P22_ss.
         """
         return self.P12_ss.mu6(k) + 1./8*self.f**4 * self.I32(k)
+
+    #---------------------------------------------------------------------------
+    # power for arbitrary pairs of biases
+    #---------------------------------------------------------------------------
+    @cached_property("P00", "P01", "P02", "P11", "P12", "P22", "Pdv", "Pvv", "Pdd",
+                     "_Imn", "_Jmn", "_Kmn", "_Imn1Loop_dvdv", "_Imn1Loop_vvdd",
+                     "_power_norm", "power_lin", "f", "k")
+    def bias_basis(self):
+        """
+        The bias-independent spectra entering :func:`P_mu0`, ..., :func:`P_mu6`,
+        evaluated once on the interpolation domain :attr:`k`
+        """
+        from .basis import BiasBasis
+        return BiasBasis(self)
+
+    @cached_property("bias_basis", "use_mean_bias", "use_tidal_bias", "use_Phm_model",
+                     "vel_disp_from_sims", "sigma_v", "sigma8_z", "z", "correct_mu2",
+                     "correct_mu4", "velocity_kurtosis", "b2_00_a", "b2_00_b", "b2_00_c",
+                     "b2_00_d", "b2_01_a", "b2_01_b", "use_gp_tables", lru_cache=True, maxsize=100)
+    def bias_pair_spectra(self):
+        """
+        A function returning the ``mu^0``, ``mu^2``, ``mu^4``, and ``mu^6`` terms
+        of the power spectrum of two tracers with linear biases `b1` and `b1_bar`,
+        as a single spline in `k`
+        """
+        basis = self.bias_basis
+        spline_kwargs = getattr(self, 'spline_kwargs', {})
+
+        def bias_pair_spectra(b1, b1_bar):
+            spl = MultiSpline(basis.k, basis.P_mu(b1, b1_bar), **spline_kwargs)
+            return InterpolatedFunction(spl, 'bias_pair_spectra')
+        return bias_pair_spectra
+
+    @tools.broadcast_kmu
+    def power_for_biases(self, k, mu, b1, b1_bar, flatten=False):
+        """
+        The redshift space power spectrum of two tracers with linear
+        biases `b1` and `b1_bar`, as a function of ``k`` and ``mu``
+
+        This is equal to :func:`power` evaluated with the model biases set to
+        `b1` and `b1_bar`, but the biases of the model are not changed, such
+        that its cached spectra are not recomputed. Instead, the bias-independent
+        spectra in :attr:`bias_basis` are combined for each pair of biases.
+
+        Parameters
+        ----------
+        k : float or array_like
+            The wavenumbers in `h/Mpc` to evaluate the model at
+        mu : float, array_like
+            The mu values to evaluate the power at.
+        b1 : float
+            the linear bias of the first tracer
+        b1_bar : float
+            the linear bias of the second tracer
+        flatten : bool, optional
+            if `True`, return the raveled power array
+        """
+        if self.max_mu > 6:
+            raise NotImplementedError("cannot compute power spectrum including terms with order higher than mu^6")
+
+        pkmu = self._power_for_biases(k, mu, b1, b1_bar)
+        if flatten:
+            pkmu = np.ravel(pkmu, order='F')
+
+        return pkmu
+
+    @tools.alcock_paczynski
+    def _power_for_biases(self, k, mu, b1, b1_bar):
+        """
+        Return the AP-distorted power for the biases `b1` and `b1_bar`
+        """
+        P_mu = self.bias_pair_spectra(b1, b1_bar)(k)
+
+        toret = 0
+        for i in range(self.max_mu//2 + 1):
+            toret += mu**(2*i) * P_mu[i]
+
+        return np.nan_to_num(toret)
+
+    @tools.broadcast_kmu
+    @tools.alcock_paczynski
+    def derivative_k_for_biases(self, k, mu, b1, b1_bar):
+        """
+        Return the derivative of :func:`power_for_biases` with
+        respect to `k`
+        """
+        P_mu = self.bias_pair_spectra(b1, b1_bar)(k, derivative=True)
+
+        toret = 0
+        for i in range(self.max_mu//2 + 1):
+            toret += mu**(2*i) * P_mu[i]
+
+        return toret
+
+    @tools.broadcast_kmu
+    @tools.alcock_paczynski
+    def derivative_mu_for_biases(self, k, mu, b1, b1_bar):
+        """
+        Return the derivative of :func:`power_for_biases` with
+        respect to `mu`
+        """
+        P_mu = self.bias_pair_spectra(b1, b1_bar)(k)
+
+        toret = 0
+        for i in range(1, self.max_mu//2 + 1):
+            toret += (2.*i) * mu**(2*i-1) * P_mu[i]
+
+        return toret
@@ -6,7 +6,7 @@ from scipy.special import legendre
 from scipy.integrate import simps
 
 from pyRSD.rsd._cache import Cache, parameter, interpolated_function, cached_property
-from pyRSD.rsd import cosmology, tools, INTERP_KMIN, INTERP_KMAX, __version__
+from pyRSD.rsd import cosmology, tools, APLock, INTERP_KMIN, INTERP_KMAX, __version__
 from pyRSD import pygcl, numpy as np, data as sim_data, os
 
 from pyRSD.rsd.pt_integrals import PTIntegralsMixin
@@ -23,6 +23,10 @@ class DarkMatterSpectrum(Cache, SimLoaderMixin, PTIntegralsMixin):
     spline = tools.RSDSpline
     spline_kwargs = {'bounds_error' : True, 'fill_value' : 0}
 
+    # attributes built from the other attributes by :func:`_init_derived`,
+    # which are not saved in snapshots
+    _derived_attributes = []
+
     def __init__(self, kmin=1e-3,
                        kmax=0.5,
                        Nk=200,
@@ -36,6 +40,8 @@ class DarkMatterSpectrum(Cache, SimLoaderMixin, PTIntegralsMixin):
                        linear_power_file=None,
                        Pdv_model_type='jennings',
                        redshift_params=['f', 'sigma8_z'],
+                       hzpt_pool='serial',
+                       hzpt_nprocs=None,
                        **kwargs):
         """
         Parameters
@@ -87,6 +93,14 @@ class DarkMatterSpectrum(Cache, SimLoaderMixin, PTIntegralsMixin):
 
         redshift_params : list of str, optional
             the names of parameters to be updated when redshift changes
+
+        hzpt_pool : {'serial', 'process', 'thread'}, optional
+            the type of pool used to compute the interpolation tables of
+            the HZPT models; default is 'serial'
+
+        hzpt_nprocs : int, optional
+            the number of workers used to compute the HZPT tables;
+            default is the number of cores
         """
         # overload cosmo with a cosmo_filename kwargs to handle deprecated syntax
         if 'cosmo_filename' in kwargs:
@@ -110,6 +124,8 @@ class DarkMatterSpectrum(Cache, SimLoaderMixin, PTIntegralsMixin):
         self.k0_low            = k0_low
         self.linear_power_file = linear_power_file
         self.Pdv_model_type    = Pdv_model_type
+        self.hzpt_pool         = hzpt_pool
+        self.hzpt_nprocs       = hzpt_nprocs
         
         # set these last
         self.redshift_params = redshift_params
@@ -149,6 +165,12 @@ class DarkMatterSpectrum(Cache, SimLoaderMixin, PTIntegralsMixin):
             if hasattr(self._cache[k], 'cache_info'):
                 d['_cache'].pop(k)
 
+        # the memo and the shared integrals are only valid for this instance
+        local = ['_memo', '_integrals_store', '_integrals_finalizer']
+        if any(k in d for k in local):
+            d = d.copy()
+            for k in local: d.pop(k, None)
+
         return d
 
     def initialize(self):
@@ -158,22 +180,6 @@ class DarkMatterSpectrum(Cache, SimLoaderMixin, PTIntegralsMixin):
         k = 0.5*(self.kmin+self.kmax)
         return self.power(k, 0.5)
 
-    @contextlib.contextmanager
-    def use_cache(self):
-        """
-        Cache repeated calls to functions defined in this class, assuming
-        constant `k` and `mu` input values
-        """
-        from pyRSD.rsd.tools import cache_on, cache_off
-
-        try:
-            cache_on()
-            yield
-        except:
-            raise
-        finally:
-            cache_off()
-
     #---------------------------------------------------------------------------
     # parameters
     #---------------------------------------------------------------------------
@@ -191,6 +197,7 @@ class DarkMatterSpectrum(Cache, SimLoaderMixin, PTIntegralsMixin):
             else:
                 unset_params.append(k)
         cache = self._cache.copy()
+        version = self.cache_version
 
         # current model params
         model_params = {}
@@ -218,6 +225,9 @@ class DarkMatterSpectrum(Cache, SimLoaderMixin, PTIntegralsMixin):
         for k in cache:
             self._cache[k] = cache[k]
 
+        # the restored state is the saved state, so keep its cache version
+        self._cache_version = version
+
     @contextlib.contextmanager
     def use_spt(self):
         """
@@ -564,17 +574,24 @@ class DarkMatterSpectrum(Cache, SimLoaderMixin, PTIntegralsMixin):
         A 'pygcl.LinearPS' object holding the linear power spectrum at z = 0,
         using the Eisenstein-Hu no-wiggle transfer function
         """
-        cosmo = self.cosmo.clone(tf=pygcl.transfers.EH_NoWiggle)
+        cosmo = pygcl.Cosmology.cached(self.cosmo.GetParams(), pygcl.transfers.EH_NoWiggle)
         return pygcl.LinearPS(cosmo, 0.)
 
-    @cached_property("sigma8_z", "cosmo")
+    @cached_property("cosmo")
+    def _sigma8_0(self):
+        """
+        The sigma_8 of `cosmo`, at z = 0
+        """
+        return self.cosmo.sigma8()
+
+    @cached_property("sigma8_z", "_sigma8_0")
     def _power_norm(self):
         """
         The factor needed to normalize the linear power spectrum
         in `power_lin` to the desired sigma_8, as specified by `sigma8_z`,
         and the desired redshift `z`
         """
-        return (self.sigma8_z / self.cosmo.sigma8())**2
+        return (self.sigma8_z / self._sigma8_0)**2
 
     @cached_property("_power_norm", "_sigma_lin_unnormed")
     def sigma_lin(self):
@@ -640,6 +657,27 @@ class DarkMatterSpectrum(Cache, SimLoaderMixin, PTIntegralsMixin):
             raise ValueError("`Pdv_model_type` must be one of %s" %str(allowed))
         return val
 
+    @parameter(default='serial')
+    def hzpt_pool(self, val):
+        """
+        The type of pool used to compute the interpolation tables of the
+        HZPT models, one of 'serial', 'process', or 'thread'
+        """
+        allowed = ['serial', 'process', 'thread']
+        if val not in allowed:
+            raise ValueError("`hzpt_pool` must be one of %s" %str(allowed))
+        self._update_models('pool', ['hzpt'], val)
+        return val
+
+    @parameter(default=None)
+    def hzpt_nprocs(self, val):
+        """
+        The number of workers used to compute the HZPT tables, or `None`
+        to use the number of cores
+        """
+        self._update_models('nprocs', ['hzpt'], val)
+        return val
+
     @parameter
     def redshift_params(self, val):
         """
@@ -654,7 +692,7 @@ class DarkMatterSpectrum(Cache, SimLoaderMixin, PTIntegralsMixin):
         """
         The class holding the (possibly interpolated) HZPT models
         """
-        kw = {'interpolate':self.interpolate}
+        kw = {'interpolate':self.interpolate, 'pool':self.hzpt_pool, 'nprocs':self.hzpt_nprocs}
         return InterpolatedHZPTModels(self.cosmo, self.sigma8_z, self.f, **kw)
 
     @cached_property("power_lin")
@@ -731,6 +769,36 @@ class DarkMatterSpectrum(Cache, SimLoaderMixin, PTIntegralsMixin):
         from pyRSD.rsd import load_model
         return load_model(filename)
 
+    def to_snapshot(self, path):
+        """
+        Save a snapshot of the model, with its parameters and already
+        computed tables, to the directory ``path``
+
+        See :mod:`pyRSD.rsd.snapshot` for details.
+        """
+        from pyRSD.rsd.snapshot import save_snapshot
+        save_snapshot(self, path)
+
+    def _init_derived(self):
+        """
+        Build the attributes listed in :attr:`_derived_attributes`; this is
+        called on initialization and when loading a snapshot
+        """
+        pass
+
+    @classmethod
+    def from_snapshot(cls, path, mmap=True):
+        """
+        Load a model from the snapshot in the directory ``path``, memory-mapping
+        the stored arrays if ``mmap`` is `True`
+        """
+        from pyRSD.rsd.snapshot import load_snapshot
+        model = load_snapshot(path, mmap=mmap)
+        if not isinstance(model, cls):
+            args = (model.__class__.__name__, cls.__name__)
+            raise ValueError("snapshot holds a %s, not a %s" %args)
+        return model
+
     #---------------------------------------------------------------------------
     # utility functions
     #---------------------------------------------------------------------------
@@ -783,6 +851,17 @@ class DarkMatterSpectrum(Cache, SimLoaderMixin, PTIntegralsMixin):
         allowed = self.__class__.allowable_kwargs
         return {k:getattr(self, k) for k in allowed}
 
+    @property
+    def batch_parameters(self):
+        """
+        The names of the parameters that are broadcast over a batch of
+        parameter sets by :func:`power_batch`
+
+        These parameters do not enter the cached spectra of the model,
+        which are shared by all of the parameter sets in the batch
+        """
+        return ['alpha_par', 'alpha_perp', 'alpha_drag']
+
     def _update_models(self, name, models, val):
         """
         Update the specified attribute for the models given
@@ -1013,7 +1092,93 @@ class DarkMatterSpectrum(Cache, SimLoaderMixin, PTIntegralsMixin):
 
         return pkmu
 
-    def poles(self, k, ells, Nmu=40):
+    def power_batch(self, k, mu, thetas):
+        """
+        Evaluate :func:`power` at the same ``(k, mu)`` pairs for a batch
+        of model parameter sets
+
+        The parameter sets are grouped by the values of the parameters that
+        are not in :attr:`batch_parameters`, i.e., those that change the
+        cached spectra of the model, such as the cosmology. The model is
+        updated once for each group, and the parameters in
+        :attr:`batch_parameters` (e.g., the AP factors, and the biases and
+        FOG velocities of the galaxy model) are broadcast over all of the
+        sets in the group, such that the power is computed for the whole
+        group with array operations on the shared spectra. The state of the
+        model is restored on exit.
+
+        .. note::
+            The growth rate ``f`` and ``sigma8_z`` are not broadcast, since
+            the spectra depend on them nonlinearly; parameter sets with
+            different values of either are evaluated in separate groups
+
+        Parameters
+        ----------
+        k : array_like
+            the wavenumbers in `h/Mpc` to evaluate the model at
+        mu : array_like
+            the mu values to evaluate the model at; must have the same
+            shape as ``k``
+        thetas : list of dict
+            the model parameters for each evaluation
+
+        Returns
+        -------
+        pkmu : array_like, (len(thetas), len(k))
+            the power evaluated for each set of parameters
+        """
+        from collections import OrderedDict
+
+        k = np.asarray(k); mu = np.asarray(mu)
+        if k.ndim != 1 or k.shape != mu.shape:
+            raise ValueError("``k`` and ``mu`` should be 1D arrays of the same length in ``power_batch``")
+
+        # group the parameter sets by the values that are not broadcast
+        names = self.batch_parameters
+        groups = OrderedDict()
+        for i, theta in enumerate(thetas):
+            fixed = tuple(sorted((name, theta[name]) for name in theta if name not in names))
+            groups.setdefault(fixed, []).append(i)
+
+        toret = np.empty((len(thetas), len(k)))
+        with self.preserve(), tools.raw_output():
+            for fixed, index in groups.items():
+                self.update(**dict(fixed))
+
+                # the broadcast parameters, with shape (N, 1)
+                params = {}
+                for name in names:
+                    if any(name in thetas[i] for i in index):
+                        values = [thetas[i].get(name, getattr(self, name)) for i in index]
+                        params[name] = np.array(values, dtype=float)[:, None]
+
+                # the AP-distorted (k, mu) for each parameter set
+                alpha_par, alpha_perp, alpha_drag = [params.get(name, getattr(self, name))
+                                                     for name in ['alpha_par', 'alpha_perp', 'alpha_drag']]
+                ones = np.ones((len(index), 1))
+                k_AP = ones * tools.k_AP(k, mu, alpha_perp, alpha_par)
+                mu_AP = ones * tools.mu_AP(mu, alpha_perp, alpha_par)
+
+                # evaluate with the AP lock, and do the volume rescaling
+                with APLock:
+                    pkmu = self._power_batch(k_AP, mu_AP, params)
+                pkmu = pkmu / (alpha_perp**2 * alpha_par)
+                toret[index] = pkmu * alpha_drag**3
+
+        return toret
+
+    def _power_batch(self, k, mu, params):
+        """
+        Return the power at the AP-distorted ``k`` and ``mu``, which have
+        shape ``(N, len(k))``, for a group of :func:`power_batch`
+
+        ``params`` holds the values of the parameters in
+        :attr:`batch_parameters` for each of the ``N`` parameter sets,
+        as arrays with shape ``(N, 1)``
+        """
+        return np.reshape(self.power(k, mu), k.shape)
+
+    def poles(self, k, ells, Nmu=None, rtol=None):
         """
         The multipole moments of the redshift-space power spectrum
 
@@ -1024,8 +1189,12 @@ class DarkMatterSpectrum(Cache, SimLoaderMixin, PTIntegralsMixin):
         ells : int, array_like
             The `ell` values of the multipole moments
         Nmu : int, optional
-            the number of ``mu`` bins to use when performing the multipole
-            integration
+            the number of Gauss-Legendre nodes in ``mu`` to use when
+            performing the multipole integration
+        rtol : float, optional
+            if provided, choose the number of nodes such that the multipoles
+            are converged to this relative tolerance, starting from ``Nmu``
+            nodes; see :func:`pyRSD.rsd.tools.LegendreProjection.from_accuracy`
 
         Returns
         -------
@@ -1034,6 +1203,14 @@ class DarkMatterSpectrum(Cache, SimLoaderMixin, PTIntegralsMixin):
         """
         from pyRSD.rsd.transfers import MultipoleTransfer
 
+        # choose the number of nodes
+        if rtol is not None:
+            k_ = np.atleast_1d(k)[:,None]
+            with tools.raw_output():
+                power = lambda mu: self.power(k_, mu[None,:])
+                kws = {'rtol':rtol} if Nmu is None else {'rtol':rtol, 'Nmin':Nmu}
+                Nmu = tools.LegendreProjection.from_accuracy(power, ells, **kws).Nmu
+
         # the transfer
         t = MultipoleTransfer(k, ells, Nmu=Nmu)
 
@@ -1077,33 +1254,26 @@ class DarkMatterSpectrum(Cache, SimLoaderMixin, PTIntegralsMixin):
         # return power with transfer applied
         return transfer(P)
 
-    @tools.alcock_paczynski
-    def _P_mu0(self, k, mu):
-        """
-        Return the AP-distorted P[mu^0]
-        """
-        return self.P_mu0(k)
-
-    @tools.alcock_paczynski
-    def _P_mu2(self, k, mu):
+    @interpolated_function("P_mu0", "P_mu2", "P_mu4", "P_mu6", "max_mu", "k", interp="k")
+    def P_mu_terms(self, k):
         """
-        Return the AP-distorted mu^2 P[mu^2]
+        The terms of the power spectrum with mu^0, mu^2, etc. angular dependence,
+        up to ``mu**max_mu``, stored as a single spline such that all of the
+        terms are evaluated at once
         """
-        return mu**2 * self.P_mu2(k)
+        funcs = [self.P_mu0, self.P_mu2, self.P_mu4, self.P_mu6]
+        return tuple(f(k, ignore_cache=True) for f in funcs[:self.max_mu//2+1])
 
     @tools.alcock_paczynski
-    def _P_mu4(self, k, mu):
+    def _P_mu_sum(self, k, mu):
         """
-        Return the AP-distorted mu^4 P[mu^4]
+        Return the AP-distorted sum of mu^(2i) P[mu^(2i)]
         """
-        return mu**4 * self.P_mu4(k)
+        toret = 0
+        for i, P in enumerate(self.P_mu_terms(k)):
+            toret += mu**(2*i) * P
 
-    @tools.alcock_paczynski
-    def _P_mu6(self, k, mu):
-        """
-        Return the AP-distorted mu^6 P[mu^6]
-        """
-        return mu**6 * self.P_mu6(k)
+        return toret
 
     @tools.broadcast_kmu
     @tools.alcock_paczynski
@@ -1113,12 +1283,8 @@ class DarkMatterSpectrum(Cache, SimLoaderMixin, PTIntegralsMixin):
         respect to `k`
         """
         toret = 0
-        funcs = [self.P_mu0, self.P_mu2, self.P_mu4, self.P_mu6]
-
-        i = 0
-        while i <= (self.max_mu//2):
-            toret += mu**(2*i) * funcs[i](k, derivative=True)
-            i += 1
+        for i, P in enumerate(self.P_mu_terms(k, derivative=True)):
+            toret += mu**(2*i) * P
 
         return toret
 
@@ -1130,14 +1296,10 @@ class DarkMatterSpectrum(Cache, SimLoaderMixin, PTIntegralsMixin):
         respect to `mu`
         """
         toret = 0
-        funcs = [self.P_mu0, self.P_mu2, self.P_mu4, self.P_mu6]
-
-        i = 0
-        while i <= (self.max_mu//2):
+        for i, P in enumerate(self.P_mu_terms(k)):
 
             # derivative of mu^(2i)
-            if i != 0: toret += (2.*i) * mu**(2*i-1) * funcs[i](k)
-            i += 1
+            if i != 0: toret += (2.*i) * mu**(2*i-1) * P
 
         return toret
 
@@ -1149,15 +1311,7 @@ class DarkMatterSpectrum(Cache, SimLoaderMixin, PTIntegralsMixin):
         if self.max_mu > 6:
             raise NotImplementedError("cannot compute power spectrum including terms with order higher than mu^6")
 
-        toret = 0
-        funcs = [self._P_mu0, self._P_mu2, self._P_mu4, self._P_mu6]
-
-        i = 0
-        while i <= (self.max_mu//2):
-            toret += funcs[i](k, mu)
-            i += 1
-
-        return np.nan_to_num(toret)
+        return np.nan_to_num(self._P_mu_sum(k, mu))
 
     @tools.monopole
     def monopole(self, k, mu, **kwargs):
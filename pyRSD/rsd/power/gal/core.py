@@ -87,12 +87,22 @@ class TwoHaloTerm(object):
         """
         # save the original biases and set the new ones
         b1, b1_bar = self.model.b1, self.model.b1_bar
+        version = self.model.cache_version
         self.model.b1, self.model.b1_bar = self.b1, self.b2
 
         yield
 
-        # restore the old ones
+        # restore the old ones, and the cache version of the restored state
         self.model.b1, self.model.b1_bar = b1, b1_bar
+        self.model._cache_version = version
+
+    @property
+    def use_bias_basis(self):
+        """
+        Whether to evaluate this term from the bias basis of the model,
+        which is not possible when overriding cached attributes
+        """
+        return self.model.use_bias_basis and not getattr(self.model, '_cache_overrides', None)
 
     @cacheable
     def __call__(self, k, mu):
@@ -100,6 +110,9 @@ class TwoHaloTerm(object):
         Evaluate the two-halo power by calling :func:`power`,
         evaluated at (`k`,`mu`)
         """
+        if self.use_bias_basis:
+            return self.model.power_for_biases(k, mu, self.b1, self.b2)
+
         with self.set_biases():
             return super(self.model.__class__, self.model).power(k, mu)
 
@@ -109,6 +122,9 @@ class TwoHaloTerm(object):
         Evaluate the `k` derivative by calling :func:`derivative_k`,
         evaluated at (`k`,`mu`)
         """
+        if self.use_bias_basis:
+            return self.model.derivative_k_for_biases(k, mu, self.b1, self.b2)
+
         with self.set_biases():
             return super(self.model.__class__, self.model).derivative_k(k, mu)
 
@@ -118,6 +134,9 @@ class TwoHaloTerm(object):
         Evaluate the `mu` derivative by calling :func:`derivative_mu`,
         evaluated at (`k`,`mu`)
         """
+        if self.use_bias_basis:
+            return self.model.derivative_mu_for_biases(k, mu, self.b1, self.b2)
+
         with self.set_biases():
             return super(self.model.__class__, self.model).derivative_mu(k, mu)
 
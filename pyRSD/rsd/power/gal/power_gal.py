@@ -7,6 +7,50 @@ from .fog_kernels import FOGKernel
 from . import Pgal
 
 
+class _GalaxyBatch(object):
+    """
+    A view of a :class:`GalaxySpectrum`, where the parameters in ``params``
+    are arrays of shape ``(N, 1)`` holding the values for a batch of
+    parameter sets, which are broadcast when evaluating the galaxy power
+    terms; all other attributes are those of the model
+    """
+    def __init__(self, model, params):
+        self._model = model
+        for name in params:
+            setattr(self, name, params[name])
+
+    def __getattr__(self, name):
+        if name == '_model':
+            raise AttributeError(name)
+        return getattr(self._model, name)
+
+    def FOG(self, k, mu, sigma):
+        """
+        The FOG kernel of the model, keeping the batch dimension
+        """
+        return np.reshape(self._model.FOG(k, mu, sigma), np.shape(k))
+
+    def power_for_biases(self, k, mu, b1, b1_bar):
+        """
+        The two-halo power given by :func:`power_for_biases` of the model,
+        where each row of ``k`` and ``mu`` is evaluated with the biases
+        of the corresponding parameter set
+        """
+        N = np.shape(k)[0]
+        b1 = np.broadcast_to(b1, (N, 1))[:, 0]
+        b1_bar = np.broadcast_to(b1_bar, (N, 1))[:, 0]
+
+        # evaluate once for each distinct pair of biases
+        pairs, index = np.unique(np.column_stack([b1, b1_bar]), axis=0, return_inverse=True)
+        index = np.ravel(index)
+
+        toret = np.empty(np.shape(k))
+        for i, (b, b_bar) in enumerate(pairs):
+            rows = index == i
+            toret[rows] = np.reshape(self._model.power_for_biases(k[rows], mu[rows], b, b_bar), k[rows].shape)
+        return toret
+
+
 class GalaxySpectrum(BiasedSpectrum):
     """
     The model for the galaxy redshift space power spectrum
@@ -69,7 +113,19 @@ class GalaxySpectrum(BiasedSpectrum):
         Boost the centrals auto spectrum with a correction
         accounting for extra structure around centrals due
         to SO halo finders; default is `False`
+
+    use_bias_basis : bool, optional
+        Evaluate the two-halo terms by combining bias-independent spectra,
+        computed once, rather than by recomputing the spectra of the model
+        for each pair of linear biases; default is `True`
+
+    use_gp_tables : bool, optional
+        Interpolate the predictions of the simulation-calibrated Gaussian
+        processes from tables on regular grids, which are computed once
+        and saved to disk, rather than evaluating the Gaussian processes
+        each time `b1`, `sigma8_z`, or `f` change; default is `False`
     """
+    _derived_attributes = ['_Pgal']
 
     def __init__(self, fog_model='modified_lorentzian',
                  use_so_correction=False,
@@ -97,7 +153,7 @@ class GalaxySpectrum(BiasedSpectrum):
         super(GalaxySpectrum, self).__init__(**kwargs)
 
         # the underlying driver
-        self._Pgal = Pgal(self)
+        self._init_derived()
 
         # set the defaults
         self.fog_model = fog_model
@@ -122,6 +178,13 @@ class GalaxySpectrum(BiasedSpectrum):
         self.f_so = 0.
         self.sigma_so = 0.
 
+    def _init_derived(self):
+        """
+        Build the driver of the galaxy power spectrum terms
+        """
+        super(GalaxySpectrum, self)._init_derived()
+        self._Pgal = Pgal(self)
+
     def default_params(self):
         """
         A GalaxyPowerParameters object holding the default model parameters
@@ -131,6 +194,23 @@ class GalaxySpectrum(BiasedSpectrum):
         from pyRSD.rsdfit.theory import GalaxyPowerParameters
         return GalaxyPowerParameters.from_defaults(model=self)
 
+    @property
+    def batch_parameters(self):
+        """
+        The names of the parameters that are broadcast over a batch of
+        parameter sets by :func:`power_batch`
+
+        The fractions, biases, FOG velocities and one-halo amplitudes are
+        only broadcast when the two-halo terms are evaluated from the
+        bias basis of the model
+        """
+        toret = super(GalaxySpectrum, self).batch_parameters
+        if self.use_bias_basis and not getattr(self, '_cache_overrides', None):
+            toret = toret + ['fs', 'fcB', 'fsB', 'b1_cA', 'b1_cB', 'b1_sA', 'b1_sB',
+                             'sigma_c', 'sigma_sA', 'sigma_sB', 'NcBs', 'NsBsB',
+                             'N', 'f_so', 'sigma_so']
+        return toret
+
     #---------------------------------------------------------------------------
     # parameters
     #---------------------------------------------------------------------------
@@ -320,6 +400,17 @@ class GalaxySpectrum(BiasedSpectrum):
         toret = self._Pgal['Pcc'](k, mu)
         return toret if not flatten else np.ravel(toret, order='F')
 
+    @tools.cacheable
+    def Pgal_cc_no_fog(self, k, mu):
+        """
+        The auto power spectrum of all centrals, without the FOG damping
+        and the SO correction, as needed by the ``sigma_c`` and ``sigma_so``
+        derivatives
+        """
+        with self.preserve(use_so_correction=False):
+            self.sigma_c = 0.
+            return self.Pgal_cc(k, mu)
+
     #---------------------------------------------------------------------------
     # central-satellite cross spectrum
     #---------------------------------------------------------------------------
@@ -401,6 +492,7 @@ class GalaxySpectrum(BiasedSpectrum):
     #---------------------------------------------------------------------------
     # total galaxy P(k,mu)
     #---------------------------------------------------------------------------
+    @tools.cacheable
     @tools.broadcast_kmu
     @tools.alcock_paczynski
     def power(self, k, mu, flatten=False):
@@ -424,6 +516,21 @@ class GalaxySpectrum(BiasedSpectrum):
         toret = self._Pgal(k, mu)
         return toret if not flatten else np.ravel(toret, order='F')
 
+    def _power_batch(self, k, mu, params):
+        """
+        Return the power at the AP-distorted ``k`` and ``mu``, which have
+        shape ``(N, len(k))``, for a group of :func:`power_batch`
+
+        The galaxy power terms are evaluated once for the whole group,
+        with the parameters in ``params`` broadcast over the first axis
+        """
+        if not self.use_bias_basis or getattr(self, '_cache_overrides', None):
+            return super(GalaxySpectrum, self)._power_batch(k, mu, params)
+
+        toret = Pgal(_GalaxyBatch(self, params))(k, mu)
+        return np.broadcast_to(toret, k.shape)
+
+    @tools.cacheable
     @tools.broadcast_kmu
     @tools.alcock_paczynski
     def derivative_k(self, k, mu):
@@ -432,6 +539,7 @@ class GalaxySpectrum(BiasedSpectrum):
         """
         return self._Pgal.derivative_k(k, mu)
 
+    @tools.cacheable
     @tools.broadcast_kmu
     @tools.alcock_paczynski
     def derivative_mu(self, k, mu):
@@ -1,8 +1,13 @@
 import numpy
 import logging
 import functools
+import time
 import abc
 from six import add_metaclass
+from pyRSD.rsd.tools import raw_output
+
+# the number of return values memoized while computing the gradient
+MEMO_SIZE = 1024
 
 @add_metaclass(abc.ABCMeta)
 class PkmuDerivative(object):
@@ -25,7 +30,7 @@ class PkmuDerivative(object):
     def eval(model, pars, k, mu):
         pass
 
-def compute(registry, name, m, pars, k, mu):
+def compute(registry, name, m, pars, k, mu, memo=None):
     """
     Compute the total derivative of `Pgal` with
     respect to the input parameter `name`
@@ -44,7 +49,15 @@ def compute(registry, name, m, pars, k, mu):
         the array of `k` values to evaluate the derivative at
     mu : array_like
         the array of `mu` values to evaluate the derivative at
+    memo : dict, optional
+        a dictionary of total derivatives that have already been computed
+        at these `k` and `mu` values; if provided, the result is added
+        to it, such that constraint children shared by several parameters
+        are only evaluated once
     """
+    if memo is not None and name in memo:
+        return memo[name]
+
     if name not in set(pars.valid_model_params)|set(pars.free_names):
         logging.debug("ignoring parameter '%s'" %name)
         if numpy.isscalar(k):
@@ -68,27 +81,87 @@ def compute(registry, name, m, pars, k, mu):
         childpar = pars[child]
 
         # compute dPkmu/dchild
-        a = compute(registry, child, m, pars, k, mu)
+        a = compute(registry, child, m, pars, k, mu, memo=memo)
         if numpy.count_nonzero(a):
 
             # this is dchild/dpar
             b = pars.constraint_derivative(child, name)
             logging.debug("  adding dPkmu/d{child} * d{child}/d{name}".format(child=child, name=name))
-            dPkmu_dpar += a*b
+            dPkmu_dpar = dPkmu_dpar + a*b
 
+    if memo is not None:
+        memo[name] = dPkmu_dpar
     return dPkmu_dpar
 
+def compute_all(registry, names, m, pars, k, mu):
+    """
+    Compute the total derivatives of `Pgal` with respect to all of
+    the parameters in `names` in a single pass
+
+    Each registered derivative is evaluated at most once, and the
+    derivatives of constrained parameters are shared by all of the
+    parameters they depend on. The derivatives are evaluated in a single
+    :func:`use_cache` context of the model, such that the terms common to
+    several derivatives, i.e., :func:`power`, :func:`derivative_k`, and
+    :func:`derivative_mu` for the AP parameters and the ``Pgal_cc``,
+    ``Pgal_cs``, and ``Pgal_ss`` pieces, are only computed once.
+
+    Parameters
+    ----------
+    registry : dict
+        the dictionary of available analytic derivatives
+    names : list of str
+        the parameters to compute the derivatives with respect to
+    m : subclass of DarkMatterSpectrum
+        the RSD model instance
+    pars : ParameterSet
+        the theory parameters
+    k : array_like
+        the array of `k` values to evaluate the derivatives at
+    mu : array_like
+        the array of `mu` values to evaluate the derivatives at
+
+    Returns
+    -------
+    list :
+        the derivatives, in the same order as `names`
+    """
+    memo = {}
+    with m.use_cache(maxsize=MEMO_SIZE):
+        return [compute(registry, name, m, pars, k, mu, memo=memo) for name in names]
+
+def dependencies(registry, name, pars):
+    """
+    Return the set of parameters whose registered derivatives are needed to
+    compute the total derivative with respect to `name`
+    """
+    if name not in set(pars.valid_model_params)|set(pars.free_names):
+        return set()
+
+    toret = set([name])
+    for child in pars[name].children:
+        toret |= dependencies(registry, child, pars)
+    return toret
+
 def _call_power_from_driver(k, mu, theta):
     """
     Update the model and call power(k,mu) from the global driver
     instance
 
-    This is defined at the module level so we can pickle it
+    This is defined at the module level so we can pickle it; ``k``
+    and ``mu`` can be :class:`~pyRSD.rsdfit.util.shared_state.SharedArray`
+    handles, such that the arrays are not pickled with each task
     """
     from pyRSD.rsdfit import GlobalFittingDriver
+    from pyRSD.rsdfit.util import shared_state
+
+    # k and mu may be handles to arrays in shared memory
+    k, mu = shared_state.resolve(k), shared_state.resolve(mu)
+
     driver = GlobalFittingDriver.get()
     driver.theory.set_free_parameters(theta)
-    return driver.model.power(k, mu)
+    with raw_output():
+        return driver.model.power(k, mu)
 
 class PkmuGradient(object):
     """
@@ -116,17 +189,69 @@ class PkmuGradient(object):
     def _find_numerical(self):
         """
         Internal function to determine which derivatives require a
-        numerical derivative
+        numerical derivative, recording the result in :attr:`coverage`
         """
         self.numerical_names   = []
         self.numerical_indices = []
-        for i, name in enumerate(self.pars.free_names):
-            try:
-                d = compute(self.registry, name, self.model, self.pars, 0.05, 0.5)
-            except Exception as e:
-                logging.info("analytic derivative for parameter '%s' not available; %s" %(name, str(e)))
-                self.numerical_names.append(name)
-                self.numerical_indices.append(i)
+        self.coverage = {}
+
+        k, mu = numpy.array([0.05]), numpy.array([0.5])
+        with self.model.use_cache(maxsize=MEMO_SIZE), raw_output():
+
+            # the cost of a single power evaluation
+            start = time.perf_counter()
+            self.model.power(k, mu)
+            power_time = time.perf_counter() - start
+
+            memo = {}
+            for i, name in enumerate(self.pars.free_names):
+                info = {}
+                try:
+                    start = time.perf_counter()
+                    compute(self.registry, name, self.model, self.pars, k, mu, memo=memo)
+                    info['method'] = 'analytic'
+                    info['evaluations'] = len(dependencies(self.registry, name, self.pars))
+                    info['time'] = time.perf_counter() - start
+                except Exception as e:
+                    logging.info("analytic derivative for parameter '%s' not available; %s" %(name, str(e)))
+                    self.numerical_names.append(name)
+                    self.numerical_indices.append(i)
+                    info['method'] = 'numerical'
+                    info['reason'] = str(e)
+                    info['evaluations'] = 2
+                    info['time'] = 2 * power_time
+                self.coverage[name] = info
+
+        logging.info(self.coverage_report())
+
+    def coverage_report(self):
+        """
+        Return a string summarizing which free parameters have analytic
+        derivatives and which require finite differences
+
+        The cost of each parameter is given as the number of registered
+        derivatives evaluated (analytic) or the number of calls to
+        :func:`power` (numerical), as well as the time measured at
+        construction. Analytic derivatives shared between parameters
+        via constraints are only timed for the first parameter that
+        requires them.
+        """
+        nanalytic = len(self.pars.free_names) - len(self.numerical_names)
+        lines = ["P(k,mu) gradient: %d analytic, %d numerical derivatives" %(nanalytic, len(self.numerical_names))]
+        for name in self.pars.free_names:
+            info = self.coverage[name]
+            if info['method'] == 'analytic':
+                cost = "%d derivative evaluation(s)" %info['evaluations']
+            else:
+                cost = "%d power evaluations" %info['evaluations']
+            line = "  %-20s %-10s %s, %.2e s" %(name, info['method'], cost, info['time'])
+            if 'reason' in info:
+                line += " (%s)" %info['reason']
+            lines.append(line)
+
+        if len(self.numerical_names):
+            lines.append("numerical derivatives are evaluated serially unless a pool is passed")
+        return "\n".join(lines)
 
     def __call__(self, k, mu, theta, epsilon=1e-4, pool=None, numerical=False):
         """
@@ -163,18 +288,19 @@ class PkmuGradient(object):
         toret = numpy.zeros((len(theta), len(k)))
 
         if pool is not None:
-            self._call_power_mpi = functools.partial(_call_power_from_driver, k, mu)
+            from pyRSD.rsdfit.util import shared_state
+            args = (shared_state.handle(k), shared_state.handle(mu))
+            self._call_power_mpi = functools.partial(_call_power_from_driver, *args)
 
         # cache results for speed
-        with self.model.use_cache():
-
-            # loop over each free parameter
-            for i, name in enumerate(self.pars.free_names):
-                if numerical or name in self.numerical_names:
-                    continue
+        with self.model.use_cache(maxsize=MEMO_SIZE), raw_output():
 
-                # the analytic derivative
-                toret[i] = compute(self.registry, name, self.model, self.pars, k, mu)[:]
+            # the analytic derivatives, evaluated in a single pass
+            if not numerical:
+                ii = [i for i in range(len(theta)) if i not in self.numerical_indices]
+                names = [self.pars.free_names[i] for i in ii]
+                for i, d in zip(ii, compute_all(self.registry, names, self.model, self.pars, k, mu)):
+                    toret[i] = d
 
         # compute numerical derivatives
         # the increments to take
@@ -221,4 +347,5 @@ class PkmuGradient(object):
         """
         # update the parameters
         self._update(theta)
-        return self.model.power(k, mu).values # return numpy array, not DataArray
+        with raw_output():
+            return self.model.power(k, mu)
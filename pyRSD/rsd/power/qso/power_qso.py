@@ -164,6 +164,14 @@ class QuasarSpectrum(HaloSpectrum):
         """
         return val
 
+    @property
+    def batch_parameters(self):
+        """
+        The names of the parameters that are broadcast over a batch of
+        parameter sets by :func:`power_batch`
+        """
+        return super(QuasarSpectrum, self).batch_parameters + ['sigma_fog', 'N']
+
     @cached_property("fog_model")
     def FOG(self):
         """
@@ -251,6 +259,16 @@ class QuasarSpectrum(HaloSpectrum):
         """
         return k*0.
 
+    @interpolated_function("P_mu0", "P_mu2", "P_mu4", "P_mu6", "max_mu")
+    def P_mu_terms(self, k):
+        """
+        The terms of the Kaiser formula, stored as a single spline on
+        the same domain as :func:`P_mu0`, etc.
+        """
+        funcs = [self.P_mu0, self.P_mu2, self.P_mu4, self.P_mu6]
+        return tuple(f(k, ignore_cache=True) for f in funcs[:self.max_mu//2+1])
+
+    @tools.cacheable
     @tools.broadcast_kmu
     @tools.alcock_paczynski
     def power(self, k, mu, flatten=False):
@@ -288,6 +306,25 @@ class QuasarSpectrum(HaloSpectrum):
             pkmu = np.ravel(pkmu, order='F')
         return pkmu
 
+    def _power_batch(self, k, mu, params):
+        """
+        Return the power at the AP-distorted ``k`` and ``mu``, which have
+        shape ``(N, len(k))``, for a group of :func:`power_batch`
+
+        The FOG damping and shot noise offset are broadcast over the
+        first axis for the values of ``sigma_fog`` and ``N`` in ``params``
+        """
+        # the linear kaiser P(k,mu)
+        pkmu = np.reshape(super(QuasarSpectrum, self).power(k, mu), k.shape)
+
+        # add FOG damping
+        G = np.reshape(self.FOG(k, mu, params.get('sigma_fog', self.sigma_fog)), k.shape)
+        pkmu = pkmu * G**2
+
+        # add shot noise offset
+        return pkmu + params.get('N', self.N)
+
+    @tools.cacheable
     @tools.broadcast_kmu
     @tools.alcock_paczynski
     def derivative_k(self, k, mu):
@@ -302,6 +339,7 @@ class QuasarSpectrum(HaloSpectrum):
 
         return G**2 * deriv + 2 * G*Gprime * power
 
+    @tools.cacheable
     @tools.broadcast_kmu
     @tools.alcock_paczynski
     def derivative_mu(self, k, mu):
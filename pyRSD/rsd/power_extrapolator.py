@@ -4,7 +4,6 @@ import scipy.optimize as opt
 from .. import numpy as np
 from . import tools
 from ._cache import Cache, parameter, cached_property
-from ._interpolate import RegularGridInterpolator
 
 #------------------------------------------------------------------------------
 # extrapolation function
@@ -26,7 +25,93 @@ def power_law_extrapolation(x, alpha, beta=0.):
         the variable power-law slope, default is `0`
     """
     return x**(alpha + beta*np.log10(x))
-    
+
+def fit_power_law(x, y, amplitude, fit_beta=True, niter=10, rtol=1e-10):
+    """
+    Least-squares fit of :func:`power_law_extrapolation` to several
+    data sets at once, which share the same independent variable
+
+    The model for column `i` of ``y`` is
+    ``amplitude[i] * power_law_extrapolation(x, alpha[i], beta[i])``.
+    The fit is linear in log space, which provides the starting point for
+    vectorized Gauss-Newton iterations minimizing the residuals in linear
+    space, as :func:`scipy.optimize.curve_fit` would. Samples equal to zero
+    are excluded from the log-space fit, and :func:`scipy.optimize.curve_fit`
+    is used for any data set where the iterations do not give a finite result
+
+    Parameters
+    ----------
+    x : array_like, (N,)
+        the (normalized) array of independent variables
+    y : array_like, (N, M)
+        the data, with one data set per column
+    amplitude : float, array_like (M,)
+        the amplitude of the power law for each data set
+    fit_beta : bool, optional (`True`)
+        whether to fit for the variable slope `beta`; if `False`, only
+        `alpha` is fit and `beta` is zero
+    niter : int, optional (`10`)
+        the maximum number of Gauss-Newton iterations
+    rtol : float, optional (`1e-10`)
+        stop iterating when the relative update of the parameters is
+        smaller than this value
+
+    Returns
+    -------
+    params : array_like, (M, 2) or (M, 1)
+        the best-fit ``(alpha, beta)``, or ``alpha``, for each data set
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float).reshape(len(x), -1)
+    amplitude = np.broadcast_to(amplitude, y.shape[1]).astype(float)
+
+    # the design matrix: ln f = alpha*ln(x) + beta*log10(x)*ln(x)
+    lnx = np.log(x)
+    X = np.column_stack([lnx, np.log10(x)*lnx]) if fit_beta else lnx[:,None]
+
+    # linear least-squares in log space for all data sets at once
+    with np.errstate(divide='ignore'):
+        lny = np.log(abs(y/amplitude))
+    valid = np.isfinite(lny)
+    full = valid.all(axis=0)
+    params = np.zeros((y.shape[1], X.shape[1]))
+    if full.any():
+        params[full] = np.linalg.lstsq(X, lny[:,full], rcond=None)[0].T
+
+    # data sets with zeros only use their non-zero samples
+    for i in np.nonzero(~full)[0]:
+        v = valid[:,i]
+        if v.sum() >= X.shape[1]:
+            params[i] = np.linalg.lstsq(X[v], lny[v,i], rcond=None)[0]
+
+    # Gauss-Newton in linear space
+    with np.errstate(over='ignore', invalid='ignore'):
+        for i in range(niter):
+            model = amplitude * np.exp(np.dot(X, params.T))
+            J = model.T[...,None] * X[None]
+            JTJ = np.einsum('mni,mnj->mij', J, J)
+            JTr = np.einsum('mni,nm->mi', J, y - model)
+            try:
+                delta = np.linalg.solve(JTJ, JTr[...,None])[...,0]
+            except np.linalg.LinAlgError:
+                # singular for some data set; the failed ones stay NaN
+                ok = np.isfinite(JTJ).all(axis=(1,2)) & np.isfinite(JTr).all(axis=1)
+                delta = np.full_like(JTr, np.nan)
+                delta[ok] = np.einsum('mij,mj->mi', np.linalg.pinv(JTJ[ok]), JTr[ok])
+            params = params + delta
+            if np.all(abs(delta) <= rtol*(abs(params) + rtol)):
+                break
+
+    # fall back to curve_fit for any data set where the iterations failed
+    for i in np.nonzero(~np.isfinite(params).all(axis=1))[0]:
+        f = lambda x, *p: amplitude[i]*power_law_extrapolation(x, *p)
+        try:
+            params[i] = opt.curve_fit(f, x, y[:,i], p0=np.zeros(X.shape[1]))[0]
+        except (RuntimeError, ValueError) as e:
+            raise ValueError("cannot fit a power law to data set %d: %s" %(i, str(e)))
+
+    return params
+
 
 #------------------------------------------------------------------------------
 class ExtrapolatedPowerSpectrum(Cache):
@@ -156,73 +241,43 @@ class ExtrapolatedPowerSpectrum(Cache):
         """
         return np.linspace(0, 1., 100)
         
-    @cached_property("_ks", "_mus")
-    def _grid(self):
-        """
-        The (k,mu) grid for interpolating -- stacked such that
-        the output shape is (Nk, Nmu, 2)
-        """
-        ks, mus = np.broadcast_arrays(self._ks[:,None], self._mus[None,:])
-        return np.dstack([ks, mus])
-      
-    @cached_property("_ks", "_mus")
-    def _power_spline(self):
-        """
-        The interpolating for ``model.Pgal``, interpolated using the (k,mu) grid
-        """  
-        power = self.model.Pgal(self._ks, self._mus)
-        f = RegularGridInterpolator([self._ks, self._mus], power)
-        return f
-        
-    @cached_property("k_hi", "kcut_hi", "_grid")
+    @cached_property("_ks", "_mus", "model_func")
+    def _power_grid(self):
+        """
+        The model power evaluated on the (k,mu) grid, with shape (Nk, Nmu)
+        """
+        return self._model_power(self._ks[:,None], self._mus[None,:])
+
+    @cached_property("k_hi", "kcut_hi", "_power_grid")
     def _high_k_splines(self):
         """
         The splines for ``(alpha, beta)`` vs `_mus` for the high-k extrapolation
         """
         mask = (self._ks >= self.kcut_hi)
-        params = []
-        for i, mu in enumerate(self._mus):
-            
-            # define the objective function for this mu
-            amplitude = self._power_spline([self.k_hi, mu])[0]
-            objective = lambda x, alpha, beta: amplitude * power_law_extrapolation(x, alpha, beta)
-            
-            # normalized x and y values
-            x = self._ks[mask]/self.k_hi
-            y = self._power_spline(self._grid[mask, i, :])
-            
-            # do the fit
-            popt, pcov = opt.curve_fit(objective, x, y)
-            params.append(popt)
-            
-        params = np.asarray(params)
-        toret = []
-        for p in params.T:
-            toret.append(spline(self._mus, p))
-        return toret
-    
-    @cached_property("k_lo", "kcut_lo", "_grid")
-    def _low_k_splines(self):
+        amplitude = self._model_power(self.k_hi, self._mus)
+        params = fit_power_law(self._ks[mask]/self.k_hi, self._power_grid[mask], amplitude)
+        return [spline(self._mus, p) for p in params.T]
 
+    @cached_property("k_lo", "kcut_lo", "_power_grid")
+    def _low_k_splines(self):
+        """
+        The spline for ``alpha`` vs `_mus` for the low-k extrapolation
+        """
         mask = (self._ks <= self.kcut_lo)
-        params = []
-        for i, mu in enumerate(self._mus):
+        amplitude = self._model_power(self.k_lo, self._mus)
+        params = fit_power_law(self._ks[mask]/self.k_lo, self._power_grid[mask], amplitude, fit_beta=False)
+        return spline(self._mus, params[:,0])
 
-            # define the objective function for this mu
-            amplitude = self._power_spline([self.k_lo, mu])[0] 
-            objective = lambda x, alpha: amplitude * power_law_extrapolation(x, alpha, beta=0)
-            
-            # normalized x and y values
-            x = self._ks[mask]/self.k_lo
-            y = self._power_spline(self._grid[mask, i, :])
-            
-            # do the fit
-            popt, pcov = opt.curve_fit(objective, x, y)
-            params.append(popt)
+    def _model_power(self, k, mu):
+        """
+        Evaluate ``model_func`` of the model, returning a numpy array
+        of the broadcasted shape of (k, mu)
+        """
+        shape = np.broadcast(k, mu).shape
+        with tools.raw_output():
+            toret = getattr(self.model, self.model_func)(k, mu)
+        return np.reshape(toret, shape)
 
-        params = np.asarray(params)
-        return spline(self._mus, params[:,0])
-                    
     #------------------------------------------------------------------------------
     # the main functions
     #------------------------------------------------------------------------------
@@ -272,46 +327,39 @@ class ExtrapolatedPowerSpectrum(Cache):
         if lo_idx.sum():
             alpha = self.low_k_params(mu[lo_idx])
             x = k[lo_idx]/self.k_lo
-            toret[lo_idx] = self.model.Pgal(self.k_lo, mu[lo_idx]) * power_law_extrapolation(x, alpha)
+            toret[lo_idx] = self._model_power(self.k_lo, mu[lo_idx]) * power_law_extrapolation(x, alpha)
          
         # mid k  
         if mid_idx.sum():
-            toret[mid_idx] = np.squeeze(self.model.Pgal(k[mid_idx], mu[mid_idx]))
+            toret[mid_idx] = self._model_power(k[mid_idx], mu[mid_idx])
         
         # high k
         if hi_idx.sum():
             alpha, beta = self.high_k_params(mu[hi_idx])
             x = k[hi_idx]/self.k_hi
-            toret[hi_idx] = self.model.Pgal(self.k_hi, mu[hi_idx]) * power_law_extrapolation(x, alpha, beta)
+            toret[hi_idx] = self._model_power(self.k_hi, mu[hi_idx]) * power_law_extrapolation(x, alpha, beta)
 
         return toret
         
-    def to_poles(self, k, ells, Nmu=41, flatten=False):
+    def to_poles(self, k, ells, Nmu=None, flatten=False):
         """
         Compute the multipoles by integrating over the extrapolated
-        power spectrum
+        power spectrum, using Gauss-Legendre quadrature with ``Nmu``
+        nodes (see :class:`~pyRSD.rsd.tools.LegendreProjection`)
         """
-        from scipy.special import legendre
-        from scipy.integrate import simps
-        
         scalar = np.isscalar(ells)
         if scalar: ells = [ells]
-    
-        mus = np.linspace(0., 1., Nmu)
-        pkmu = self(k, mus)
-    
+
+        proj = tools.LegendreProjection(ells, Nmu=Nmu)
+        k = np.atleast_1d(k)
+        with tools.raw_output():
+            pkmu = np.reshape(self(k[:,None], proj.mu[None,:]), (len(k), proj.Nmu))
+
         if len(ells) != len(k):
-            toret = []
-            for ell in ells:
-                kern = (2*ell+1.)*legendre(ell)(mus)
-                val = np.array([simps(kern*d, x=mus) for d in pkmu])
-                toret.append(val)
-                      
+            toret = proj(pkmu)
             if scalar:
-                return toret[0]
+                return toret[:,0]
             else:
-                toret = np.vstack(toret).T
                 return toret if not flatten else np.ravel(toret, order='F')
         else:
-            kern = np.asarray([(2*ell+1.)*legendre(ell)(mus) for ell in ells])
-            return np.array([simps(d, x=mus) for d in kern*pkmu])
\ No newline at end of file
+            return proj.diagonal(pkmu)
\ No newline at end of file
@@ -0,0 +1,372 @@
+"""
+Taylor expansion of the PT integrals in the cosmological parameters, such
+that cosmology-varying fits do not recompute the integrals
+"""
+from .. import pygcl, numpy as np
+from ._cache import Cache, parameter, cached_property
+from .pt_integrals import PTIntegralsMixin
+from .tools import get_hash_key, can_fork
+from ._disk_cache import DiskCache
+from . import _disk_cache, cosmology, __version__
+
+import itertools
+import os
+import warnings
+
+# the disk cache holding the expansion tables
+_tables_cache = DiskCache('pt_expansion')
+
+# the expanded terms: the unnormalized integrals, the 1-loop spectra and the velocity kurtosis
+ONE_LOOP_SPECTRA = ['_Pdd_0', '_Pdv_0', '_Pvv_0']
+EXPANDED_TERMS = sorted(name for name in dir(PTIntegralsMixin) if name.startswith('_unnormalized_'))
+EXPANDED_TERMS += ONE_LOOP_SPECTRA + ['_unnormed_velocity_kurtosis']
+
+# the 1-loop integrals return the linear, cross, and 1-loop terms
+ONE_LOOP_INTEGRALS = ('_unnormalized_Ivvdd', '_unnormalized_Idvdv', '_unnormalized_Ivvvv')
+
+class IntegralsEvaluator(Cache, PTIntegralsMixin):
+    """
+    Class to evaluate the terms in :data:`EXPANDED_TERMS` for a single
+    cosmology, without sharing the integrals with other models
+
+    Parameters
+    ----------
+    cosmo : pygcl.Cosmology
+        the cosmology
+    k_interp : array_like
+        the wavenumbers to evaluate the integrals at
+    """
+    share_integrals = False
+
+    def __init__(self, cosmo, k_interp):
+        self.k_interp = k_interp
+        self.cosmo = cosmo
+        PTIntegralsMixin.__init__(self)
+
+    @parameter
+    def cosmo(self, val):
+        """
+        The `pygcl.Cosmology` object
+        """
+        return val
+
+    @cached_property("cosmo")
+    def power_lin(self):
+        """
+        A 'pygcl.LinearPS' object holding the linear power spectrum at z = 0
+        """
+        return pygcl.LinearPS(self.cosmo, 0.)
+
+    @cached_property()
+    def _power_norm(self):
+        """
+        Unity; the expanded terms are not normalized
+        """
+        return 1.
+
+    def terms(self):
+        """
+        Return the flattened values of all terms in :data:`EXPANDED_TERMS`
+        """
+        k = self.k_interp
+        toret = []
+        for name in EXPANDED_TERMS:
+            if name in ONE_LOOP_SPECTRA:
+                val = getattr(self, name)(k)
+            elif name == '_unnormed_velocity_kurtosis':
+                val = self._unnormed_velocity_kurtosis
+            else:
+                val = getattr(self, name)(k, ignore_cache=True)
+            toret.append(np.ravel(val))
+        return np.concatenate(toret)
+
+def evaluate_expansion_terms(args):
+    """
+    Evaluate the terms in :data:`EXPANDED_TERMS` for several cosmologies
+
+    Parameters
+    ----------
+    args : tuple
+        tuple of the list of :class:`~pyRSD.rsd.cosmology.Cosmology` objects,
+        the integer transfer function type, and the ``k`` values
+
+    Returns
+    -------
+    toret : array_like, (len(params), N)
+        the flattened terms for each cosmology
+    """
+    params, transfer, k = args
+    toret = []
+    for p in params:
+        evaluator = IntegralsEvaluator(p.to_class(transfer=transfer, cache=False), k)
+        toret.append(evaluator.terms())
+    return np.array(toret)
+
+def compute_expansion_tables(params, transfer, k, pool='process', nprocs=None):
+    """
+    Evaluate the terms in :data:`EXPANDED_TERMS` for several cosmologies,
+    splitting the cosmologies between a pool of workers
+
+    Parameters
+    ----------
+    params : list of :class:`~pyRSD.rsd.cosmology.Cosmology`
+        the cosmologies
+    transfer : int
+        the integer transfer function type, see ``pygcl.transfers``
+    k : array_like
+        the wavenumbers
+    pool : {'process', 'thread', 'serial'}, optional
+        the type of pool; process pools fall back to serial evaluation
+        in pool workers and MPI ranks
+    nprocs : int, optional
+        the number of workers; default is the number of cores
+
+    Returns
+    -------
+    toret : array_like, (len(params), N)
+        the flattened terms for each cosmology
+    """
+    if nprocs is None:
+        nprocs = os.cpu_count() or 1
+    nprocs = min(nprocs, len(params))
+    if pool == 'process' and not can_fork():
+        pool = 'serial'
+    if pool == 'serial' or nprocs == 1:
+        return evaluate_expansion_terms((params, transfer, k))
+
+    if pool == 'process':
+        from concurrent.futures import ProcessPoolExecutor as Executor
+    elif pool == 'thread':
+        from concurrent.futures import ThreadPoolExecutor as Executor
+    else:
+        raise ValueError("pool type should be one of ['process', 'thread', 'serial'], not '%s'" %pool)
+
+    chunks = [list(c) for c in np.array_split(np.arange(len(params)), nprocs)]
+    tasks = [([params[i] for i in c], transfer, k) for c in chunks]
+    with Executor(max_workers=nprocs) as executor:
+        results = list(executor.map(evaluate_expansion_terms, tasks))
+    return np.concatenate(results, axis=0)
+
+class IntegralsExpansion(object):
+    """
+    A second-order Taylor expansion of the PT integrals, the 1-loop spectra,
+    and the velocity kurtosis with respect to a set of cosmological parameters,
+    around the fiducial cosmology of a model
+
+    The first and second derivatives are computed with central finite
+    differences, evaluating the integrals for ``1 + 2N + 2N(N-1)`` cosmologies
+    for ``N`` parameters, in parallel. The tables are stored in the disk cache.
+
+    The expansion is only used within a trust region of ``trust_radius``
+    steps around the fiducial point, and if the estimated relative error,
+    :func:`error`, is less than ``rtol``; otherwise, the integrals are
+    recomputed for the new cosmology.
+
+    Parameters
+    ----------
+    model : DarkMatterSpectrum
+        the model, whose current ``params`` is the fiducial cosmology
+    names : list of str
+        the names of the cosmological parameters, e.g., ``['Om0', 'H0', 'n_s']``
+    steps : list of float, optional
+        the finite-difference steps; default is ``rel_step`` times the
+        fiducial values
+    rel_step : float, optional
+        the relative step, if ``steps`` is not provided
+    trust_radius : float, optional
+        the maximum change of each parameter, in units of its step
+    rtol : float, optional
+        the maximum estimated relative error of the expansion
+    pool : {'process', 'thread', 'serial'}, optional
+        the type of pool used to evaluate the integrals
+    nprocs : int, optional
+        the number of workers; default is the number of cores
+    """
+    def __init__(self, model, names, steps=None, rel_step=0.01, trust_radius=5.,
+                    rtol=0.05, pool='process', nprocs=None):
+
+        if not isinstance(model.params, cosmology.Cosmology):
+            raise ValueError("the cosmology expansion requires ``params`` to be a pyRSD.rsd.cosmology.Cosmology")
+        if model.linear_power_file is not None:
+            raise ValueError("the cosmology expansion cannot be used with a ``linear_power_file``")
+
+        self.fiducial = model.params
+        self.transfer = model.transfer_fit_int
+        self.k = np.asarray(model.k_interp, dtype='f8')
+        self.names = list(names)
+        self.x0 = np.array([self.fiducial[name] for name in self.names], dtype='f8')
+        if steps is None:
+            steps = rel_step * abs(self.x0)
+        self.steps = np.asarray(steps, dtype='f8')
+        if len(self.steps) != len(self.names) or np.any(self.steps <= 0):
+            raise ValueError("the expansion steps should be positive, one for each parameter")
+        self.trust_radius = trust_radius
+        self.rtol = rtol
+
+        # the tables
+        values = self._load_tables(pool, nprocs)
+        self._compute_derivatives(values)
+
+        # the last prediction, keyed by the offset from the fiducial values
+        self._last = (None, None)
+
+    @property
+    def key(self):
+        """
+        The key identifying the tables in the disk cache
+        """
+        params = repr(sorted(dict(self.fiducial).items()))
+        return get_hash_key('IntegralsExpansion', __version__, params, self.k,
+                            ",".join(self.names), self.steps, float(self.transfer))
+
+    @property
+    def points(self):
+        """
+        The parameter values where the integrals are evaluated, as an
+        array of shape (M, N)
+        """
+        N = len(self.names)
+        h = np.diag(self.steps)
+        toret = [self.x0]
+        for i in range(N):
+            toret += [self.x0 + h[i], self.x0 - h[i]]
+        for i, j in itertools.combinations(range(N), 2):
+            for si, sj in itertools.product([1, -1], repeat=2):
+                toret.append(self.x0 + si*h[i] + sj*h[j])
+        return np.array(toret)
+
+    def _load_tables(self, pool, nprocs):
+        """
+        Load the tables from the disk cache, or compute them
+        """
+        key = self.key
+        values = None
+        if _disk_cache.enabled():
+            values = _tables_cache.load(key, 'values')
+
+        if values is None:
+            params = [self.fiducial.clone(**dict(zip(self.names, x))) for x in self.points]
+            values = compute_expansion_tables(params, self.transfer, self.k, pool=pool, nprocs=nprocs)
+            if _disk_cache.enabled():
+                _tables_cache.save(key, 'values', values)
+        return np.asarray(values)
+
+    def _compute_derivatives(self, values):
+        """
+        Compute the first and second derivatives from the tables
+        """
+        N = len(self.names)
+        h = self.steps
+        self.f0 = values[0]
+        self.gradient = np.empty((N,) + self.f0.shape)
+        self.hessian = np.empty((N, N) + self.f0.shape)
+        for i in range(N):
+            fp, fm = values[1+2*i], values[2+2*i]
+            self.gradient[i] = (fp - fm) / (2*h[i])
+            self.hessian[i,i] = (fp - 2*self.f0 + fm) / h[i]**2
+
+        offset = 1 + 2*N
+        for n, (i, j) in enumerate(itertools.combinations(range(N), 2)):
+            fpp, fpm, fmp, fmm = values[offset+4*n : offset+4*(n+1)]
+            self.hessian[i,j] = self.hessian[j,i] = (fpp - fpm - fmp + fmm) / (4*h[i]*h[j])
+
+        # the slices of the terms in the flattened tables
+        Nk = len(self.k)
+        self.slices = {}; start = 0
+        for name in EXPANDED_TERMS:
+            if name == '_unnormed_velocity_kurtosis':
+                shape = ()
+            elif name.startswith(ONE_LOOP_INTEGRALS):
+                shape = (3, Nk)
+            else:
+                shape = (Nk,)
+            size = int(np.prod(shape))
+            self.slices[name] = (slice(start, start+size), shape)
+            start += size
+        if start != len(self.f0):
+            raise ValueError("mismatch between the expansion tables and the expanded terms")
+
+    def offset(self, params):
+        """
+        Return the change of the expanded parameters with respect to the
+        fiducial values, or `None` if other parameters differ from the
+        fiducial cosmology
+        """
+        if not isinstance(params, cosmology.Cosmology):
+            return None
+        x = np.array([params[name] for name in self.names], dtype='f8')
+        if params.clone(**dict(zip(self.names, self.x0))) != self.fiducial:
+            return None
+        return x - self.x0
+
+    def taylor(self, dx, order=2):
+        """
+        Return the flattened terms at ``x0 + dx``, to the specified order
+        """
+        toret = self.f0 + np.tensordot(dx, self.gradient, axes=1)
+        if order > 1:
+            toret = toret + 0.5*np.tensordot(dx, np.tensordot(dx, self.hessian, axes=1), axes=1)
+        return toret
+
+    def error(self, dx):
+        """
+        The estimated relative error of the expansion at ``x0 + dx``
+
+        This is the maximum of the second-order term, relative to the maximum
+        absolute value of each term, i.e., the error of the first-order
+        expansion, which is a conservative estimate for the second-order one
+        """
+        second = abs(self.taylor(dx) - self.taylor(dx, order=1))
+        toret = 0.
+        for name, (sl, shape) in self.slices.items():
+            scale = abs(self.f0[sl]).max()
+            if scale > 0:
+                toret = max(toret, second[sl].max() / scale)
+        return toret
+
+    def in_trust_region(self, dx):
+        """
+        Whether the offset ``dx`` is within the trust region
+        """
+        return bool(np.all(abs(dx) <= self.trust_radius*self.steps))
+
+    def predict(self, params):
+        """
+        Return the dictionary of terms for the cosmology ``params``, or `None`
+        if the cosmology is outside the trust region, the estimated error is
+        too large, or the parameters not included in the expansion differ from
+        the fiducial values
+        """
+        dx = self.offset(params)
+        if dx is None:
+            return None
+        if self._last[0] is not None and np.array_equal(dx, self._last[0]):
+            return self._last[1]
+
+        toret = None
+        if self.in_trust_region(dx):
+            error = self.error(dx)
+            if error <= self.rtol:
+                values = self.taylor(dx)
+                toret = {}
+                for name, (sl, shape) in self.slices.items():
+                    val = values[sl].reshape(shape)
+                    toret[name] = tuple(val) if len(shape) > 1 else val
+            else:
+                args = (error, self.rtol)
+                warnings.warn("estimated error of the cosmology expansion %.2e larger than %.2e; recomputing the PT integrals" %args)
+
+        self._last = (dx, toret)
+        return toret
+
+    def __call__(self, model, name):
+        """
+        Return the expanded term ``name`` for the current cosmology
+        of ``model``, or `None`, if it cannot be expanded
+        """
+        if model.transfer_fit_int != self.transfer or model.linear_power_file is not None:
+            return None
+        if not np.array_equal(model.k_interp, self.k):
+            return None
+        values = self.predict(model.params)
+        return values[name] if values is not None else None
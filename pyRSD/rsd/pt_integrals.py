@@ -1,8 +1,45 @@
 from functools import wraps
+import weakref
+import hashlib
+import os
 from .. import pygcl, numpy as np
 from ._cache import parameter, interpolated_function, cached_property
-from .tools import RSDSpline as spline
-from . import INTERP_KMIN, INTERP_KMAX
+from .tools import RSDSpline as spline, get_hash_key
+from . import INTERP_KMIN, INTERP_KMAX, __version__
+from ._disk_cache import DiskCache
+from . import _disk_cache
+from .snapshot import as_gcl
+
+# the disk cache holding the unnormalized integrals
+_integrals_cache = DiskCache('pt_integrals')
+
+# the relative accuracy of each type of PT integral
+INTEGRALS_EPSREL = {'OneLoopPS':1e-4, 'Imn':1e-4, 'Jmn':1e-4, 'Kmn':1e-3, 'ImnOneLoop':1e-4}
+
+# the range of the integrals over the linear power in the gcl extension
+INTEGRATION_QMIN = 1e-5
+INTEGRATION_QMAX = 1e5
+
+_extension_hash = None
+
+def integration_key():
+    """
+    Return a key identifying the configuration of the PT integrals, i.e.,
+    :data:`INTEGRALS_EPSREL` and the compiled ``gcl`` extension, which holds
+    the integration limits and kernels
+    """
+    global _extension_hash
+    if _extension_hash is None:
+        module = getattr(pygcl.gcl, '_gcl', None)
+        filename = getattr(module, '__file__', None)
+        if filename is not None and os.path.isfile(filename):
+            with open(filename, 'rb') as ff:
+                _extension_hash = hashlib.sha1(ff.read()).hexdigest()
+        else:
+            _extension_hash = ''
+
+    epsrel = ",".join("%s=%r" %(k, INTEGRALS_EPSREL[k]) for k in sorted(INTEGRALS_EPSREL))
+    return epsrel + ";" + _extension_hash
 
 #-------------------------------------------------------------------------------
 # decorators to properly normalize integrals
@@ -39,6 +76,107 @@ def normalize_ImnOneLoop(f):
         return norm**2*terms[0] + norm**3*terms[1] + norm**4*terms[2]
     return wrapper
 
+#-------------------------------------------------------------------------------
+# decorator to persist integrals on disk
+#-------------------------------------------------------------------------------
+def disk_cached(f):
+    """
+    Decorator to load integrals evaluated on ``k_interp`` from the disk
+    cache, computing and saving them if they are missing
+
+    If the model has an :attr:`~PTIntegralsMixin.integrals_expansion`,
+    the expanded integrals are used when valid
+    """
+    name = f.__name__
+
+    @wraps(f)
+    def wrapper(self, k):
+
+        # only cache the values on the interpolation domain
+        if k is not self.k_interp:
+            return f(self, k)
+
+        # the cosmology expansion
+        val = self._expanded_term(name)
+        if val is not None:
+            return val
+
+        if not _disk_cache.enabled():
+            return f(self, k)
+
+        key = self._pt_integrals_key
+        val = _integrals_cache.load(key, name)
+        if val is None:
+            val = f(self, k)
+            _integrals_cache.save(key, name, val)
+        elif val.ndim > 1:
+            val = tuple(val)
+        return val
+
+    return wrapper
+
+#-------------------------------------------------------------------------------
+# the in-memory store of integrals shared by several models
+#-------------------------------------------------------------------------------
+_integrals_stores = {}
+
+class PTIntegralsStore(object):
+    """
+    A reference-counted store of the unnormalized PT integrals, i.e., the
+    drivers and splines of :class:`PTIntegralsMixin`, shared by all models
+    attached to it
+
+    The store is identified by the key of the linear power spectrum, see
+    :attr:`PTIntegralsMixin._pt_integrals_key`, such that models with the same
+    linear power spectrum (e.g., at different redshifts, or for different
+    samples) compute the integrals once. The store is released when the
+    last model is detached or garbage collected.
+
+    Parameters
+    ----------
+    key : str
+        the key identifying the linear power spectrum
+    """
+    def __init__(self, key):
+        self.key = key
+        self.cache = {}
+        self.refcount = 0
+
+    @classmethod
+    def get(cls, key):
+        """
+        Return the store for ``key``, creating it if it does not exist
+        """
+        if key not in _integrals_stores:
+            _integrals_stores[key] = cls(key)
+        return _integrals_stores[key]
+
+    @staticmethod
+    def active():
+        """
+        Return the list of stores with attached models
+        """
+        return list(_integrals_stores.values())
+
+    def acquire(self):
+        """
+        Increment the reference count
+        """
+        self.refcount += 1
+
+    def release(self):
+        """
+        Decrement the reference count, removing the store once no
+        models are attached
+        """
+        self.refcount -= 1
+        if self.refcount <= 0 and _integrals_stores.get(self.key) is self:
+            _integrals_stores.pop(self.key)
+
+    def __repr__(self):
+        args = (self.__class__.__name__, self.key[:7], self.refcount, len(self.cache))
+        return "<%s: key=%s, refcount=%d, %d integrals>" %args
+
 class PTIntegralsMixin(object):
     """
     A mixin class to compute and store the necessary PT integrals for the dark
@@ -49,13 +187,168 @@ class PTIntegralsMixin(object):
     The class is written such that the computationally-expensive parts do not
     depend on changes in sigma8(z) so the integrals can be renormalized to
     the correct sigma8(z) with an overall scaling
+
+    If :attr:`share_integrals` is `True`, the unnormalized integrals are
+    shared by all models with the same linear power spectrum through a
+    :class:`PTIntegralsStore`.
+
+    With an :attr:`integrals_expansion` (see :func:`expand_integrals`), the
+    integrals are not recomputed when the cosmology changes, but predicted
+    from their expansion in the cosmological parameters
     """
+    share_integrals = True
+    integrals_expansion = None
+
     def __init__(self):
 
         # make sure power spectrum redshift is 0
         msg = "Integrals: input linear power spectrum must be defined at z = 0"
         assert self.power_lin.GetRedshift() == 0., msg
 
+    #---------------------------------------------------------------------------
+    # sharing integrals between models
+    #---------------------------------------------------------------------------
+    @property
+    def integrals_store(self):
+        """
+        The :class:`PTIntegralsStore` this model is attached to, or `None`
+        """
+        return self.__dict__.get('_integrals_store', None)
+
+    def attach_integrals(self):
+        """
+        Attach to the shared store of integrals for the current linear
+        power spectrum, detaching from any previous store
+
+        Returns
+        -------
+        store : PTIntegralsStore
+            the store this model is attached to
+        """
+        key = self._pt_integrals_key
+        store = self.integrals_store
+        if store is not None and store.key == key:
+            return store
+
+        self.detach_integrals()
+        store = PTIntegralsStore.get(key)
+        store.acquire()
+        self._integrals_store = store
+        self._integrals_finalizer = weakref.finalize(self, store.release)
+        return store
+
+    def share_computed_integrals(self):
+        """
+        Attach to the shared store of integrals, adding the integrals already
+        computed by this model to the store, or replacing them by those
+        already in the store
+
+        Models loaded from file hold their own copy of the integrals, which
+        are only shared with other models once this is called
+
+        Returns
+        -------
+        store : PTIntegralsStore
+            the store this model is attached to, or `None` if the model
+            does not share its integrals
+        """
+        if not self.share_integrals or self.integrals_expansion is not None:
+            return None
+
+        store = self.attach_integrals()
+        for name in self._shared_names:
+            if name not in self._cache:
+                continue
+            if name in store.cache:
+                self._cache[name] = store.cache[name]
+            else:
+                store.cache[name] = self._cache[name]
+        return store
+
+    def detach_integrals(self):
+        """
+        Detach from the shared store of integrals; the integrals already
+        computed are kept by this model
+        """
+        finalizer = self.__dict__.pop('_integrals_finalizer', None)
+        self.__dict__.pop('_integrals_store', None)
+        if finalizer is not None:
+            finalizer()
+
+    def _shared_cache(self, name):
+        """
+        The cache of the shared integrals store, if sharing is enabled
+        """
+        if not self.share_integrals or self.integrals_expansion is not None:
+            return None
+        return self.attach_integrals().cache
+
+    #---------------------------------------------------------------------------
+    # expansion of the integrals in cosmology
+    #---------------------------------------------------------------------------
+    def expand_integrals(self, names, **kwargs):
+        """
+        Expand the PT integrals to second order in the cosmological parameters
+        ``names`` around the current cosmology, such that changing these
+        parameters in ``params`` does not recompute the integrals
+
+        The linear power spectrum is still recomputed. Outside the trust
+        region of the expansion, or if other parameters change, the integrals
+        are computed exactly.
+
+        Parameters
+        ----------
+        names : list of str
+            the names of the parameters of :attr:`params` to expand in,
+            e.g., ``['Om0', 'H0', 'n_s']``
+        **kwargs :
+            additional keywords passed to
+            :class:`~pyRSD.rsd.pt_expansion.IntegralsExpansion`
+
+        Returns
+        -------
+        expansion : IntegralsExpansion
+            the expansion, stored as :attr:`integrals_expansion`
+        """
+        from .pt_expansion import IntegralsExpansion
+        self.integrals_expansion = IntegralsExpansion(self, names, **kwargs)
+        return self.integrals_expansion
+
+    def _expanded_term(self, name):
+        """
+        The term ``name`` predicted by the cosmology expansion, or `None`
+        """
+        if self.integrals_expansion is None:
+            return None
+        return self.integrals_expansion(self, name)
+
+    def _expanded_spectrum(self, name):
+        """
+        The spline of the 1-loop spectrum ``name`` predicted by the cosmology
+        expansion, or `None`
+        """
+        val = self._expanded_term(name)
+        if val is None:
+            return None
+        return self.spline(self.k_interp, val, **getattr(self, 'spline_kwargs', {}))
+
+    @cached_property("power_lin")
+    def _pt_integrals_key(self):
+        """
+        The key identifying the integrals of this linear power spectrum in
+        the disk cache
+
+        This is computed from the tabulated transfer function of the
+        cosmology, the linear power over the whole range of the integrals,
+        the integration settings (see :func:`integration_key`), the
+        interpolation domain, and the model version
+        """
+        cosmo = self.power_lin.GetCosmology()
+        k = np.asarray(self.k_interp, dtype='f8')
+        q = np.logspace(np.log10(INTEGRATION_QMIN), np.log10(INTEGRATION_QMAX), 1000)
+        tables = [np.ascontiguousarray(x, dtype='f8') for x in [cosmo.GetDiscreteK(), cosmo.GetDiscreteTk(), self.power_lin(q)]]
+        return get_hash_key('PTIntegrals', __version__, integration_key(), k, q, *tables)
+
     #---------------------------------------------------------------------------
     # one-loop power spectra
     #---------------------------------------------------------------------------
@@ -64,28 +357,37 @@ class PTIntegralsMixin(object):
         """
         The 1-loop density auto spectrum
         """
-        return pygcl.OneLoopPdd(self.power_lin)
+        spl = self._expanded_spectrum('_Pdd_0')
+        if spl is not None:
+            return spl
+        return pygcl.OneLoopPdd(as_gcl(self.power_lin), INTEGRALS_EPSREL['OneLoopPS'])
 
     @cached_property("power_lin")
     def _Pdv_0(self):
         """
         The 1-loop density-velocity cross spectrum
         """
-        return pygcl.OneLoopPdv(self.power_lin)
+        spl = self._expanded_spectrum('_Pdv_0')
+        if spl is not None:
+            return spl
+        return pygcl.OneLoopPdv(as_gcl(self.power_lin), INTEGRALS_EPSREL['OneLoopPS'])
 
     @cached_property("power_lin")
     def _Pvv_0(self):
         """
         The 1-loop velocity auto spectrum
         """
-        return pygcl.OneLoopPvv(self.power_lin)
+        spl = self._expanded_spectrum('_Pvv_0')
+        if spl is not None:
+            return spl
+        return pygcl.OneLoopPvv(as_gcl(self.power_lin), INTEGRALS_EPSREL['OneLoopPS'])
 
     @cached_property("power_lin")
     def _P22bar_0(self):
         """
         The 1-loop P22 power spectrum
         """
-        return pygcl.OneLoopP22Bar(self.power_lin)
+        return pygcl.OneLoopP22Bar(as_gcl(self.power_lin), INTEGRALS_EPSREL['OneLoopPS'])
 
     #---------------------------------------------------------------------------
     # drivers for the various PT integrals -- depend on Plin
@@ -95,21 +397,21 @@ class PTIntegralsMixin(object):
         """
         The internal driver class to compute the I(m, n) integrals
         """
-        return pygcl.Imn(self.power_lin)
+        return pygcl.Imn(as_gcl(self.power_lin), INTEGRALS_EPSREL['Imn'])
 
     @cached_property("power_lin")
     def _Jmn(self):
         """
         The internal driver class to compute the J(m, n) integrals
         """
-        return pygcl.Jmn(self.power_lin)
+        return pygcl.Jmn(as_gcl(self.power_lin), INTEGRALS_EPSREL['Jmn'])
 
     @cached_property("power_lin")
     def _Kmn(self):
         """
         The internal driver class to compute the J(m, n) integrals
         """
-        return pygcl.Kmn(self.power_lin)
+        return pygcl.Kmn(as_gcl(self.power_lin), INTEGRALS_EPSREL['Kmn'])
 
     @cached_property("_Pdv_0")
     def _Imn1Loop_dvdv(self):
@@ -117,7 +419,7 @@ class PTIntegralsMixin(object):
         The internal driver class to compute the 1-loop I(m, n) integrals,
         which integrate over `P_dv(q) P_dv(|k-q|)`
         """
-        return pygcl.ImnOneLoop(self._Pdv_0)
+        return pygcl.ImnOneLoop(as_gcl(self._Pdv_0), INTEGRALS_EPSREL['ImnOneLoop'])
 
     @cached_property("_Pvv_0", "_Pdd_0")
     def _Imn1Loop_vvdd(self):
@@ -125,7 +427,7 @@ class PTIntegralsMixin(object):
         The internal driver class to compute the 1-loop I(m, n) integrals,
         which integrate over `P_vv(q) P_dd(|k-q|)`
         """
-        return pygcl.ImnOneLoop(self._Pvv_0, self._Pdd_0, 1e-4)
+        return pygcl.ImnOneLoop(as_gcl(self._Pvv_0), as_gcl(self._Pdd_0), INTEGRALS_EPSREL['ImnOneLoop'])
 
     @cached_property("_Pvv_0")
     def _Imn1Loop_vvvv(self):
@@ -133,42 +435,48 @@ class PTIntegralsMixin(object):
         The internal driver class to compute the 1-loop I(m, n) integrals,
         which integrate over `P_vv(q) P_vv(|k-q|)`
         """
-        return pygcl.ImnOneLoop(self._Pvv_0)
+        return pygcl.ImnOneLoop(as_gcl(self._Pvv_0), INTEGRALS_EPSREL['ImnOneLoop'])
 
     #---------------------------------------------------------------------------
     # Jmn integrals as a function of input k
     #---------------------------------------------------------------------------
     @interpolated_function("_Jmn")
+    @disk_cached
     def _unnormalized_J00(self, k):
         """J(m=0,n=0) perturbation theory integral"""
         return self._Jmn(k, 0, 0)
     J00 = normalize_Jmn(_unnormalized_J00)
 
     @interpolated_function("_Jmn")
+    @disk_cached
     def _unnormalized_J01(self, k):
         """J(m=0,n=1) perturbation theory integral"""
         return self._Jmn(k, 0, 1)
     J01 = normalize_Jmn(_unnormalized_J01)
 
     @interpolated_function("_Jmn")
+    @disk_cached
     def _unnormalized_J10(self, k):
         """J(m=1,n=0) perturbation theory integral"""
         return self._Jmn(k, 1, 0)
     J10 = normalize_Jmn(_unnormalized_J10)
 
     @interpolated_function("_Jmn")
+    @disk_cached
     def _unnormalized_J11(self, k):
         """J(m=1,n=1) perturbation theory integral"""
         return self._Jmn(k, 1, 1)
     J11 = normalize_Jmn(_unnormalized_J11)
 
     @interpolated_function("_Jmn")
+    @disk_cached
     def _unnormalized_J02(self, k):
         """J(m=0,n=2) perturbation theory integral"""
         return self._Jmn(k, 0, 2)
     J02 = normalize_Jmn(_unnormalized_J02)
 
     @interpolated_function("_Jmn")
+    @disk_cached
     def _unnormalized_J20(self, k):
         """J(m=2,n=0) perturbation theory integral"""
         return self._Jmn(k, 2, 0)
@@ -178,96 +486,112 @@ class PTIntegralsMixin(object):
     # Imn integrals as a function of k
     #---------------------------------------------------------------------------
     @interpolated_function("_Imn")
+    @disk_cached
     def _unnormalized_I00(self, k):
         """I(m=0,n=0) perturbation theory integral"""
         return self._Imn(k, 0, 0)
     I00 = normalize_Imn(_unnormalized_I00)
 
     @interpolated_function("_Imn")
+    @disk_cached
     def _unnormalized_I01(self, k):
         """I(m=0,n=1) perturbation theory integral"""
         return self._Imn(k, 0, 1)
     I01 = normalize_Imn(_unnormalized_I01)
 
     @interpolated_function("_Imn")
+    @disk_cached
     def _unnormalized_I02(self, k):
         """I(m=0,n=2) perturbation theory integral"""
         return self._Imn(k, 0, 2)
     I02 = normalize_Imn(_unnormalized_I02)
 
     @interpolated_function("_Imn")
+    @disk_cached
     def _unnormalized_I03(self, k):
         """I(m=0,n=3) perturbation theory integral"""
         return self._Imn(k, 0, 3)
     I03 = normalize_Imn(_unnormalized_I03)
 
     @interpolated_function("_Imn")
+    @disk_cached
     def _unnormalized_I10(self, k):
         """I(m=1,n=0) perturbation theory integral"""
         return self._Imn(k, 1, 0)
     I10 = normalize_Imn(_unnormalized_I10)
 
     @interpolated_function("_Imn")
+    @disk_cached
     def _unnormalized_I11(self, k):
         """I(m=1,n=1) perturbation theory integral"""
         return self._Imn(k, 1, 1)
     I11 = normalize_Imn(_unnormalized_I11)
 
     @interpolated_function("_Imn")
+    @disk_cached
     def _unnormalized_I12(self, k):
         """I(m=1,n=2) perturbation theory integral"""
         return self._Imn(k, 1, 2)
     I12 = normalize_Imn(_unnormalized_I12)
 
     @interpolated_function("_Imn")
+    @disk_cached
     def _unnormalized_I13(self, k):
         """I(m=1,n=3) perturbation theory integral"""
         return self._Imn(k, 1, 3)
     I13 = normalize_Imn(_unnormalized_I13)
 
     @interpolated_function("_Imn")
+    @disk_cached
     def _unnormalized_I20(self, k):
         """I(m=2,n=0) perturbation theory integral"""
         return self._Imn(k, 2, 0)
     I20 = normalize_Imn(_unnormalized_I20)
 
     @interpolated_function("_Imn")
+    @disk_cached
     def _unnormalized_I21(self, k):
         """I(m=2,n=1) perturbation theory integral"""
         return self._Imn(k, 2, 1)
     I21 = normalize_Imn(_unnormalized_I21)
 
     @interpolated_function("_Imn")
+    @disk_cached
     def _unnormalized_I22(self, k):
         """I(m=2,n=2) perturbation theory integral"""
         return self._Imn(k, 2, 2)
     I22 = normalize_Imn(_unnormalized_I22)
 
     @interpolated_function("_Imn")
+    @disk_cached
     def _unnormalized_I23(self, k):
         """I(m=2,n=3) perturbation theory integral"""
         return self._Imn(k, 2, 3)
     I23 = normalize_Imn(_unnormalized_I23)
 
     @interpolated_function("_Imn")
+    @disk_cached
     def _unnormalized_I30(self, k):
         """I(m=3,n=0) perturbation theory integral"""
         return self._Imn(k, 3, 0)
     I30 = normalize_Imn(_unnormalized_I30)
 
     @interpolated_function("_Imn")
+    @disk_cached
     def _unnormalized_I31(self, k):
         """I(m=3,n=1) perturbation theory integral"""
         return self._Imn(k, 3, 1)
     I31 = normalize_Imn(_unnormalized_I31)
 
     @interpolated_function("_Imn")
+    @disk_cached
     def _unnormalized_I32(self, k):
         """I(m=3,n=2) perturbation theory integral"""
         return self._Imn(k, 3, 2)
     I32 = normalize_Imn(_unnormalized_I32)
 
     @interpolated_function("_Imn")
+    @disk_cached
     def _unnormalized_I33(self, k):
         """I(m=3,n=3) perturbation theory integral"""
         return self._Imn(k, 3, 3)
@@ -277,36 +601,42 @@ class PTIntegralsMixin(object):
     # Kmn integrals
     #---------------------------------------------------------------------------
     @interpolated_function("_Kmn")
+    @disk_cached
     def _unnormalized_K00(self, k):
         """K(m=0,n=0) perturbation theory integral"""
         return self._Kmn(k, 0, 0)
     K00 = normalize_Kmn(_unnormalized_K00)
 
     @interpolated_function("_Kmn")
+    @disk_cached
     def _unnormalized_K00s(self, k):
         """K(m=0,n=0,s=True) perturbation theory integral"""
         return self._Kmn(k, 0, 0, True)
     K00s = normalize_Kmn(_unnormalized_K00s)
 
     @interpolated_function("_Kmn")
+    @disk_cached
     def _unnormalized_K01(self, k):
         """K(m=0,n=1) perturbation theory integral"""
         return self._Kmn(k, 0, 1)
     K01 = normalize_Kmn(_unnormalized_K01)
 
     @interpolated_function("_Kmn")
+    @disk_cached
     def _unnormalized_K01s(self, k):
         """K(m=0,n=1,s=True) perturbation theory integral"""
         return self._Kmn(k, 0, 1, True)
     K01s = normalize_Kmn(_unnormalized_K01s)
 
     @interpolated_function("_Kmn")
+    @disk_cached
     def _unnormalized_K02s(self, k):
         """K(m=0,n=2,s=True) perturbation theory integral"""
         return self._Kmn(k, 0, 2, True)
     K02s = normalize_Kmn(_unnormalized_K02s)
 
     @interpolated_function("_Kmn")
+    @disk_cached
     def _unnormalized_K10(self, k):
         """K(m=1,n=0) perturbation theory integral"""
         return self._Kmn(k, 1, 0)
@@ -314,42 +644,49 @@ class PTIntegralsMixin(object):
 
 
     @interpolated_function("_Kmn")
+    @disk_cached
     def _unnormalized_K10s(self, k):
         """K(m=1,n=0,s=True) perturbation theory integral"""
         return self._Kmn(k, 1, 0, True)
     K10s = normalize_Kmn(_unnormalized_K10s)
 
     @interpolated_function("_Kmn")
+    @disk_cached
     def _unnormalized_K11(self, k):
         """K(m=1,n=1) perturbation theory integral"""
         return self._Kmn(k, 1, 1)
     K11 = normalize_Kmn(_unnormalized_K11)
 
     @interpolated_function("_Kmn")
+    @disk_cached
     def _unnormalized_K11s(self, k):
         """K(m=1,n=1,s=True) perturbation theory integral"""
         return self._Kmn(k, 1, 1, True)
     K11s = normalize_Kmn(_unnormalized_K11s)
 
     @interpolated_function("_Kmn")
+    @disk_cached
     def _unnormalized_K20_a(self, k):
         """K(m=2,n=0) mu^2 perturbation theory integral"""
         return self._Kmn(k, 2, 0, False, 0)
     K20_a = normalize_Kmn(_unnormalized_K20_a)
 
     @interpolated_function("_Kmn")
+    @disk_cached
     def _unnormalized_K20_b(self, k):
         """K(m=2,n=0) mu^4 perturbation theory integral"""
         return self._Kmn(k, 2, 0, False, 1)
     K20_b = normalize_Kmn(_unnormalized_K20_b)
 
     @interpolated_function("_Kmn")
+    @disk_cached
     def _unnormalized_K20s_a(self, k):
         """K(m=2,n=0,s=True) mu^2 perturbation theory integral"""
         return self._Kmn(k, 2, 0, True, 0)
     K20s_a = normalize_Kmn(_unnormalized_K20s_a)
 
     @interpolated_function("_Kmn")
+    @disk_cached
     def _unnormalized_K20s_b(self, k):
         """K(m=2,n=0,s=True) mu^4 perturbation theory integral"""
         return self._Kmn(k, 2, 0, True, 1)
@@ -359,6 +696,7 @@ class PTIntegralsMixin(object):
     # full 2-loop integrals
     #---------------------------------------------------------------------------
     @interpolated_function("_Imn1Loop_vvdd")
+    @disk_cached
     def _unnormalized_Ivvdd_h01(self, k):
         I_lin   = self._Imn1Loop_vvdd.EvaluateLinear(k, 0, 1)
         I_cross = self._Imn1Loop_vvdd.EvaluateCross(k, 0, 1)
@@ -368,6 +706,7 @@ class PTIntegralsMixin(object):
     Ivvdd_h01 = normalize_ImnOneLoop(_unnormalized_Ivvdd_h01)
 
     @interpolated_function("_Imn1Loop_vvdd")
+    @disk_cached
     def _unnormalized_Ivvdd_h02(self, k):
         I_lin   = self._Imn1Loop_vvdd.EvaluateLinear(k, 0, 2)
         I_cross = self._Imn1Loop_vvdd.EvaluateCross(k, 0, 2)
@@ -377,6 +716,7 @@ class PTIntegralsMixin(object):
     Ivvdd_h02 = normalize_ImnOneLoop(_unnormalized_Ivvdd_h02)
 
     @interpolated_function("_Imn1Loop_dvdv")
+    @disk_cached
     def _unnormalized_Idvdv_h03(self, k):
         I_lin   = self._Imn1Loop_dvdv.EvaluateLinear(k, 0, 3)
         I_cross = self._Imn1Loop_dvdv.EvaluateCross(k, 0, 3)
@@ -386,6 +726,7 @@ class PTIntegralsMixin(object):
     Idvdv_h03 = normalize_ImnOneLoop(_unnormalized_Idvdv_h03)
 
     @interpolated_function("_Imn1Loop_dvdv")
+    @disk_cached
     def _unnormalized_Idvdv_h04(self, k):
         I_lin   = self._Imn1Loop_dvdv.EvaluateLinear(k, 0, 4)
         I_cross = self._Imn1Loop_dvdv.EvaluateCross(k, 0, 4)
@@ -395,6 +736,7 @@ class PTIntegralsMixin(object):
     Idvdv_h04 = normalize_ImnOneLoop(_unnormalized_Idvdv_h04)
 
     @interpolated_function("_Imn1Loop_vvvv")
+    @disk_cached
     def _unnormalized_Ivvvv_f23(self, k):
         I_lin   = self._Imn1Loop_vvvv.EvaluateLinear(k, 2, 3)
         I_cross = self._Imn1Loop_vvvv.EvaluateCross(k, 2, 3)
@@ -404,6 +746,7 @@ class PTIntegralsMixin(object):
     Ivvvv_f23 = normalize_ImnOneLoop(_unnormalized_Ivvvv_f23)
 
     @interpolated_function("_Imn1Loop_vvvv")
+    @disk_cached
     def _unnormalized_Ivvvv_f32(self, k):
         I_lin   = self._Imn1Loop_vvvv.EvaluateLinear(k, 3, 2)
         I_cross = self._Imn1Loop_vvvv.EvaluateCross(k, 3, 2)
@@ -413,6 +756,7 @@ class PTIntegralsMixin(object):
     Ivvvv_f32 = normalize_ImnOneLoop(_unnormalized_Ivvvv_f32)
 
     @interpolated_function("_Imn1Loop_vvvv")
+    @disk_cached
     def _unnormalized_Ivvvv_f33(self, k):
         I_lin   = self._Imn1Loop_vvvv.EvaluateLinear(k, 3, 3)
         I_cross = self._Imn1Loop_vvvv.EvaluateCross(k, 3, 3)
@@ -429,6 +773,9 @@ class PTIntegralsMixin(object):
         """
         The unnormalized velocity kurtosis
         """
+        val = self._expanded_term('_unnormed_velocity_kurtosis')
+        if val is not None:
+            return float(val)
         return self._P22bar_0.VelocityKurtosis()
 
     @cached_property('_unnormed_velocity_kurtosis', '_power_norm')
@@ -440,6 +787,7 @@ class PTIntegralsMixin(object):
         return self._power_norm**2 * self._unnormed_velocity_kurtosis
 
     @interpolated_function("power_lin")
+    @disk_cached
     def _unnormalized_sigmasq_k(self, k):
         """
         The dark matter velocity dispersion at z, as a function of k,
@@ -448,3 +796,11 @@ class PTIntegralsMixin(object):
         # integrate up to 0.5 * kmax
         return self.power_lin.VelocityDispersion(k, 0.5)
     sigmasq_k = normalize_Jmn(_unnormalized_sigmasq_k)
+
+# the nodes that depend only on the linear power spectrum are shared
+PTIntegralsMixin._shared_names = frozenset(['_Pdd_0', '_Pdv_0', '_Pvv_0', '_P22bar_0',
+                                            '_Imn', '_Jmn', '_Kmn', '_Imn1Loop_dvdv',
+                                            '_Imn1Loop_vvdd', '_Imn1Loop_vvvv',
+                                            '_unnormed_velocity_kurtosis'] +
+                                           [name for name in dir(PTIntegralsMixin)
+                                            if name.startswith('_unnormalized_')])
@@ -1,14 +1,30 @@
 from ._cache import Cache, parameter, cached_property
-from ._interpolate import RegularGridInterpolator
+from ._interpolate import RegularGridInterpolator, InterpolationDomainError
+from ._disk_cache import DiskCache
 from .. import pygcl, numpy as np, data as sim_data
-from . import tools
+from . import tools, _disk_cache, __version__
 
 import itertools
-import pandas as pd
-from sklearn import preprocessing
-import george
+import warnings
 
-GEORGE_v03 = george.__version__ >= '0.3'
+def _george():
+    """
+    Import :mod:`george`, which is slow to import, on first use
+    """
+    import george
+    return george
+
+def _george_v03():
+    """
+    Whether the version of :mod:`george` is at least 0.3
+    """
+    return _george().__version__ >= '0.3'
+
+# the disk cache holding the tabulated predictions of the Gaussian processes
+_tables_cache = DiskCache('simulation_fits')
+
+# the number of points to predict at once when tabulating
+GRID_CHUNKSIZE = 10000
 
 #-------------------------------------------------------------------------------
 # simulation measurements, interpolated with a gaussian process
@@ -21,15 +37,27 @@ class GeorgeSimulationData(Cache):
     Notes
     -----
     * this uses the `GP` class from the class `george` (see: http://dan.iel.fm/george)
+    * if :attr:`use_grid` is `True`, the mean prediction is tabulated on a
+      regular grid spanning the training data (see :attr:`grid_table`),
+      and calls inside the grid are linearly interpolated; calls outside
+      the grid use the Gaussian process
     """
+    # the default number of grid points for each independent variable
+    default_grid_size = 40
+
+    # the maximum tabulation error, relative to the std. dev. of the training data
+    grid_rtol = 1e-2
+
     def __init__(self,
                     independent_vars,
                     data,
                     theta,
                     use_errors=True,
                     dependent_col='y',
-                    kernel=george.kernels.ExpSquaredKernel,
-                    solver=george.BasicSolver):
+                    kernel=None,
+                    solver=None,
+                    use_grid=False,
+                    grid_size=None):
         """
         Parameters
         ----------
@@ -47,10 +75,23 @@ class GeorgeSimulationData(Cache):
             the name of the dependent variable to interpolate the data. Should be
             a column in `data`
         kernel : `george.kernels.Kernel`, optional
-            the kernel class to use in the Gaussian process covariance matrix
+            the kernel class to use in the Gaussian process covariance matrix;
+            default is `george.kernels.ExpSquaredKernel`
         solver : {`george.BasicSolver`, `george.HODLRSolver`}, optional
-            the solver class to use when evaluating the Gaussian process
-        """
+            the solver class to use when evaluating the Gaussian process;
+            default is `george.BasicSolver`
+        use_grid : bool, optional
+            If `True`, interpolate the prediction from a table on a regular grid
+        grid_size : int, list of int, optional
+            the number of grid points for each independent variable; default
+            is :attr:`default_grid_size`
+        """
+        george = _george()
+        if kernel is None:
+            kernel = george.kernels.ExpSquaredKernel
+        if solver is None:
+            solver = george.BasicSolver
+
         self.use_errors  = use_errors
         self.data        = data
         self.independent = independent_vars
@@ -58,6 +99,9 @@ class GeorgeSimulationData(Cache):
         self.solver      = solver
         self.kernel      = kernel
         self.theta       = theta
+        self.use_grid    = use_grid
+        if grid_size is not None:
+            self.grid_size = grid_size
 
     #---------------------------------------------------------------------------
     # parameters
@@ -74,6 +118,7 @@ class GeorgeSimulationData(Cache):
         """
         The solver to use in the Gaussian process
         """
+        george = _george()
         avail = [george.BasicSolver, george.HODLRSolver]
         if val not in avail:
             raise ValueError("the `solver` must be one of %s" %str(avail))
@@ -100,6 +145,21 @@ class GeorgeSimulationData(Cache):
         """
         return val
 
+    @parameter
+    def use_grid(self, val):
+        """
+        If `True`, interpolate the prediction from :attr:`grid_table`
+        """
+        return val
+
+    @parameter(default='default_grid_size')
+    def grid_size(self, val):
+        """
+        The number of grid points for each independent variable in
+        :attr:`grid_table`
+        """
+        return val
+
     @parameter
     def independent(self, val):
         """
@@ -167,6 +227,7 @@ class GeorgeSimulationData(Cache):
         The class to scale the `x` attribute
         """
         x = self.x
+        from sklearn import preprocessing
         if x.ndim == 1: x = x.reshape(-1, 1)
         return preprocessing.StandardScaler(copy=True).fit(x)
 
@@ -175,6 +236,7 @@ class GeorgeSimulationData(Cache):
         """
         The class to scale the `y` attribute
         """
+        from sklearn import preprocessing
         return preprocessing.StandardScaler(copy=True).fit(self.y.reshape(-1, 1))
 
     @cached_property("x")
@@ -212,9 +274,9 @@ class GeorgeSimulationData(Cache):
             kernel = self.theta[0] * self.kernel(self.theta[1:], ndim=self.xshape)
         else:
             raise ValueError("size mismatch between supplied `x` variables and `theta` length")
-        gp = george.GP(kernel, solver=self.solver)
+        gp = _george().GP(kernel, solver=self.solver)
 
-        if GEORGE_v03:
+        if _george_v03():
             kws = {}
         else:
             kws = {'sort':False}
@@ -222,6 +284,86 @@ class GeorgeSimulationData(Cache):
         gp.compute(self.x_scaled, **kws)
         return gp
 
+    @cached_property("x", "grid_size")
+    def grid_axes(self):
+        """
+        The points of the regular grid along each independent variable,
+        spanning the range of the training data
+        """
+        x = self.x
+        if x.ndim == 1: x = x.reshape(-1, 1)
+
+        size = self.grid_size
+        if np.isscalar(size): size = [size]*x.shape[1]
+        if len(size) != x.shape[1]:
+            raise ValueError("`grid_size` should have one entry for each of the %d independent variables" %x.shape[1])
+        return [np.linspace(xx.min(), xx.max(), int(n)) for xx, n in zip(x.T, size)]
+
+    @cached_property("data", "kernel", "solver", "theta", "use_errors", "grid_axes")
+    def grid_table(self):
+        """
+        The mean prediction of the Gaussian process, tabulated on the grid
+        :attr:`grid_axes` and linearly interpolated
+
+        The table is saved to the disk cache, keyed by the training data,
+        the hyperparameters, and the grid.
+        """
+        axes = self.grid_axes
+        shape = tuple(len(a) for a in axes)
+
+        # the key identifying this table
+        args = [self.__class__.__name__, __version__, self.kernel.__name__, self.solver.__name__,
+                np.asarray(self.x, dtype='f8'), np.asarray(self.y, dtype='f8'),
+                np.asarray(self.theta, dtype='f8')] + [np.asarray(a, dtype='f8') for a in axes]
+        if self.use_errors: args.append(np.asarray(self.yerr, dtype='f8'))
+        key = tools.get_hash_key(*args)
+
+        use_disk = _disk_cache.enabled()
+        values = _tables_cache.load(key, 'values') if use_disk else None
+        if values is None:
+
+            # predict on the grid, in chunks
+            pts = np.stack(np.meshgrid(*axes, indexing='ij'), axis=-1).reshape(-1, len(axes))
+            values = [self.predict(pts[i:i+GRID_CHUNKSIZE]) for i in range(0, len(pts), GRID_CHUNKSIZE)]
+            values = np.concatenate(values).reshape(shape)
+            table = RegularGridInterpolator(axes, values)
+
+            # check the accuracy against the Gaussian process
+            error = self.grid_error(table=table)
+            if error > self.grid_rtol:
+                args = (self.dependent, error, self.grid_rtol)
+                warnings.warn("tabulation error for '%s' (%.2e) exceeds `grid_rtol` (%.2e); increase `grid_size`" %args)
+
+            if use_disk:
+                _tables_cache.save(key, 'values', values)
+            return table
+
+        return RegularGridInterpolator(axes, values)
+
+    def grid_error(self, N=200, seed=42, table=None):
+        """
+        The maximum absolute difference between :attr:`grid_table` and the
+        Gaussian process, at ``N`` random points within the grid, relative
+        to the standard deviation of the training data
+        """
+        if table is None: table = self.grid_table
+        rng = np.random.RandomState(seed)
+        pts = np.column_stack([rng.uniform(a[0], a[-1], size=N) for a in table.grid])
+        return abs(table(pts) - self.predict(pts)).max() / np.std(self.y)
+
+    def predict(self, pt):
+        """
+        The mean prediction of the Gaussian process at the domain points
+        ``pt``, of shape (N, ndim)
+        """
+        pt = self.x_scaler.transform(pt)
+
+        if _george_v03():
+            kws = {'return_cov':False}
+        else:
+            kws = {'mean_only':True}
+        return self.y_scaler.inverse_transform(self.gp.predict(self.y_scaled, pt, **kws))
+
     @tools.align_input
     @tools.unpacked
     def __call__(self, *args, **indep_vars):
@@ -246,13 +388,15 @@ class GeorgeSimulationData(Cache):
         # the domain point to predict
         pt = np.asarray([indep_vars[k] for k in self.independent]).T
         if pt.ndim == 1: pt = pt.reshape(1, -1)
-        pt = self.x_scaler.transform(pt)
 
-        if GEORGE_v03:
-            kws = {'return_cov':False}
-        else:
-            kws = {'mean_only':True}
-        return self.y_scaler.inverse_transform(self.gp.predict(self.y_scaled, pt, **kws))
+        # interpolate from the table, inside the grid
+        if self.use_grid:
+            try:
+                return self.grid_table(pt)
+            except InterpolationDomainError:
+                pass
+
+        return self.predict(pt)
 
 
 class GeorgeSimulationDataSet(object):
@@ -271,6 +415,18 @@ class GeorgeSimulationDataSet(object):
         for i, dep in enumerate(dependent):
             self._data[dep] = GeorgeSimulationData(independent, data, theta[i], dependent_col=dep, **kwargs)
 
+    @property
+    def use_grid(self):
+        """
+        If `True`, interpolate the predictions from tables on a regular grid
+        """
+        return all(d.use_grid for d in self._data.values())
+
+    @use_grid.setter
+    def use_grid(self, val):
+        for d in self._data.values():
+            d.use_grid = val
+
     @tools.unpacked
     def __call__(self, *args, **indep_vars):
 
@@ -290,34 +446,38 @@ class Pmu4ResidualCorrection(GeorgeSimulationData):
     """
     Return the prediction for the Pmu4 model residual correction
     """
-    def __init__(self):
+    default_grid_size = 15
+
+    def __init__(self, **kwargs):
         #theta = [11.76523097, 7.63002238, 3.74838973, 0.84367439]
         #independent = ['sigma8_z', 'b1', 'k']
 
         theta = [33.66747949, 3.95336447, 1.74027224, 0.62058417] # with f
         independent = ['f', 'sigma8_z', 'b1', 'k']
         data = sim_data.Pmu4_correction_data()
-        super(Pmu4ResidualCorrection, self).__init__(independent, data, theta, use_errors=True)
+        super(Pmu4ResidualCorrection, self).__init__(independent, data, theta, use_errors=True, **kwargs)
 
 class Pmu2ResidualCorrection(GeorgeSimulationData):
     """
     Return the prediction for the Pmu2 model residual correction
     """
-    def __init__(self):
+    default_grid_size = 15
+
+    def __init__(self, **kwargs):
         #theta = [7.2492907, 4.48197495, 3.0182625, 0.67960878]
         #independent = ['sigma8_z', 'b1', 'k']
 
         theta = [11.84812224, 4.15569036, 1.26297742, 1.03950439] # with f
         independent = ['f', 'sigma8_z', 'b1', 'k']
         data = sim_data.Pmu2_correction_data()
-        super(Pmu2ResidualCorrection, self).__init__(independent, data, theta, use_errors=True)
+        super(Pmu2ResidualCorrection, self).__init__(independent, data, theta, use_errors=True, **kwargs)
 
 class VelocityDispersionFits(GeorgeSimulationData):
     """
     Return the halo velocity dispersion in Mpc/h, as measured from the
     runPB simulations, as a function of sigma8(z) and b1
     """
-    def __init__(self):
+    def __init__(self, **kwargs):
 
         theta = [0.48087061,  0.21521814,  0.45073149]
         data = sim_data.velocity_dispersion_data()
@@ -326,6 +486,7 @@ class VelocityDispersionFits(GeorgeSimulationData):
 
         independent = ['sigma8_z', 'b1']
         kws = {'use_errors':True, 'dependent_col':'sigma_v'}
+        kws.update(kwargs)
         super(VelocityDispersionFits, self).__init__(independent, data, theta, **kws)
 
 class NonlinearBiasFits(GeorgeSimulationDataSet):
@@ -333,7 +494,7 @@ class NonlinearBiasFits(GeorgeSimulationDataSet):
     Return the nonlinear biases b2_00 and b2_01 as a function of
     sigma8(z) and b1
     """
-    def __init__(self):
+    def __init__(self, **kwargs):
 
         data = sim_data.vlah_nonlinear_bias_fits()
         independent = ['b1']
@@ -350,31 +511,35 @@ class NonlinearBiasFits(GeorgeSimulationDataSet):
         theta[-2] = [ 7.48162433,  0.87971185]   # b2_01_a
         theta[-1] = [ 14.06494712,  12.08894434] # b2_01_b
 
-        super(NonlinearBiasFits, self).__init__(independent, dependent, data, theta, use_errors=True)
+        super(NonlinearBiasFits, self).__init__(independent, dependent, data, theta, use_errors=True, **kwargs)
 
 class AutoStochasticityFits(GeorgeSimulationData):
     """
     Return the prediction for the auto stochasticity
     """
-    def __init__(self):
+    default_grid_size = 25
+
+    def __init__(self, **kwargs):
 
         theta = [0.56384418, 0.76723559, 0.49555955, 5.7815692]
         data = sim_data.auto_stochasticity_data()
         independent = ['sigma8_z', 'b1', 'k']
 
-        super(AutoStochasticityFits, self).__init__(independent, data, theta, use_errors=True)
+        super(AutoStochasticityFits, self).__init__(independent, data, theta, use_errors=True, **kwargs)
 
 class CrossStochasticityFits(GeorgeSimulationData):
     """
     Return the prediction for the cross stochasticity
     """
-    def __init__(self):
+    default_grid_size = 15
+
+    def __init__(self, **kwargs):
 
         theta = [2.42796735, 0.59461745, 3.75844384, 1.5391186, 11.53257307]
         data = sim_data.cross_stochasticity_data()
         independent = ['sigma8_z', 'b1_1', 'b1_2', 'k']
 
-        super(CrossStochasticityFits, self).__init__(independent, data, theta, use_errors=True)
+        super(CrossStochasticityFits, self).__init__(independent, data, theta, use_errors=True, **kwargs)
 
 #-------------------------------------------------------------------------------
 # simulation data interpolated onto a grid
@@ -470,6 +635,7 @@ class SimulationP11(InterpolatedSimulationData):
         # make the data frame
         k = data[0][:,0]
         index_tups = list(itertools.product(interp_vars, k))
+        import pandas as pd
         index = pd.MultiIndex.from_tuples(index_tups, names=['z', 'k'])
         d = []
         for i, x in enumerate(data):
@@ -588,6 +754,7 @@ class SimulationPdv(InterpolatedSimulationData):
         # make the data frame
         k = data[0][:,0]
         index_tups = list(itertools.product(interp_vars, k))
+        import pandas as pd
         index = pd.MultiIndex.from_tuples(index_tups, names=['z', 'k'])
         d = []
         for i, x in enumerate(data):
@@ -0,0 +1,525 @@
+"""
+A versioned snapshot format for the RSD models, replacing pickled ``.npy``
+files
+
+A snapshot is a directory holding a ``snapshot.json`` file, with the format
+version, the model class and version, the model attributes, and the index of
+the stored arrays, and one ``.npy`` file for each array. The arrays are
+the array-valued attributes and cached values, the tables of the interpolated
+functions, and the linear and 1-loop power spectra tabulated on ``k_interp``.
+
+Loading a snapshot does not run CLASS or fit the Gaussian processes: the
+arrays are memory-mapped, and the splines are only built when first
+evaluated. Cached values that are not stored in the snapshot are recomputed
+when needed. The ``gcl`` objects replaced by their tables, which are needed
+to compute the PT integrals, are rebuilt from their stored state when first
+accessed (see :func:`as_gcl`).
+"""
+from .. import numpy as np, os, pygcl
+from ._interpolate import MultiSpline
+from ._cache import InterpolatedFunction
+from . import cosmology, tools, __version__
+
+import importlib
+import warnings
+import tempfile
+import shutil
+import json
+
+# the version of the snapshot format
+FORMAT_VERSION = 1
+
+# the name of the file describing the snapshot
+SNAPSHOT_FILE = 'snapshot.json'
+
+# the cached functions of k that are tabulated on ``k_interp``
+TABULATED_FUNCTIONS = ['power_lin', 'power_lin_nw', '_Pdd_0', '_Pdv_0', '_Pvv_0']
+
+# the cached values derived from the cosmology, which are always stored,
+# such that updating the model after loading does not run CLASS
+COSMOLOGY_VALUES = ['_sigma8_0', 'D', 'conformalH']
+
+# the attributes that are only valid for the instance
+LOCAL_ATTRIBUTES = ['_cache', '_memo', '_cache_stats', '_integrals_store',
+                    '_integrals_finalizer', 'integrals_expansion']
+
+class TabulatedFunction(object):
+    """
+    A function of wavenumber, restored from its table on ``k_interp``,
+    replacing a ``gcl`` object
+
+    The ``gcl`` object is only rebuilt from its state when it is first
+    accessed, as the :attr:`gcl` attribute. Its methods, e.g.,
+    ``GetCosmology``, are also available as attributes.
+
+    Parameters
+    ----------
+    name : str
+        the name of the tabulated function
+    x : array_like
+        the wavenumbers of the table
+    y : array_like
+        the values of the function
+    state : dict
+        the state of the ``gcl`` object, see :func:`gcl_state`
+    """
+    def __init__(self, name, x, y, state):
+        self.name = name
+        self.x = x
+        self.y = y
+        self.state = state
+        self._spline = None
+        self._gcl = None
+
+    def __call__(self, k):
+        if self._spline is None:
+            self._spline = tools.RSDSpline(self.x, self.y)
+        return self._spline(k)
+
+    @property
+    def gcl(self):
+        """
+        The ``gcl`` object replaced by the table
+        """
+        if self._gcl is None:
+            self._gcl = load_gcl(self.state)
+        return self._gcl
+
+    def __getattr__(self, name):
+        if name.startswith('_') or name in ['name', 'x', 'y', 'state', 'gcl']:
+            raise AttributeError(name)
+        return getattr(self.gcl, name)
+
+    def __getstate__(self):
+        return {'name':self.name, 'x':np.asarray(self.x), 'y':np.asarray(self.y), 'state':self.state}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+def as_gcl(value):
+    """
+    Return the ``gcl`` object ``value``, rebuilding it if it was replaced by
+    a :class:`TabulatedFunction`; use this to pass cached values that can be
+    tabulated in a snapshot to the ``gcl`` extension
+    """
+    if isinstance(value, TabulatedFunction):
+        return value.gcl
+    return value
+
+class SnapshotFunction(InterpolatedFunction):
+    """
+    An :class:`~pyRSD.rsd._cache.InterpolatedFunction` restored from
+    a snapshot, whose spline is built when first evaluated
+
+    Parameters
+    ----------
+    name : str
+        the name of the interpolated function
+    spec : dict
+        the description of the spline(s), see :func:`save_spline`
+    """
+    def __init__(self, name, spec):
+        self.name = name
+        self.spec = spec
+        self._spline = None
+
+    @property
+    def spline(self):
+        if self._spline is None:
+            self._spline = load_spline(self.spec)
+        return self._spline
+
+    def __getstate__(self):
+        return {'name':self.name, 'spline':self.spline}
+
+    def __setstate__(self, state):
+        self.name = state['name']
+        self.spec = None
+        self._spline = state['spline']
+
+#-------------------------------------------------------------------------------
+# the arrays
+#-------------------------------------------------------------------------------
+class _ArrayWriter(object):
+    """
+    Save the arrays of a snapshot as ``.npy`` files, returning their
+    references in ``snapshot.json``
+    """
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+
+    def __call__(self, value):
+        filename = 'array_%04d.npy' %self.count
+        self.count += 1
+        np.save(os.path.join(self.path, filename), np.asarray(value))
+        return {'__array__': filename}
+
+def encode(value, save):
+    """
+    Encode ``value`` in the JSON format of a snapshot, saving any arrays
+    with the callable ``save``
+
+    Raises
+    ------
+    TypeError :
+        if the type of ``value`` is not supported
+    """
+    if value is None or isinstance(value, (bool, str)):
+        return value
+    if isinstance(value, (np.bool_, np.integer, np.floating)):
+        return value.item()
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, cosmology.Cosmology):
+        state = {k: np.asarray(v).tolist() if hasattr(v, 'unit') else v for k, v in dict(value).items()}
+        return {'__cosmology__': encode(state, save)}
+    if isinstance(value, np.ndarray) and value.dtype != object:
+        return save(value)
+    if isinstance(value, (list, tuple)):
+        toret = [encode(v, save) for v in value]
+        return toret if isinstance(value, list) else {'__tuple__': toret}
+    if isinstance(value, dict) and all(isinstance(k, str) for k in value):
+        return {'__dict__': {k: encode(v, save) for k, v in value.items()}}
+    raise TypeError("cannot store a value of type '%s' in a snapshot" %type(value).__name__)
+
+def decode(value, load):
+    """
+    Decode a value in the JSON format of a snapshot, loading any arrays
+    with the callable ``load``
+    """
+    if isinstance(value, list):
+        return [decode(v, load) for v in value]
+    if not isinstance(value, dict):
+        return value
+    if '__array__' in value:
+        return load(value['__array__'])
+    if '__tuple__' in value:
+        return tuple(decode(v, load) for v in value['__tuple__'])
+    if '__dict__' in value:
+        return {k: decode(v, load) for k, v in value['__dict__'].items()}
+    if '__cosmology__' in value:
+        return cosmology.Cosmology(**decode(value['__cosmology__'], load))
+    raise ValueError("invalid value in snapshot: %s" %str(value))
+
+#-------------------------------------------------------------------------------
+# the gcl objects
+#-------------------------------------------------------------------------------
+def _is_state(value):
+    return isinstance(value, dict) and 'class' in value and 'args' in value
+
+def gcl_state(value):
+    """
+    Return the state of the ``gcl`` object ``value``, from which it is rebuilt
+    by :func:`load_gcl`, or `None` if it cannot be rebuilt
+
+    The state holds the name of the class and the pickled arguments, which
+    can be other ``gcl`` objects, or their :class:`TabulatedFunction`
+    """
+    if isinstance(value, TabulatedFunction):
+        return value.state
+    if not isinstance(value, pygcl.PickalableSWIG):
+        return None
+    args = list(value.__getstate__()['args'])
+    return {'class':type(value).__name__, 'args':args, 'read_only':bool(getattr(value, 'read_only', False))}
+
+def save_gcl(state, save, refs):
+    """
+    Return the description of the ``gcl`` state ``state`` in the JSON
+    format of a snapshot, saving the arrays with ``save``
+
+    The arguments in ``refs``, a dictionary of names keyed by the identity
+    of the objects, are saved as references to the tabulated functions
+    of the snapshot
+
+    Raises
+    ------
+    TypeError :
+        if the type of an argument is not supported
+    """
+    args = []
+    for arg in state['args']:
+        if id(arg) in refs:
+            args.append({'__ref__':refs[id(arg)]})
+            continue
+        if not _is_state(arg):
+            arg = gcl_state(arg) or arg
+        args.append(save_gcl(arg, save, refs) if _is_state(arg) else encode(arg, save))
+    return {'__gcl__':state['class'], 'args':args, 'read_only':state['read_only']}
+
+def decode_gcl(spec, load, refs):
+    """
+    Decode the description of a ``gcl`` state, loading the arrays with
+    ``load``, and the references from the dictionary ``refs``
+    """
+    args = []
+    for arg in spec['args']:
+        if isinstance(arg, dict) and '__ref__' in arg:
+            args.append(refs[arg['__ref__']])
+        elif isinstance(arg, dict) and '__gcl__' in arg:
+            args.append(decode_gcl(arg, load, refs))
+        else:
+            args.append(decode(arg, load))
+    return {'class':spec['__gcl__'], 'args':args, 'read_only':spec['read_only']}
+
+def load_gcl(state):
+    """
+    Rebuild the ``gcl`` object from its state, as returned by :func:`gcl_state`
+
+    Cosmologies that were shared by the cache of CLASS outputs are restored
+    from the cache (see :func:`pyRSD.pygcl.Cosmology.cached`)
+    """
+    args = []
+    for arg in state['args']:
+        if _is_state(arg):
+            arg = load_gcl(arg)
+        elif isinstance(arg, np.ndarray):
+            arg = np.array(arg) # copy any memory maps
+        args.append(as_gcl(arg))
+    cls = getattr(pygcl, state['class'])
+    if state['class'] == 'Cosmology' and state['read_only']:
+        return cls.cached(args[0], args[1], args[2])
+
+    toret = cls.__new__(cls)
+    toret.__setstate__({'args':args})
+    return toret
+
+#-------------------------------------------------------------------------------
+# the splines
+#-------------------------------------------------------------------------------
+def save_spline(spline, save):
+    """
+    Return the description of ``spline`` in the JSON format of a snapshot,
+    saving the arrays with ``save``, or `None` if the type of spline is
+    not supported
+    """
+    if isinstance(spline, list):
+        toret = [save_spline(spl, save) for spl in spline]
+        return None if None in toret else {'kind':'list', 'splines':toret}
+    if isinstance(spline, MultiSpline):
+        b = spline._bspline
+        return {'kind':'multi', 'x':save(spline.x), 't':save(b.t), 'c':save(b.c), 'k':int(b.k),
+                'bounds_error':bool(spline.bounds_error), 'fill_value':encode(spline.fill_value, save)}
+    if isinstance(spline, tools.RSDSpline):
+        degree = int(spline._eval_args[2])
+        return {'kind':'rsd', 'x':save(spline.x), 'y':save(spline.y), 'k':degree,
+                'bounds_error':encode(spline.bounds_error, save), 'fill_value':encode(spline.fill_value, save)}
+    return None
+
+def load_spline(spec):
+    """
+    Return the spline described by ``spec``, as returned by :func:`save_spline`,
+    with the arrays already loaded
+    """
+    kind = spec['kind']
+    if kind == 'list':
+        return [load_spline(s) for s in spec['splines']]
+    elif kind == 'multi':
+        from scipy.interpolate import BSpline
+        b = BSpline(spec['t'], spec['c'], spec['k'], extrapolate=False)
+        return MultiSpline._from_bspline(spec['x'], b, spec['bounds_error'], spec['fill_value'])
+    elif kind == 'rsd':
+        return tools.RSDSpline(spec['x'], spec['y'], k=spec['k'],
+                               bounds_error=spec['bounds_error'], fill_value=spec['fill_value'])
+    raise ValueError("invalid spline kind '%s' in snapshot" %kind)
+
+#-------------------------------------------------------------------------------
+# saving and loading
+#-------------------------------------------------------------------------------
+def save_snapshot(model, path):
+    """
+    Save a snapshot of ``model`` to the directory ``path``
+
+    The attributes of the model must be JSON types, arrays, or
+    :class:`~pyRSD.rsd.cosmology.Cosmology` objects, except for those in
+    the ``_derived_attributes`` of the model, which are not stored and are
+    rebuilt on loading by its ``_init_derived`` function. Cached values
+    that are neither arrays, numbers, interpolated functions, nor in
+    :data:`TABULATED_FUNCTIONS` are not stored, and are recomputed
+    after loading. The values in :data:`COSMOLOGY_VALUES` are always
+    stored.
+
+    Parameters
+    ----------
+    model : DarkMatterSpectrum
+        the model to save
+    path : str
+        the name of the directory; an existing snapshot is replaced
+
+    Raises
+    ------
+    ValueError :
+        if ``path`` exists, and is not an empty directory or a snapshot
+    """
+    path = os.path.abspath(path)
+    if os.path.exists(path) and not is_snapshot(path):
+        if not os.path.isdir(path) or len(os.listdir(path)):
+            raise ValueError("cannot save a snapshot to '%s'; it exists and is not a snapshot" %path)
+
+    # write to a temporary directory, and then replace the old snapshot, such
+    # that no files of a previous snapshot are left
+    parent, basename = os.path.split(path)
+    if not os.path.isdir(parent):
+        os.makedirs(parent)
+    tmpdir = tempfile.mkdtemp(prefix='.%s.' %basename, dir=parent)
+    try:
+        os.chmod(tmpdir, 0o755)
+        _write_snapshot(model, tmpdir)
+        if os.path.exists(path):
+            olddir = tempfile.mkdtemp(prefix='.%s.' %basename, dir=parent)
+            os.rename(path, os.path.join(olddir, basename))
+            os.rename(tmpdir, path)
+            shutil.rmtree(olddir)
+        else:
+            os.rename(tmpdir, path)
+    finally:
+        if os.path.isdir(tmpdir):
+            shutil.rmtree(tmpdir)
+
+def _write_snapshot(model, path):
+    """
+    Write the snapshot of ``model`` to the existing directory ``path``
+    """
+    save = _ArrayWriter(path)
+
+    # evaluate the values derived from the cosmology
+    for name in COSMOLOGY_VALUES:
+        getattr(model, name)
+
+    # the attributes, except those rebuilt when loading
+    skip = set(LOCAL_ATTRIBUTES) | set(getattr(model, '_derived_attributes', []))
+    attrs = {}
+    for name, value in model.__dict__.items():
+        if name in skip:
+            continue
+        try:
+            attrs[name] = encode(value, save)
+        except TypeError as e:
+            raise ValueError("cannot save attribute '%s' of the model: %s" %(name, str(e)))
+
+    # the tabulated functions, with the state of their gcl objects
+    tabulated, refs = {}, {}
+    for name in TABULATED_FUNCTIONS:
+        value = model._cache.get(name, None)
+        state = gcl_state(value)
+        if state is None:
+            continue
+        try:
+            state = save_gcl(state, save, refs)
+        except TypeError:
+            continue
+        if isinstance(value, TabulatedFunction):
+            x, y = value.x, value.y
+        else:
+            x = model.k_interp
+            y = value(x)
+        tabulated[name] = {'x':save(x), 'y':save(y), 'state':state}
+        refs[id(value)] = name
+        if isinstance(value, TabulatedFunction) and value._gcl is not None:
+            refs[id(value._gcl)] = name
+
+    # the cached values
+    values, splines = {}, {}
+    for name, value in model._cache.items():
+        if name in TABULATED_FUNCTIONS:
+            continue
+        elif isinstance(value, InterpolatedFunction):
+            spec = save_spline(value.spline, save)
+            if spec is not None: splines[name] = spec
+        elif isinstance(value, (float, int, np.number, np.bool_, np.ndarray)):
+            if np.asarray(value).dtype != object:
+                values[name] = encode(value, save)
+
+    meta = {}
+    meta['format_version'] = FORMAT_VERSION
+    meta['class'] = "%s:%s" %(model.__class__.__module__, model.__class__.__name__)
+    meta['version'] = getattr(model, '__version__', __version__)
+    meta['attributes'] = attrs
+    meta['values'] = values
+    meta['splines'] = splines
+    meta['tabulated'] = tabulated
+
+    with open(os.path.join(path, SNAPSHOT_FILE), 'w') as ff:
+        json.dump(meta, ff, indent=1, sort_keys=True)
+
+def is_snapshot(path):
+    """
+    Whether ``path`` is the directory of a snapshot
+    """
+    return os.path.isfile(os.path.join(path, SNAPSHOT_FILE))
+
+def load_snapshot(path, mmap=True, show_warning=True):
+    """
+    Load a model from the snapshot in the directory ``path``
+
+    Parameters
+    ----------
+    path : str
+        the name of the directory
+    mmap : bool, optional
+        if `True`, the arrays are loaded as read-only memory maps, which are
+        shared by all processes on the same node
+    show_warning : bool, optional
+        if `True`, warn if the version of the model is out of date
+
+    Returns
+    -------
+    model : DarkMatterSpectrum
+        the model
+    """
+    from . import OutdatedModelWarning
+
+    filename = os.path.join(path, SNAPSHOT_FILE)
+    if not os.path.isfile(filename):
+        raise ValueError("'%s' is not a model snapshot; no '%s' file" %(path, SNAPSHOT_FILE))
+    with open(filename, 'r') as ff:
+        meta = json.load(ff)
+
+    if meta.get('format_version', 0) > FORMAT_VERSION:
+        args = (meta.get('format_version'), FORMAT_VERSION)
+        raise ValueError("snapshot format version %s is newer than the supported version %d" %args)
+
+    mmap_mode = 'r' if mmap else None
+    def load(filename):
+        return np.load(os.path.join(path, filename), mmap_mode=mmap_mode, allow_pickle=False)
+
+    # initialize the model, without calling __init__
+    modname, clsname = meta['class'].split(':')
+    cls = getattr(importlib.import_module(modname), clsname)
+    model = cls.__new__(cls)
+    for name, value in meta['attributes'].items():
+        model.__dict__[name] = decode(value, load)
+    if hasattr(model, '_init_derived'):
+        model._init_derived()
+
+    # restore the cached values
+    for name, value in meta['values'].items():
+        model._cache[name] = decode(value, load)
+    for name, spec in meta['splines'].items():
+        model._cache[name] = SnapshotFunction(name, decode_spline(spec, load))
+    tabulated = {}
+    for name in TABULATED_FUNCTIONS:
+        if name not in meta['tabulated']:
+            continue
+        spec = meta['tabulated'][name]
+        state = decode_gcl(spec['state'], load, tabulated)
+        tabulated[name] = TabulatedFunction(name, decode(spec['x'], load), decode(spec['y'], load), state)
+        model._cache[name] = tabulated[name]
+
+    # check the version
+    version = meta.get('version')
+    if show_warning and version != __version__:
+        msg = "loading an outdated model:\n"
+        msg += '\tcurrent model version: %s\n' %(__version__)
+        msg += '\tloaded model version: %s\n' %(version)
+        warnings.warn(msg, OutdatedModelWarning)
+
+    return model
+
+def decode_spline(spec, load):
+    """
+    Decode the description of a spline, loading its arrays with ``load``
+    """
+    if spec['kind'] == 'list':
+        return dict(spec, splines=[decode_spline(s, load) for s in spec['splines']])
+    return {k: decode(v, load) for k, v in spec.items()}
@@ -5,17 +5,18 @@ from . import APLock
 from ._cache import Cache, parameter, cached_property
 from ._interpolate import RegularGridInterpolator, InterpolationDomainError
 
-from scipy.integrate import simps
 import scipy.interpolate as interp
 from scipy.optimize import brentq
 from scipy.interpolate import InterpolatedUnivariateSpline as spline
 
 import functools
-import itertools
 import inspect
 import hashlib
+import contextlib
+import threading
+import warnings
+import sys
 from six import PY3
-import xarray as xr
 
 def return_xarray(pkmu, k, mu, flatten=False):
 
@@ -33,6 +34,7 @@ def return_xarray(pkmu, k, mu, flatten=False):
         coords = {'k': k[:,0], 'mu':mu[0,:]}
 
     # convert to xarray
+    import xarray as xr
     return xr.DataArray(pkmu, coords=coords, dims=dims)
 
 def get_hash_key(*args):
@@ -59,10 +61,7 @@ def k_AP(k_obs, mu_obs, alpha_perp, alpha_par):
     the AP effect
     """
     F = alpha_par / alpha_perp
-    if (F != 1.):
-        return (k_obs/alpha_perp)*(1 + mu_obs**2*(1./F**2 - 1))**(0.5)
-    else:
-        return k_obs/alpha_perp
+    return (k_obs/alpha_perp)*(1 + mu_obs**2*(1./F**2 - 1))**(0.5)
 
 def mu_AP(mu_obs, alpha_perp, alpha_par):
     """
@@ -128,37 +127,27 @@ def align_input(f):
 
     return wrapper
 
-# global cache space
-_global_cache = None
-
-def cache_on():
-    global _global_cache
-    _global_cache = {}
-
-def cache_off():
-    global _global_cache
-    _global_cache = None
-
 def cacheable(f):
     """
-    Decorator to optionally cache the function return value
+    Decorator to optionally memoize the function return value
 
-    If the class has a :attr:`_scratch` that is a dictionary,
-    this decorator will cache the function return value,
-    using the input arguments and function name as the hash key
+    If the model (``self.model``, or ``self`` if there is no such
+    attribute) has an active :class:`~pyRSD.rsd._cache.MemoCache`, i.e., inside
+    its :func:`use_cache` context, the return value is memoized using the
+    identity of the input arguments and the cache version of the model
     """
+    name = f.__name__
+
     @functools.wraps(f)
     def wrap(self, *args, **kws):
 
-        if _global_cache is not None and isinstance(_global_cache, dict):
-            name = "%s.%s" %(self.__class__.__name__, f.__name__)
-            hashkey = get_hash_key(name, *args)
-            if hashkey not in _global_cache:
-                _global_cache[hashkey] = f(self, *args, **kws)
-            return _global_cache[hashkey]
+        model = getattr(self, 'model', self)
+        memo = getattr(model, '_memo', None)
+        if memo is not None:
+            version = getattr(model, '_cache_version', 0)
+            return memo.evaluate(name, version, f, self, *args, **kws)
 
-        ret = f(self, *args, **kws)
-        return ret
+        return f(self, *args, **kws)
 
     return wrap
 
@@ -222,6 +211,40 @@ def alcock_paczynski(f, alpha_par=None, alpha_perp=None, alpha_drag=None):
     return wrap
 
 
+class _RawOutput(threading.local):
+    """
+    The nesting depth of :func:`raw_output` contexts, for each thread
+    """
+    depth = 0
+
+_raw_output = _RawOutput()
+
+@contextlib.contextmanager
+def raw_output():
+    """
+    Context manager in which functions decorated with :func:`broadcast_kmu`
+    return numpy arrays, rather than :class:`xarray.DataArray` objects
+
+    This is used for calls internal to the model, which skip building
+    the coordinates of the output
+    """
+    _raw_output.depth += 1
+    try:
+        yield
+    finally:
+        _raw_output.depth -= 1
+
+def can_fork():
+    """
+    Whether worker processes can be started from this process, which is not
+    the case for workers of another pool or MPI ranks
+    """
+    import multiprocessing
+    if multiprocessing.current_process().name != 'MainProcess':
+        return False
+    MPI = sys.modules.get('mpi4py.MPI', None)
+    return MPI is None or MPI.COMM_WORLD.size == 1
+
 def broadcast_kmu(f):
     """
     Decorator to properly handle broadcasting of k, mu.
@@ -233,7 +256,9 @@ def broadcast_kmu(f):
     Notes
     -----
     This assumes the first two arguments of ``f()``
-    are `k` and `mu`
+    are `k` and `mu`. Only the outermost call returns a
+    :class:`xarray.DataArray`; nested calls, or calls inside a
+    :func:`raw_output` context, return numpy arrays.
     """
     @functools.wraps(f)
     def wrapper(self, *args, **kwargs):
@@ -260,69 +285,210 @@ def broadcast_kmu(f):
         if args[0].ndim > 2 or args[1].ndim > 2:
             raise ValueError(("incompatible `k`, `mu` dimensions for broadcasted; "
                               "arrays should have maximum dimension of 2"))
-        P = np.squeeze(f(self, *args, **kwargs))
+
+        # nested calls return numpy arrays
+        with raw_output():
+            P = np.squeeze(f(self, *args, **kwargs))
+
+        if _raw_output.depth:
+            return np.atleast_1d(P)
         return return_xarray(P, args[0], args[1], flatten=kwargs.get('flatten', False))
 
     return wrapper
 
-def monopole(f):
+#-------------------------------------------------------------------------------
+# multipole projection
+#-------------------------------------------------------------------------------
+GAUSS_LEGENDRE_NMU = 12
+"""
+The default number of Gauss-Legendre nodes in ``mu`` used to compute multipoles
+"""
+
+_legendre_weights_cache = {}
+
+def legendre_weights(ells, Nmu):
+    r"""
+    Return the Gauss-Legendre nodes on ``0 <= mu <= 1`` and the weights that
+    project :math:`P(k,\mu)` at those nodes onto the multipoles ``ells``
+
+    The results are cached, and should not be modified.
+
+    Parameters
+    ----------
+    ells : tuple of int
+        the multipole numbers
+    Nmu : int
+        the number of nodes
+
+    Returns
+    -------
+    mu : array_like, (Nmu,)
+        the nodes
+    weights : array_like, (Nell, Nmu)
+        the weights, equal to :math:`(2\ell+1) \mathcal{L}_\ell(\mu) w`,
+        where :math:`w` are the quadrature weights
+    """
+    key = (tuple(int(ell) for ell in ells), int(Nmu))
+    if key not in _legendre_weights_cache:
+        from scipy.special import eval_legendre
+
+        # nodes and weights on [-1, 1], mapped to [0, 1]
+        x, w = np.polynomial.legendre.leggauss(key[1])
+        mu = 0.5*(x + 1.); w = 0.5*w
+
+        weights = np.array([(2*ell+1.)*eval_legendre(ell, mu)*w for ell in key[0]])
+        mu.flags.writeable = False
+        weights.flags.writeable = False
+        _legendre_weights_cache[key] = (mu, weights)
+
+    return _legendre_weights_cache[key]
+
+class LegendreProjection(object):
+    r"""
+    Project :math:`P(k,\mu)` onto Legendre multipoles using Gauss-Legendre
+    quadrature over ``0 <= mu <= 1``
+
+    The power is evaluated at the nodes :attr:`mu`, for all ``k`` at once,
+    and the multipoles are a single matrix product with the
+    (``ell`` x ``mu``) weights. Integrands that are polynomials in ``mu``
+    of degree less than ``2*Nmu`` are integrated exactly; for smooth
+    integrands (e.g., with Fingers-of-God damping or the AP effect, which
+    the model applies when evaluated at the nodes) 8-12 nodes give the
+    accuracy of Simpson's rule with ~40 uniformly spaced points. See
+    :func:`from_accuracy` to choose the number of nodes for a desired accuracy.
+
+    Parameters
+    ----------
+    ells : int, array_like
+        the multipole numbers
+    Nmu : int, optional
+        the number of nodes; default is :data:`GAUSS_LEGENDRE_NMU`
+    """
+    def __init__(self, ells, Nmu=None):
+        if Nmu is None: Nmu = GAUSS_LEGENDRE_NMU
+        if Nmu < 1:
+            raise ValueError("the number of Gauss-Legendre nodes should be positive, not %d" %Nmu)
+
+        self.ells = np.array(ells, ndmin=1)
+        self.Nmu = Nmu
+        self.mu, self.weights = legendre_weights(self.ells, Nmu)
+
+    def __call__(self, pkmu):
+        """
+        Project the power onto the multipoles
+
+        Parameters
+        ----------
+        pkmu : array_like, (..., Nmu)
+            the power evaluated at :attr:`mu`, along the last axis
+
+        Returns
+        -------
+        poles : array_like, (..., Nell)
+            the multipoles
+        """
+        return np.dot(np.asarray(pkmu), self.weights.T)
+
+    def diagonal(self, pkmu):
+        """
+        Project each row of ``pkmu`` onto the corresponding multipole, i.e.,
+        row ``i`` is projected onto ``ells[i]``
+
+        Parameters
+        ----------
+        pkmu : array_like, (Nell, Nmu)
+            the power evaluated at :attr:`mu`
+
+        Returns
+        -------
+        poles : array_like, (Nell,)
+        """
+        return np.einsum('ij,ij->i', np.asarray(pkmu), self.weights)
+
+    @classmethod
+    def from_accuracy(cls, power, ells, rtol=1e-4, Nmin=4, Nmax=64, step=4):
+        r"""
+        Return the projection with the fewest nodes such that the multipoles
+        agree with the next number of nodes to a relative tolerance ``rtol``
+
+        The tolerance is relative to the maximum of :math:`|P(k,\mu)|` over
+        ``mu``, for each ``k``, such that the small higher multipoles are
+        not required to a higher accuracy than the monopole.
+
+        Parameters
+        ----------
+        power : callable
+            function returning the power at the input ``mu`` nodes, with
+            shape (Nk, Nmu)
+        ells : int, array_like
+            the multipole numbers
+        rtol : float, optional
+            the relative tolerance
+        Nmin, Nmax : int, optional
+            the minimum and maximum number of nodes
+        step : int, optional
+            the increment in the number of nodes
+
+        Returns
+        -------
+        LegendreProjection :
+            the projection
+        """
+        def evaluate(proj):
+            P = np.reshape(power(proj.mu), (-1, proj.Nmu))
+            return proj(P), abs(P).max(axis=-1)[:,None]
+
+        proj = cls(ells, Nmu=Nmin)
+        poles, _ = evaluate(proj)
+        while proj.Nmu < Nmax:
+            next_proj = cls(ells, Nmu=min(proj.Nmu+step, Nmax))
+            next_poles, scale = evaluate(next_proj)
+            if np.all(abs(next_poles - poles) <= rtol*scale):
+                return proj
+            proj, poles = next_proj, next_poles
+
+        warnings.warn("multipoles not converged to rtol = %g with %d Gauss-Legendre nodes" %(rtol, Nmax))
+        return proj
+
+def _project_multipole(f, ell):
     """
-    Decorator to compute the monopole from a `self.power` function
+    Wrap a ``self.power`` function ``f`` to return the multipole ``ell``
     """
     @functools.wraps(f)
     def wrapper(self, *args, **kwargs):
-        k = args[0]; Nmu = 41
-        if len(k) == Nmu: Nmu += 1
-        mus = np.linspace(0., 1., Nmu)
+        proj = LegendreProjection(ell, Nmu=kwargs.pop('Nmu', None))
+        k = np.atleast_1d(args[0])
         kwargs['flatten'] = False
-        Pkmus = f(self, k, mus, **kwargs)
-        return np.array([simps(pk, x=mus) for pk in Pkmus])
+
+        # evaluate on the full (k, mu) grid
+        with raw_output():
+            Pkmus = f(self, k[:,None], proj.mu[None,:], **kwargs)
+        return proj(np.reshape(Pkmus, (len(k), proj.Nmu)))[:,0]
     return wrapper
 
+def monopole(f):
+    """
+    Decorator to compute the monopole from a `self.power` function
+    """
+    return _project_multipole(f, 0)
+
 def quadrupole(f):
     """
     Decorator to compute the quadrupole from a `self.power` function
     """
-    @functools.wraps(f)
-    def wrapper(self, *args, **kwargs):
-        k = args[0]; Nmu = 41
-        if len(k) == Nmu: Nmu += 1
-        mus = np.linspace(0., 1., Nmu)
-        kwargs['flatten'] = False
-        Pkmus = f(self, k, mus, **kwargs)
-        kern = 2.5*(3*mus**2 - 1.)
-        return np.array([simps(kern*pk, x=mus) for pk in Pkmus])
-    return wrapper
+    return _project_multipole(f, 2)
 
 def hexadecapole(f):
     """
     Decorator to compute the hexadecapole from a `self.power` function
     """
-    @functools.wraps(f)
-    def wrapper(self, *args, **kwargs):
-        k = args[0]; Nmu = 41
-        if len(k) == Nmu: Nmu += 1
-        mus = np.linspace(0., 1., Nmu)
-        kwargs['flatten'] = False
-        Pkmus = f(self, k, mus, **kwargs)
-        kern = 9./8.*(35*mus**4 - 30.*mus**2 + 3.)
-        return np.array([simps(kern*pk, x=mus) for pk in Pkmus])
-    return wrapper
+    return _project_multipole(f, 4)
 
 def tetrahexadecapole(f):
     """
     Decorator to compute the tetrahexadecapole from a `self.power` function
     """
-    @functools.wraps(f)
-    def wrapper(self, *args, **kwargs):
-        k = args[0]; Nmu = 41
-        if len(k) == Nmu: Nmu += 1
-        mus = np.linspace(0., 1., Nmu)
-        kwargs['flatten'] = False
-        Pkmus = f(self, k, mus, **kwargs)
-        kern = 13./16.*(231*mus**6 - 315*mus**4 + 105*mus**2 - 5)
-        return np.array([simps(kern*pk, x=mus) for pk in Pkmus])
-    return wrapper
+    return _project_multipole(f, 6)
 
 
 #-------------------------------------------------------------------------------
@@ -454,48 +620,74 @@ class BiasToMassRelation(Cache):
         return pygcl.LinearPS(self.cosmo, 0.)
 
     #---------------------------------------------------------------------------
-    @cached_property()
-    def interpolation_table(self):
+    @cached_property("cosmo")
+    def _log_mass_spline(self):
         """
-        Evaluate the bias to mass relation at the interpolation grid points
+        Spline of the log of the mass as a function of the log of the
+        mass variance ``sigma`` at `z=0`, from ``sigma(R)`` evaluated once
         """
-        # setup a few functions we need
         mean_dens = self.cosmo.rho_bar_z(0.)
-        mass_norm = 1e13
-        mass_to_radius = lambda M: (3.*M*mass_norm/(4.*np.pi*mean_dens))**(1./3.)
-        s8_0 = self.cosmo.sigma8()
+        R = np.logspace(-3, 4, 1000)
+        sigmas = np.asarray(self.power_lin.Sigma(R))
+        M = 4.*np.pi/3.*mean_dens*R**3
 
-        # setup the sigma spline
-        R_interp = np.logspace(-3, 4, 1000)
-        sigmas = self.power_lin.Sigma(R_interp)
-        sigma_spline = RSDSpline(R_interp, sigmas, bounds_error=True)
+        # sigma decreases with R
+        return RSDSpline(np.log(sigmas[::-1]), np.log(M[::-1]), bounds_error=True)
 
-        # the objective function to minimize
-        def objective(mass, bias, rescaling):
-            sigma = rescaling*sigma_spline(mass_to_radius(mass))
-            return bias_Tinker(sigma) - bias
+    @cached_property("delta_halo")
+    def _peak_height_table(self):
+        """
+        The peak height ``nu`` and the Tinker bias on the branch where the
+        bias increases monotonically with ``nu``
+        """
+        nu = np.logspace(-2, 1.5, 2000)
+        bias = bias_Tinker(DELTA_C/nu, delta_halo=self.delta_halo)
+        i = np.argmin(bias)
+        return nu[i:], bias[i:]
 
-        # setup the grid points
-        sigma8s = self.interpolation_grid['sigma8_z']
-        b1s = self.interpolation_grid['b1']
-        pts = np.asarray(list(itertools.product(sigma8s, b1s)))
+    def peak_height(self, b1, niter=3):
+        """
+        Invert the Tinker bias relation, returning the peak height
+        ``nu = delta_c / sigma`` corresponding to the linear bias ``b1``
 
-        grid_vals = []
-        for (s8_z, b1) in pts:
+        This interpolates a table of the monotonic relation, followed by
+        ``niter`` Newton steps, for all values of ``b1`` at once.
+        """
+        b1 = np.asarray(b1, dtype=float)
+        nu_table, b_table = self._peak_height_table
+        if np.any(b1 < b_table[0]) or np.any(b1 > b_table[-1]):
+            args = (b_table[0], b_table[-1])
+            raise ValueError("linear bias out of range of the Tinker bias relation [%.3f, %.1f]" %args)
 
-            # get appropriate rescalings
-            rescaling = (s8_z / s8_0)
+        # the parameters of the Tinker bias, as a function of nu
+        dc = DELTA_C
+        A, a, B, b, C, c = _tinker_params(self.delta_halo)
 
-            # find the zero
-            try:
-                M = brentq(objective, 1e-10, 1e4, args=(b1, rescaling))*mass_norm
-            except Exception as e:
-                print(s8, b1)
-                print(objective(1e-10, b1, rescaling), objective(1e4, b1, rescaling))
-                raise Exception(e)
+        nu = np.interp(b1, b_table, nu_table)
+        for i in range(niter):
+            f = 1. - A*nu**a/(nu**a + dc**a) + B*nu**b + C*nu**c - b1
+            df = -A*a*nu**(a-1)*dc**a/(nu**a + dc**a)**2 + B*b*nu**(b-1) + C*c*nu**(c-1)
+            nu = nu - f/df
+        return nu
+
+    def invert(self, sigma8_z, b1):
+        """
+        Return the mass [units: `M_sun/h`] associated with the desired
+        `b1` and `sigma8` values, without the interpolation table
+
+        The inputs can be arrays, which are broadcast against each other.
+        """
+        sigma = DELTA_C/self.peak_height(b1) * (self.cosmo.sigma8() / np.asarray(sigma8_z))
+        return np.exp(self._log_mass_spline(np.log(sigma)))
 
-            grid_vals.append(M)
-        grid_vals = np.array(grid_vals).reshape((len(sigma8s), len(b1s)))
+    @cached_property("cosmo", "delta_halo")
+    def interpolation_table(self):
+        """
+        Evaluate the bias to mass relation at the interpolation grid points
+        """
+        sigma8s = self.interpolation_grid['sigma8_z']
+        b1s = self.interpolation_grid['b1']
+        grid_vals = self.invert(sigma8s[:,None], b1s[None,:])
 
         # return the interpolator
         return RegularGridInterpolator((sigma8s, b1s), grid_vals)
@@ -508,32 +700,22 @@ class BiasToMassRelation(Cache):
 
         Parameters
         ----------
-        sigma8_z : float
+        sigma8_z : float, array_like
             The sigma8 value
-        b1 : float
+        b1 : float, array_like
             The linear bias
         """
-        def compute_fresh(sigma8_z, b1):
-            # setup a few functions we need
-            mean_dens = self.cosmo.rho_bar_z(0.)
-            mass_norm = 1e13
-            mass_to_radius = lambda M: (3.*M*mass_norm/(4.*np.pi*mean_dens))**(1./3.)
-            rescaling = sigma8_z / self.cosmo.sigma8()
-
-            # the objective function to minimize
-            def objective(mass):
-                sigma = rescaling*self.power_lin.Sigma(mass_to_radius(mass))
-                return bias_Tinker(sigma, delta_halo=self.delta_halo) - b1
-
-            return brentq(objective, 1e-8, 1e3)*mass_norm
-
+        toret = None
         if self.interpolate:
+            sigma8_z, b1 = np.broadcast_arrays(sigma8_z, b1)
             try:
-                return self.interpolation_table([sigma8_z, b1])
+                pts = np.column_stack([np.ravel(sigma8_z), np.ravel(b1)])
+                toret = self.interpolation_table(pts).reshape(b1.shape)
             except InterpolationDomainError:
-                return compute_fresh(sigma8_z, b1)
-        else:
-            return compute_fresh(sigma8_z, b1)
+                pass
+        if toret is None:
+            toret = self.invert(sigma8_z, b1)
+        return toret if np.ndim(toret) else float(toret)
 
 
 #-------------------------------------------------------------------------------
@@ -690,22 +872,32 @@ def mass_from_bias(bias, z, linearPS):
 
     return brentq(objective, 1e-5, 1e5)*mass_norm
 
-def bias_Tinker(sigmas, delta_c=1.686, delta_halo=200):
-    """
-    Return the halo bias for the Tinker form.
+# the critical overdensity for collapse
+DELTA_C = 1.686
 
-    Tinker, J., et al., 2010. ApJ 724, 878-886.
-    http://iopscience.iop.org/0004-637X/724/2/878
+def _tinker_params(delta_halo):
+    """
+    Return the parameters ``(A, a, B, b, C, c)`` of the Tinker bias as a
+    function of the halo overdensity
     """
     y = np.log10(delta_halo)
-
-    # get the parameters as a function of halo overdensity
     A = 1. + 0.24*y*np.exp(-(4./y)**4)
     a = 0.44*y - 0.88
     B = 0.183
     b = 1.5
     C = 0.019 + 0.107*y + 0.19*np.exp(-(4./y)**4)
     c = 2.4
+    return A, a, B, b, C, c
+
+def bias_Tinker(sigmas, delta_c=DELTA_C, delta_halo=200):
+    """
+    Return the halo bias for the Tinker form.
+
+    Tinker, J., et al., 2010. ApJ 724, 878-886.
+    http://iopscience.iop.org/0004-637X/724/2/878
+    """
+    # get the parameters as a function of halo overdensity
+    A, a, B, b, C, c = _tinker_params(delta_halo)
 
     nu = delta_c / sigmas
     return 1. - A * (nu**a)/(nu**a + delta_c**a) + B*nu**b + C*nu**c
@@ -3,6 +3,7 @@ from pyRSD.rsd._cache import parameter, cached_property
 from pyRSD.rsd.transfers import TransferBase
 
 import xarray as xr
+from scipy import sparse
 from scipy.special import legendre
 from scipy.interpolate import InterpolatedUnivariateSpline as spline
 
@@ -157,6 +158,87 @@ class GriddedWedgeTransfer(TransferBase):
         dig_mu = np.digitize(self.grid.mu[self.grid.notnull], self.mu_edges)
         return np.ravel_multi_index([dig_k, dig_mu], self.binshape)
 
+    @cached_property("in_k_range")
+    def flat_slices(self):
+        """
+        The slices of the :func:`apply_flat` result corresponding to each
+        of the bins along the second axis
+        """
+        N = self.in_k_range.sum(axis=0)
+        start = np.concatenate([[0], np.cumsum(N)])
+        return [slice(start[i], start[i+1]) for i in range(self.N2)]
+
+    @cached_property("mu_edges", "in_k_range")
+    def projection(self):
+        """
+        The sparse matrix, in CSR format, that maps the power at the valid
+        grid points to the wedges.
+
+        This includes the mode weighting and the :attr:`kmin` and
+        :attr:`kmax` masks. The rows are ordered by wedge, with the
+        slices given by :attr:`flat_slices`.
+        """
+        valid = self.grid.notnull
+        ik = np.nonzero(valid)[0] # the k index of each valid point
+        modes = self.grid.modes[valid]
+        dig_mu = np.digitize(self.grid.mu[valid], self.mu_edges)
+
+        rows = []; cols = []; data = []
+        for i, sl in enumerate(self.flat_slices):
+            in_range = self.in_k_range[:,i]
+
+            # the valid points within this mu bin
+            inbin = dig_mu == 2*i+1
+            norm = np.bincount(ik[inbin], weights=modes[inbin], minlength=self.grid.Nk)
+
+            # make sure there are no null values in the valid k-range!
+            if (norm[in_range] == 0).any():
+                raise ValueError("NaN values in GriddedWedgeTransfer result within valid k range!")
+
+            # the output row for each k bin
+            row = np.empty(self.grid.Nk, dtype=int)
+            row[in_range] = np.arange(sl.start, sl.stop)
+
+            idx = np.nonzero(inbin & in_range[ik])[0]
+            w = modes[idx] / norm[ik[idx]]
+            rows.append(row[ik[idx]]); cols.append(idx); data.append(w)
+
+        shape = (self.flat_slices[-1].stop, len(ik))
+        rows, cols, data = [np.concatenate(x) for x in [rows, cols, data]]
+        return sparse.csr_matrix((data, (rows, cols)), shape=shape)
+
+    def apply_flat(self, power):
+        """
+        Return the flattened wedges (or multipoles) within the valid k range,
+        computed from the power at the valid grid points with a single sparse
+        matrix multiplication, i.e., using :attr:`projection`
+
+        This is equivalent to calling the transfer and removing the
+        null values of each bin, but avoids creating any
+        :class:`xarray.DataArray` objects.
+
+        Parameters
+        ----------
+        power : array_like
+            the power values at all valid grid points, with shape (N,),
+            or (M, N) for a batch of M power spectra
+
+        Returns
+        -------
+        toret : array_like
+            the binned power, ordered by bin along the last axis, with
+            the slices for each bin given by :attr:`flat_slices`
+        """
+        power = np.asarray(power)
+        P = self.projection
+        if power.ndim not in [1, 2] or power.shape[-1] != P.shape[1]:
+            raise ValueError("``power`` passed to ``apply_flat`` must have shape (%d,) or (M, %d)" %(P.shape[1], P.shape[1]))
+
+        toret = P.dot(power.T).T
+        if np.isnan(toret).any():
+            raise ValueError("NaN values in %s result within valid k range!" %self.__class__.__name__)
+        return toret
+
     def sum(self, d):
         """
         Sum the input data over the `mu` bins specified by `mu_edges`
@@ -283,6 +365,44 @@ class GriddedMultipoleTransfer(GriddedWedgeTransfer):
         """
         return np.broadcast_arrays(self.k_cen[:,None], self.ells[None,:])
 
+    @cached_property("legendre_weights", "mu_edges", "in_k_range")
+    def projection(self):
+        """
+        The sparse matrix, in CSR format, that maps the power at the valid
+        grid points to the multipoles.
+
+        This includes the Legendre weights, the mode weighting, and the
+        :attr:`kmin` and :attr:`kmax` masks. The rows are ordered by
+        multipole, with the slices given by :attr:`flat_slices`.
+        """
+        valid = self.grid.notnull
+        ik = np.nonzero(valid)[0] # the k index of each valid point
+        modes = self.grid.modes[valid]
+
+        # the valid points within the single mu bin
+        inbin = np.digitize(self.grid.mu[valid], self.mu_edges) == 1
+        norm = np.bincount(ik[inbin], weights=modes[inbin], minlength=self.grid.Nk)
+
+        rows = []; cols = []; data = []
+        for i, sl in enumerate(self.flat_slices):
+            in_range = self.in_k_range[:,i]
+
+            # make sure there are no null values in the valid k-range!
+            if (norm[in_range] == 0).any():
+                raise ValueError("NaN values in GriddedMultipoleTransfer result within valid k range!")
+
+            # the output row for each k bin
+            row = np.empty(self.grid.Nk, dtype=int)
+            row[in_range] = np.arange(sl.start, sl.stop)
+
+            idx = np.nonzero(inbin & in_range[ik])[0]
+            w = self.legendre_weights[i][valid][idx] * modes[idx] / norm[ik[idx]]
+            rows.append(row[ik[idx]]); cols.append(idx); data.append(w)
+
+        shape = (self.flat_slices[-1].stop, len(ik))
+        rows, cols, data = [np.concatenate(x) for x in [rows, cols, data]]
+        return sparse.csr_matrix((data, (rows, cols)), shape=shape)
+
     def __call__(self, power):
         """
         Return the Legendre-weighted mean power on the :math:`(k, \mu)` grid.
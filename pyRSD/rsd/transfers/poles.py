@@ -1,8 +1,9 @@
-from pyRSD import pygcl, numpy as np
+from pyRSD import numpy as np
 from pyRSD.rsd.transfers import PkmuGrid, TransferBase
+from pyRSD.rsd.tools import LegendreProjection
 
 import xarray as xr
-from scipy.special import legendre
+import warnings
 
 
 class MultipoleTransfer(TransferBase):
@@ -18,22 +19,46 @@ class MultipoleTransfer(TransferBase):
     ells : int, list of int
         the multipole numbers we wish to compute
     Nmu : int, optional
-        the number of ``mu`` points to use when performing the multipole integration
+        the number of Gauss-Legendre nodes in ``mu`` to use when performing
+        the multipole integration; default is
+        :data:`~pyRSD.rsd.tools.GAUSS_LEGENDRE_NMU`
     """
-    def __init__(self, k, ells, Nmu=40):
+    def __init__(self, k, ells, Nmu=None):
 
         # the multipoles
         self.ells = np.array(ells, ndmin=1)
 
-        # use odd number of samples for simpson's rule
-        if Nmu % 2 == 0: Nmu += 1
+        # the Gauss-Legendre projection
+        self.projection = LegendreProjection(self.ells, Nmu=Nmu)
 
-        # make the grid
-        # NOTE: use mu edges so we include full integration range, [0,2]
-        mu = np.linspace(0., 1., Nmu, endpoint=True)
+        # make the grid, with the quadrature nodes as the mu values
+        mu = self.projection.mu
         grid_k, grid_mu =  np.meshgrid(k, mu, indexing='ij')
         weights = np.ones_like(grid_k) # unity weights
-        self.grid = PkmuGrid([k,mu], grid_k, grid_mu, weights)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore') # few mu nodes are needed
+            self.grid = PkmuGrid([k,mu], grid_k, grid_mu, weights)
+
+    def apply_flat(self, power):
+        """
+        Return the multipoles computed from the power at the valid grid
+        points, without creating any :class:`xarray.DataArray` objects
+
+        Parameters
+        ----------
+        power : array_like
+            the power values at all valid grid points, with shape (N,),
+            or (M, N) for a batch of M power spectra
+
+        Returns
+        -------
+        Pell : array_like, (Nk, len(ells)) or (M, Nk, len(ells))
+            the multipoles for each ``k`` value of the grid
+        """
+        power = np.asarray(power)
+        toret = np.ones(power.shape[:-1] + self.grid.shape) * np.nan
+        toret[..., self.grid.notnull] = power
+        return self.projection(toret)
 
     def __call__(self, power):
         """
@@ -51,19 +76,6 @@ class MultipoleTransfer(TransferBase):
         """
         self.power = power
 
-        # input coordinate grid
-        k = self.power['k']
-        mu = self.power['mu']
-
-        # return array
-        Nk = len(self.power)
-        shape = (len(k), len(self.ells))
-        Pell = xr.DataArray(np.empty(shape), coords=[('k', k), ('ell', self.ells)])
-
-        # compute each Pell
-        for ell in self.ells:
-            kern = (2*ell+1.)*legendre(ell)(mu)
-            val = np.array([pygcl.SimpsIntegrate(mu, kern*d) for d in self.power])
-            Pell.loc[dict(ell=ell)] = val
-
-        return Pell
+        # project all k at once
+        Pell = self.projection(self.power.values)
+        return xr.DataArray(Pell, coords=[('k', self.power['k'].values), ('ell', self.ells)])
@@ -62,6 +62,38 @@ class WedgeTransfer(TransferBase):
             raise ValueError("specified `mu` bounds are not monotonically increasing")
         return toret
 
+    @cached_property("mu_edges")
+    def weights(self):
+        """
+        The matrix averaging the power on the grid of ``mu`` values into
+        the ``mu`` bins, with shape (``grid.Nmu``, number of bins)
+        """
+        dig_mu = np.digitize(self.grid.mu_cen, self.mu_edges)
+        toret = np.array([dig_mu == 2*i+1 for i in range(len(self.mu_cen))], dtype=float).T
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return toret / toret.sum(axis=0)
+
+    def apply_flat(self, power):
+        """
+        Return the wedges computed from the power at the valid grid
+        points, without creating any :class:`xarray.DataArray` objects
+
+        Parameters
+        ----------
+        power : array_like
+            the power values at all valid grid points, with shape (N,),
+            or (M, N) for a batch of M power spectra
+
+        Returns
+        -------
+        Pwedge : array_like, (Nk, len(mu_cen)) or (M, Nk, len(mu_cen))
+            the wedges for each ``k`` value of the grid
+        """
+        power = np.asarray(power)
+        toret = np.ones(power.shape[:-1] + self.grid.shape) * np.nan
+        toret[..., self.grid.notnull] = power
+        return np.dot(toret, self.weights)
+
     def __call__(self, power):
         """
         Parameters
@@ -1,11 +1,34 @@
 from pyRSD.rsd.transfers import PkmuGrid
 from pyRSD.rsd.transfers.grid import GriddedMultipoleTransfer
 from pyRSD.rsd.window import WindowConvolution
+from pyRSD.rsd._cache import parameter, cached_property
+from pyRSD.rsd.tools import get_hash_key
+from pyRSD.rsd._disk_cache import DiskCache
+from pyRSD.rsd import _disk_cache, __version__
 from pyRSD import pygcl, numpy as np
 
 from scipy.interpolate import InterpolatedUnivariateSpline as spline
+from scipy.interpolate import make_interp_spline
 import xarray as xr
 
+# the store of precomputed convolution matrices
+_matrix_cache = DiskCache('window_matrices')
+
+def _transform_matrix(transform, columns):
+    """
+    Return the dense matrix representation of the linear (i.e., no
+    extrapolation) ``mcfit`` transform, restricted to the input
+    ``columns``
+    """
+    N = len(transform.x)
+    toret = np.empty((N, len(columns)))
+    F = np.zeros(N)
+    for i, j in enumerate(columns):
+        F[j] = 1.
+        toret[:,i] = transform(F, extrap=False)[1]
+        F[j] = 0.
+    return toret
+
 class WindowFunctionTransfer(GriddedMultipoleTransfer):
     """
     A transfer function object to go from unconvolved to convolved multipoles.
@@ -28,8 +51,12 @@ class WindowFunctionTransfer(GriddedMultipoleTransfer):
     max_ellprime : int, optional
         the maximum multipole number to include when determining the leakage
         of higher-order multipoles into a multipole of order ``ell``
+    use_matrix : bool, optional
+        if ``True``, the convolution is applied with a precomputed matrix
+        (see :func:`convolution_matrix`) when used in a fit
     """
-    def __init__(self, window, ells, kmin=1e-4, kmax=0.7, Nk=1024, Nmu=40, max_ellprime=4):
+    def __init__(self, window, ells, kmin=1e-4, kmax=0.7, Nk=1024, Nmu=40,
+                    max_ellprime=4, use_matrix=False):
 
         # make the grid
         # NOTE: we want to use the centers of the mu bins here!
@@ -43,10 +70,177 @@ class WindowFunctionTransfer(GriddedMultipoleTransfer):
         # init the base class
         GriddedMultipoleTransfer.__init__(self, grid, ells, kmin=kmin, kmax=kmax)
 
-        # the convolver object
-        self.convolver = WindowConvolution(window[:,0], window[:,1:],
-                                            max_ellprime=max_ellprime,
-                                            max_ell=max(ells))
+        # the window function
+        self.window = window
+        self.max_ellprime = max_ellprime
+        self.use_matrix = use_matrix
+
+    @parameter
+    def window(self, val):
+        """
+        The window function multipoles in configuration space, as columns;
+        the first column is the separation vector ``s``
+        """
+        return np.ascontiguousarray(val, dtype=float)
+
+    @parameter
+    def max_ellprime(self, val):
+        """
+        The maximum multipole number to include when determining the leakage
+        of higher-order multipoles into a multipole of order ``ell``
+        """
+        return val
+
+    @cached_property("window", "max_ellprime", "ells")
+    def convolver(self):
+        """
+        The :class:`~pyRSD.rsd.window.WindowConvolution` object
+        """
+        return WindowConvolution(self.window[:,0], self.window[:,1:],
+                                    max_ellprime=self.max_ellprime,
+                                    max_ell=max(self.ells))
+
+    @cached_property("window", "max_ellprime", "ells", "in_k_range")
+    def _matrix_key(self):
+        """
+        The hash of the inputs of :func:`convolution_matrix`, except for
+        the output ``k`` values
+        """
+        return get_hash_key('WindowFunctionTransfer', __version__, self.window,
+                            self.grid.k_cen, self.in_k_range,
+                            np.asarray(self.ells, dtype=float), self.max_ellprime)
+
+    @cached_property("_matrix_key")
+    def _matrices(self):
+        """
+        The convolution matrices, keyed by the bytes of the output ``k`` values
+        """
+        return {}
+
+    @property
+    def padded_k(self):
+        """
+        The grid ``k`` values, with additional log-spaced values
+        zero-padded up to k=100 h/Mpc for the FFTLog
+        """
+        oldk = self.grid.k_cen
+        dk = np.diff(np.log10(oldk))[0]
+        newk = 10**(np.arange(np.log10(oldk.max()) + dk, 2 + 0.5*dk, dk))
+        return np.concatenate([oldk, newk])
+
+    def convolution_matrix(self, k_out):
+        """
+        Return the dense matrix mapping the unconvolved multipoles on the grid
+        to the convolved multipoles at ``k_out``.
+
+        With no extrapolation, the zero-padding, FFTLogs, window convolution,
+        and spline interpolation are all linear, such that the full
+        convolution can be computed once and stored. The input is the
+        output of :func:`GriddedMultipoleTransfer.apply_flat`, and the
+        output is ordered by multipole, each of length ``len(k_out)``.
+
+        The matrices are cached in memory and on disk, keyed by the window,
+        the ``k`` grid, the multipoles, and ``k_out``. The hash of the window
+        and ``k`` grid is only computed again when they change.
+
+        Parameters
+        ----------
+        k_out : array_like
+            the ``k`` values to evaluate the convolved multipoles at
+
+        Returns
+        -------
+        W : array_like, (len(ells)*len(k_out), N)
+            the convolution matrix
+        """
+        k_out = np.ascontiguousarray(k_out, dtype=float)
+        matrices = self._matrices
+        tag = k_out.tobytes()
+
+        if tag not in matrices:
+            W = None
+            key = get_hash_key(self._matrix_key, k_out)
+            if _disk_cache.enabled():
+                W = _matrix_cache.load(key, 'W')
+            if W is None:
+                W = self._compute_convolution_matrix(k_out)
+                if _disk_cache.enabled():
+                    _matrix_cache.save(key, 'W', W)
+            matrices[tag] = W
+
+        return matrices[tag]
+
+    def _compute_convolution_matrix(self, k_out):
+        """
+        Internal function to compute the matrix returned by
+        :func:`convolution_matrix`
+        """
+        from pyRSD.extern import mcfit
+
+        newk = self.padded_k
+        ells = self.ells
+        Nell = len(ells); Nk_out = len(k_out)
+
+        # the FFTLog of the unconvolved multipoles in the valid k range
+        # NOTE: the output separations of the last multipole are used, as in __call__
+        P2xi = []
+        for i, ell in enumerate(ells):
+            T = mcfit.P2xi(newk, l=ell)
+            columns = np.nonzero(self.in_k_range[:,i])[0]
+            P2xi.append(_transform_matrix(T, columns))
+        rr = T.y
+
+        # the spline to k_out, from the padded k values
+        S = make_interp_spline(newk, np.eye(len(newk)), k=3)(k_out)
+
+        shape = (Nell*Nk_out, self.flat_slices[-1].stop)
+        toret = np.zeros(shape)
+        for i, ell in enumerate(ells):
+
+            # FFTLog back and interpolate to k_out
+            T = mcfit.xi2P(rr, l=ell)
+            SB = np.dot(S, _transform_matrix(T, range(len(rr))))
+
+            # the convolution kernel
+            kern = self.convolver._get_kernel(ell, rr)
+            if kern.shape[1] > Nell:
+                npoles = self.max_ellprime//2+1
+                raise ValueError(("shape mismatch between kernel and number of xi multipoles; "
+                                  "please provide the first %d even multipoles" %npoles))
+
+            # the linear combination of multipoles
+            rows = slice(i*Nk_out, (i+1)*Nk_out)
+            for j in range(kern.shape[1]):
+                toret[rows, self.flat_slices[j]] = np.dot(SB, kern[:,j,None]*P2xi[j])
+
+        return toret
+
+    def apply_flat(self, power, k_out):
+        """
+        Evaluate the convolved multipoles at ``k_out``, using the
+        precomputed :func:`convolution_matrix`.
+
+        This is equivalent to calling the transfer with ``k_out``, but
+        requires only a sparse and a dense matrix multiplication.
+
+        Parameters
+        ----------
+        power : array_like
+            the power values at all valid grid points, with shape (N,),
+            or (M, N) for a batch of M power spectra
+        k_out : array_like
+            the ``k`` values to evaluate the convolved multipoles at
+
+        Returns
+        -------
+        Pell : array_like, (len(k_out), len(ells)) or (M, len(k_out), len(ells))
+            the convolved multipoles
+        """
+        Pell = GriddedMultipoleTransfer.apply_flat(self, power)
+        W = self.convolution_matrix(k_out)
+        toret = np.dot(Pell, W.T)
+        toret = toret.reshape(toret.shape[:-1] + (len(self.ells), -1))
+        return np.swapaxes(toret, -1, -2)
 
     def __call__(self, power, k_out=None, extrap=False, mcfit_kwargs={}, **kws):
         """
@@ -79,10 +273,7 @@ class WindowFunctionTransfer(GriddedMultipoleTransfer):
         Pell0 = GriddedMultipoleTransfer.__call__(self, power)
 
         # create additional logspaced k values for zero-padding up to k=100 h/Mpc
-        oldk = Pell0['k'].values
-        dk = np.diff(np.log10(oldk))[0]
-        newk = 10**(np.arange(np.log10(oldk.max()) + dk, 2 + 0.5*dk, dk))
-        newk = np.concatenate([oldk, newk])
+        newk = self.padded_k
 
         # now copy over with zeros
         Nk = len(newk); Nell = Pell0.shape[1]
@@ -1,33 +1,49 @@
+import threading
+
 params_filename = 'params.dat'
-model_filename = 'model.npy'
+model_filename = 'model.snapshot'
+legacy_model_filename = 'model.npy'
+emulator_filename = 'emulator.npz'
 
 class GlobalFittingDriver(object):
     """
     The global :class:`~pyRSD.rsdfit.driver.FittingDriver` instance
+
+    A driver set with ``local=True`` is only seen by the current thread,
+    and takes precedence over the global instance.
     """
     _instance = None
+    _local = threading.local()
 
     @classmethod
     def get(cls):
         """
         Get global driver, raising an exception if it is None
         """
+        driver = getattr(cls._local, 'instance', None)
+        if driver is not None:
+            return driver
         if cls._instance is None:
             raise ValueError("global driver has not been set yet")
         return cls._instance
 
     @classmethod
-    def set(cls, driver):
+    def set(cls, driver, local=False):
         """
-        Set the global driver to the input value
+        Set the global driver to the input value, optionally only
+        for the current thread
         """
-        cls._instance = driver
+        if local:
+            cls._local.instance = driver
+        else:
+            cls._instance = driver
 
 import logging
 from .util.rsd_logging import MPILoggerAdapter
 
 # import the drivers and run functions
 from .driver import FittingDriver
+from .joint import JointFittingDriver
 
 # import the specific modules as well
 from . import data
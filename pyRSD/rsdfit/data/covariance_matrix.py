@@ -568,6 +568,35 @@ class CovarianceMatrix(Cache):
         """
         return np.linalg.inv(self.values) * self.inverse_rescaling
 
+    @cached_property('_data', 'inverse_rescaling')
+    def cholesky(self):
+        """
+        The lower-triangular Cholesky factor :math:`L` of the covariance
+        matrix, including the :attr:`inverse_rescaling`, such that
+        :attr:`inverse` is :math:`(L L^T)^{-1}`
+        """
+        try:
+            return np.linalg.cholesky(self.values / self.inverse_rescaling)
+        except np.linalg.LinAlgError:
+            raise ValueError("Cholesky decomposition failed; covariance matrix is not positive-definite")
+
+    def whiten(self, x):
+        r"""
+        Apply the whitening operator :math:`L^{-1}` to the input array,
+        using a triangular solve with the :attr:`cholesky` factor
+
+        The :math:`\chi^2` of a residual vector ``d`` is then the squared
+        norm of ``whiten(d)``.
+
+        Parameters
+        ----------
+        x : array_like, (N,) or (M, N)
+            the vector, or rows of vectors, to whiten
+        """
+        from scipy.linalg import solve_triangular
+        x = np.asarray(x)
+        return solve_triangular(self.cholesky, x.T, lower=True, check_finite=False).T
+
     @cached_property('_data')
     def values(self):
         """
@@ -462,6 +462,15 @@ class PowerDataSchema(Cache):
         """
         return val
 
+    @parameter(default=False)
+    def window_matrix(self, val):
+        """
+        Whether to precompute the window function convolution as a matrix,
+        which is cached on disk, such that the convolution requires a single
+        matrix multiplication.
+        """
+        return val
+
     @parameter
     def covariance(self, val):
         """
@@ -777,6 +786,7 @@ class PowerData(PowerDataSchema):
             kws['max_ellprime'] = self.max_ellprime
             kws['kmax'] = self.window_kmax
             kws['kmin'] = self.window_kmin
+            kws['use_matrix'] = self.window_matrix
             transfer = [transfers.WindowFunctionTransfer(window, ells, **kws)]
         else:
 
@@ -1,6 +1,6 @@
 from .. import numpy as np, os
 from . import MPILoggerAdapter, logging
-from . import params_filename, model_filename
+from . import params_filename
 
 from .parameters import ParameterSet, Parameter
 from .theory import GalaxyPowerTheory, QuasarPowerTheory
@@ -12,6 +12,7 @@ from ..rsd._cache import Cache, parameter
 from pyRSD.rsdfit.theory import decorators
 from pyRSD import __version__
 from six import string_types
+import contextlib
 import warnings
 
 logger = MPILoggerAdapter(logging.getLogger('rsdfit.fitting_driver'))
@@ -181,6 +182,41 @@ class FittingDriverSchema(Cache):
         """
         return val
 
+    @parameter(default=False)
+    def vectorize(self, val):
+        """
+        Whether to evaluate the log-probability of all MCMC walkers with
+        a single batched call, via :func:`FittingDriver.lnprob_batch`
+
+        If a pool is used, the walkers are split into one batch per worker.
+        """
+        return val
+
+    @parameter(default=None)
+    def emulator(self, val):
+        """
+        Whether to use a trained emulator of the theory prediction when
+        running the MCMC; either ``None``, 'burnin' to use the emulator for
+        the ``burnin`` iterations only, or 'full' to use it for the whole
+        chain
+
+        The emulator is loaded from the ``emulator_file``, or trained and
+        saved if the file does not exist.
+        """
+        if val not in [None, 'burnin', 'full']:
+            raise ValueError("``emulator`` should be None, 'burnin' or 'full'")
+        return val
+
+    @parameter(default={})
+    def emulator_options(self, val):
+        """
+        Options used to train the emulator; valid keys are ``ntrain``,
+        ``nvalidate``, ``degree``, ``tol``, and ``seed``; see
+        :func:`~pyRSD.rsdfit.emulator.train_emulator`
+        """
+        if val is None: return {}
+        return val
+
     @parameter(default={})
     def stat_specific_params(self, val):
         """
@@ -260,7 +296,8 @@ class FittingDriver(FittingDriverSchema):
 
 
         # get the model callables
-        self.model_callable, self.grad_model_callable = self._get_theory_callables()
+        callables = self._get_theory_callables()
+        self.model_callable, self.grad_model_callable, self.batch_model_callable = callables
 
     #---------------------------------------------------------------------------
     # class methods to start from directory
@@ -300,7 +337,8 @@ class FittingDriver(FittingDriverSchema):
             if not existing_model:
                 raise rsd_io.ConfigurationError('provided model file `%s` does not exist' %model_path)
         else:
-            model_path = os.path.join(dirname, model_filename)
+            model_path = rsd_io.find_model_file(dirname)
+            existing_model = model_path is not None
         if not os.path.exists(params_path):
             raise rsd_io.ConfigurationError('parameter file `%s` must exist to load driver' %params_path)
 
@@ -387,10 +425,13 @@ class FittingDriver(FittingDriverSchema):
         # determine the transfers
         callables = []
         grad_callables = []
+        batch_callables = []
+        self._transfers = []
         for stat_grp in stat_grps:
             
             # get the transfers
             transfers, ids = self.data.calculate_transfer(stat_grp)
+            self._transfers.append(transfers)
             
             # get the model parameters
             if len(default_params):
@@ -416,14 +457,72 @@ class FittingDriver(FittingDriverSchema):
                                                      theory_decorator=self.theory_decorator)
             grad_callables.append(c)
 
+            # get the batched theory callable
+            c = self.theory.get_batch_model_callable(self.data, transfers, ids,
+                                                      model_params=model_params,
+                                                      theory_decorator=self.theory_decorator)
+            batch_callables.append(c)
+
         def final_model_callable():
             return np.concatenate([c() for c in callables], axis=0)
             
         def final_grad_callable(**kwargs):
             return np.concatenate([c(**kwargs) for c in grad_callables], axis=-1)
 
-        return final_model_callable, final_grad_callable
+        def final_batch_callable(thetas):
+            return np.concatenate([c(thetas) for c in batch_callables], axis=-1)
+
+        return final_model_callable, final_grad_callable, final_batch_callable
+
+
+    def share_state(self, comm):
+        """
+        Place the large, immutable arrays of the fit in node-local shared
+        memory; this is a collective operation on ``comm``
+
+        This shares the Cholesky factor of the covariance matrix and the
+        sparse projections of gridded multipole transfers between the
+        processes on each node, and registers the flattened ``(k,mu)``
+        pairs, such that tasks sent to a pool by :class:`PkmuGradient`
+        reference them by handle. The Cholesky factor and the projections
+        are only computed by the first rank of each node.
+
+        Parameters
+        ----------
+        comm : MPI.Communicator
+            the communicator of the pool
+        """
+        from .util import shared_state
+        from pyRSD.rsd.transfers import GriddedMultipoleTransfer, WindowFunctionTransfer
+        from scipy import sparse
+
+        C = self.data.covariance_matrix
+        arrays = {'cholesky': lambda: C.cholesky}
 
+        projected = []
+        for i, transfers in enumerate(getattr(self, '_transfers', [])):
+            k, mu, _ = self.theory.get_kmu_pairs(transfers)
+            arrays['k_%d' %i] = k
+            arrays['mu_%d' %i] = mu
+
+            for j, t in enumerate(transfers):
+                if isinstance(t, GriddedMultipoleTransfer) and not isinstance(t, WindowFunctionTransfer):
+                    name = 'projection_%d_%d_%%s' %(i, j)
+                    for attr in ['data', 'indices', 'indptr']:
+                        arrays[name %attr] = lambda t=t, attr=attr: getattr(t.projection, attr)
+                    arrays[name %'shape'] = lambda t=t: np.array(t.projection.shape)
+                    projected.append((t, name))
+
+        shared = shared_state.share(comm, arrays)
+
+        # replace the local copies with the shared arrays
+        C._cache['cholesky'] = shared['cholesky']
+        for t, name in projected:
+            args = tuple(shared[name %attr] for attr in ['data', 'indices', 'indptr'])
+            shape = tuple(int(n) for n in shared[name %'shape'])
+            t._cache['projection'] = sparse.csr_matrix(args, shape=shape)
+
+        logger.info("placed %d array(s) of the fit in shared memory" %len(shared), on=0)
 
     def apply(self, func, pattern):
         """
@@ -584,6 +683,8 @@ class FittingDriver(FittingDriverSchema):
 
             solver = emcee_solver.run
             kwargs['chains_comm'] = chains_comm
+            if self.emulator is not None:
+                kwargs['emulator'] = self.get_emulator(pool=pool)
 
         # lbfgs
         elif solver_type == 'nlopt':
@@ -648,6 +749,69 @@ class FittingDriver(FittingDriverSchema):
         del results
         return values
 
+    def get_emulator(self, pool=None, train=True):
+        """
+        Return the :class:`~pyRSD.rsdfit.emulator.ModelEmulator` of the
+        theory prediction
+
+        The emulator is loaded from the ``emulator_file`` parameter, if the
+        file exists and the emulator was trained for the current free
+        parameters, priors, data, and fixed parameters. Otherwise, a new
+        emulator is trained, using ``pool`` to evaluate the full model, and
+        saved to ``emulator_file``. The result is stored on the driver, such
+        that pool workers load the emulator once, rather than receiving it
+        with each task.
+
+        Raises
+        ------
+        RuntimeError :
+            if ``train`` is `False` and no valid emulator can be loaded
+        """
+        from .emulator import ModelEmulator, prior_box, train_emulator, training_key
+
+        lower, upper = prior_box(self.theory.fit_params)
+        key = training_key(self)
+        emulator = getattr(self, '_trained_emulator', None)
+        if emulator is not None and emulator.is_compatible(self.theory.free_names, lower, upper, key):
+            return emulator
+
+        filename = self.params.get('emulator_file', None)
+        if filename is not None and os.path.exists(filename):
+            emulator = ModelEmulator.from_npz(filename)
+            if emulator.is_compatible(self.theory.free_names, lower, upper, key):
+                logger.info("loaded the emulator from `%s`" %filename, on=0)
+                logger.info(emulator.format_report(), on=0)
+                self._trained_emulator = emulator
+                return emulator
+            logger.info("emulator in `%s` does not match the free parameters or data; retraining" %filename, on=0)
+
+        if not train:
+            raise RuntimeError("no trained emulator is available from the ``emulator_file`` parameter")
+
+        # train with the full model
+        valid = ['ntrain', 'nvalidate', 'degree', 'tol', 'seed']
+        kws = {k:v for k,v in self.emulator_options.items() if k in valid}
+        emulator = train_emulator(self, pool=pool, **kws)
+        if filename is not None:
+            logger.info("saving the emulator to `%s`" %filename, on=0)
+            emulator.to_npz(filename)
+
+        self._trained_emulator = emulator
+        return emulator
+
+    @contextlib.contextmanager
+    def use_emulator(self, emulator):
+        """
+        Context manager to use ``emulator`` for :attr:`combined_model` and
+        :func:`lnprob_batch` inside the context
+        """
+        old = getattr(self, '_emulator', None)
+        self._emulator = emulator
+        try:
+            yield
+        finally:
+            self._emulator = old
+
     #---------------------------------------------------------------------------
     # setup functions
     #---------------------------------------------------------------------------
@@ -728,8 +892,12 @@ class FittingDriver(FittingDriverSchema):
 
         Notes
         -----
-        The model callable should already returned the flattened `combined` values
+        The model callable should already returned the flattened `combined` values.
+        Inside :func:`use_emulator`, the emulated model is returned.
         """
+        emulator = getattr(self, '_emulator', None)
+        if emulator is not None:
+            return emulator(self.theory.free_values)
         return self.model_callable()
 
     @property
@@ -741,10 +909,25 @@ class FittingDriver(FittingDriverSchema):
         try:
             return self._null_lnlike
         except:
-            d = self.data.combined_power
-            self._null_lnlike = -0.5 * np.dot(d, np.dot(self.data.covariance_matrix.inverse, d))
+            d = self.whitened_data
+            self._null_lnlike = -0.5 * np.dot(d, d)
             return self._null_lnlike
 
+    @property
+    def whitened_data(self):
+        r"""
+        The data vector whitened by the Cholesky factor :math:`L` of the
+        covariance matrix, :math:`L^{-1} \mathcal{D}`
+
+        This is recomputed only when the Cholesky factor changes.
+        """
+        C = self.data.covariance_matrix
+        L = C.cholesky
+        cached = getattr(self, '_whitened_data', None)
+        if cached is None or cached[0] is not L:
+            self._whitened_data = (L, C.whiten(self.data.combined_power))
+        return self._whitened_data[1]
+
     @property
     def dof(self):
         """
@@ -786,6 +969,9 @@ class FittingDriver(FittingDriverSchema):
         .. math::
 
             \chi^2 = (\mathcal{M} - \mathcal{D})^T C^{-1} (\mathcal{M} - \mathcal{D})
+                   = |L^{-1} \mathcal{M} - L^{-1} \mathcal{D}|^2
+
+        where :math:`L` is the Cholesky factor of the covariance matrix.
 
         Parameters
         ----------
@@ -798,8 +984,8 @@ class FittingDriver(FittingDriverSchema):
         if theta is not None:
             self.theory.set_free_parameters(theta)
 
-        diff = self.combined_model - self.data.combined_power
-        return np.dot(diff, np.dot(self.data.covariance_matrix.inverse, diff))
+        diff = self.data.covariance_matrix.whiten(self.combined_model) - self.whitened_data
+        return np.dot(diff, diff)
 
     def reduced_chi2(self):
         """
@@ -862,6 +1048,56 @@ class FittingDriver(FittingDriverSchema):
 
             return lp + lnlike
 
+    def lnprob_batch(self, thetas):
+        """
+        Return the log of the posterior probability, as given by :func:`lnprob`,
+        for a batch of free parameter vectors
+
+        The priors are evaluated for the whole batch with
+        :func:`~pyRSD.rsdfit.theory.GalaxyPowerTheory.lnprior_batch`, and the
+        theory is evaluated for the whole batch using :attr:`batch_model_callable`,
+        which broadcasts the parameters that do not change the cosmology over
+        the batch (see :func:`~pyRSD.rsd.DarkMatterSpectrum.power_batch`). The
+        transfers and the chi2 are computed with array operations over the batch.
+        Parameter vectors that are out of bounds or have an infinite prior are
+        assigned ``-np.inf``.
+
+        Parameters
+        ----------
+        thetas : array_like, (N, Np)
+            the array of free parameter vectors to evaluate
+        """
+        thetas = np.atleast_2d(thetas)
+        toret = np.repeat(-np.inf, len(thetas))
+
+        # the log prior for each vector, -inf if out of bounds
+        lp = self.theory.lnprior_batch(thetas)
+
+        # only compute lnlike if we have finite priors
+        valid = np.isfinite(lp)
+        if not valid.any():
+            return toret
+
+        try:
+            emulator = getattr(self, '_emulator', None)
+            if emulator is not None:
+                models = emulator(thetas[valid])
+            else:
+                models = self.batch_model_callable(thetas[valid])
+            diff = self.data.covariance_matrix.whiten(models) - self.whitened_data
+            chi2 = np.einsum('ij,ij->i', diff, diff)
+            if np.isnan(chi2).any():
+                raise ValueError("log-likelihood calculation resulted in NaN")
+        except:
+            import traceback
+            msg = "exception while computing batched log-likelihood:\n"
+            msg += "   parameters:\n%s\n" %str(thetas[valid])
+            msg += "   traceback:\n%s" %(traceback.format_exc())
+            raise RuntimeError(msg)
+
+        toret[valid] = lp[valid] - 0.5*chi2
+        return toret
+
     def minus_lnlike(self, theta=None, use_priors=False):
         """
         Return the negative log-likelihood, optionally including priors
@@ -916,7 +1152,8 @@ class FittingDriver(FittingDriverSchema):
             default is `1e-4` -- can be different for each parameter
         pool : MPIPool, optional
             a MPI Pool object to distribute the calculations of derivatives to
-            multiple processes in parallel
+            multiple processes in parallel; any pool from
+            :mod:`pyRSD.rsdfit.util.pools` can also be used
         use_priors : bool, optional
             whether to include the log priors in the objective function when
             minimizing the negative log probability
@@ -967,8 +1204,10 @@ class FittingDriver(FittingDriverSchema):
             grad_lnlike = self.grad_model_callable(**kws)
 
             # transform from model gradient to log likelihood gradient
-            diff = self.data.combined_power - self.combined_model
-            grad_lnlike = np.dot(np.dot(self.data.covariance_matrix.inverse, diff), grad_lnlike.T)
+            # using the whitened residual and Jacobian
+            C = self.data.covariance_matrix
+            diff = self.whitened_data - C.whiten(self.combined_model)
+            grad_lnlike = np.dot(C.whiten(grad_lnlike), diff)
             grad_minus_lnlike = -1 * grad_lnlike
 
         # test for inf
@@ -1082,12 +1321,9 @@ class FittingDriver(FittingDriverSchema):
             else:
                 grad_lnlike = gradient
 
-            # compute Fisher from gradient
-            F = np.zeros((self.Np, self.Np))
-            for i in range(self.Np):
-                for j in range(i, self.Np):
-                    F[i,j] =  np.dot(grad_lnlike[i], np.dot(self.data.covariance_matrix.inverse, grad_lnlike[j]))
-                    F[j,i] = F[i,j]
+            # compute Fisher from the whitened gradient
+            grad_lnlike = self.data.covariance_matrix.whiten(grad_lnlike)
+            F = np.dot(grad_lnlike, grad_lnlike.T)
 
             # add priors??
             priors = np.zeros(self.Np)
@@ -0,0 +1,406 @@
+"""
+A fast surrogate for the theory prediction of a :class:`~pyRSD.rsdfit.FittingDriver`
+
+The emulator is trained on full model evaluations at points sampled from
+the prior box of the free parameters. The model vectors are compressed
+with a principal component analysis (PCA), and the PCA coefficients are
+fit with a polynomial chaos expansion, using Legendre polynomials of the
+free parameters rescaled to [-1, 1].
+"""
+from .. import numpy as np, os
+from . import MPILoggerAdapter, logging
+from pyRSD.rsd.tools import get_hash_key
+
+import itertools
+from scipy.special import eval_legendre
+
+logger = MPILoggerAdapter(logging.getLogger('rsdfit.emulator'))
+
+# the prior box for Gaussian priors extends this many sigma from the mean
+NSIGMA = 5.
+
+# the default number of training points per polynomial term
+OVERSAMPLING = 4
+
+def prior_box(fit_params):
+    """
+    Return the lower and upper limits of the box enclosing the prior
+    of each free parameter
+
+    The box is given by the limits of uniform priors, or by
+    :attr:`NSIGMA` standard deviations for normal priors, intersected
+    with the ``min`` and ``max`` bounds of the parameter.
+
+    Parameters
+    ----------
+    fit_params : ParameterSet
+        the theory parameters
+
+    Returns
+    -------
+    lower, upper : array_like
+        the limits of the box for each free parameter
+    """
+    lower = []; upper = []
+    for par in fit_params.free:
+        lo, hi = -np.inf, np.inf
+        if par.has_prior and par.prior_name == 'uniform':
+            lo, hi = par.prior.lower, par.prior.upper
+        elif par.has_prior and par.prior_name == 'normal':
+            lo, hi = par.prior.mu - NSIGMA*par.prior.sigma, par.prior.mu + NSIGMA*par.prior.sigma
+
+        lo = max(lo, par.min_bound.value)
+        hi = min(hi, par.max_bound.value)
+        if not np.isfinite([lo, hi]).all():
+            raise ValueError("cannot emulate parameter '%s' with an unbounded prior" %par.name)
+        lower.append(lo); upper.append(hi)
+
+    return np.array(lower), np.array(upper)
+
+def training_key(driver):
+    """
+    Return a hash of the inputs of the theory prediction of ``driver``
+    that are not free parameters, i.e., the data vector and the values
+    of the fixed parameters
+
+    An emulator is only reused if it was trained with the same key.
+    """
+    data = driver.data
+    fixed = sorted((name, repr(par.value)) for name, par in driver.theory.fit_params.items()
+                    if not par.vary and not par.constrained)
+    arrays = [data.combined_k, data.combined_mu, data.combined_power, data.combined_error]
+    arrays = [np.ascontiguousarray(x, dtype=float) for x in arrays]
+    return get_hash_key(repr(fixed), *arrays)
+
+def latin_hypercube(lower, upper, N, seed=None):
+    """
+    Return ``N`` points from a Latin hypercube sampling of the box
+    defined by ``lower`` and ``upper``
+    """
+    rng = np.random.RandomState(seed)
+    ndim = len(lower)
+
+    # one point in each of N strata for each dimension, randomly paired
+    u = (np.arange(N)[:,None] + rng.uniform(size=(N, ndim))) / N
+    for i in range(ndim):
+        u[:,i] = u[rng.permutation(N),i]
+    return lower + u * (upper - lower)
+
+def polynomial_terms(ndim, degree):
+    """
+    Return the multi-indices of the multivariate polynomials with total
+    degree up to and including ``degree``, with shape (Nterms, ndim)
+    """
+    terms = []
+    for total in range(degree+1):
+        for dims in itertools.combinations_with_replacement(range(ndim), total):
+            t = np.zeros(ndim, dtype=int)
+            np.add.at(t, list(dims), 1)
+            terms.append(t)
+    return np.array(terms, dtype=int)
+
+def legendre_design(x, terms):
+    """
+    Return the design matrix of the products of Legendre polynomials
+    specified by ``terms``, evaluated at ``x``, with shape (N, Nterms)
+
+    Parameters
+    ----------
+    x : array_like, (N, ndim)
+        the coordinates, rescaled to [-1, 1]
+    terms : array_like, (Nterms, ndim)
+        the multi-indices of the polynomials
+    """
+    degree = terms.max()
+    P = np.array([eval_legendre(n, x) for n in range(degree+1)]) # (degree+1, N, ndim)
+    toret = np.ones((len(x), len(terms)))
+    for d in range(x.shape[1]):
+        toret *= P[terms[:,d], :, d].T
+    return toret
+
+class ModelEmulator(object):
+    """
+    A surrogate for the theory prediction, using a PCA compression of
+    the model vectors and a polynomial chaos expansion of the PCA
+    coefficients
+
+    Use :func:`fit` to train a new emulator.
+
+    Parameters
+    ----------
+    names : list of str
+        the names of the free parameters
+    lower, upper : array_like
+        the limits of the training box for each free parameter
+    terms : array_like, (Nterms, ndim)
+        the multi-indices of the Legendre polynomials
+    mean : array_like, (Nb,)
+        the mean of the training model vectors
+    scale : array_like, (Nb,)
+        the scale used to normalize the model vectors before the PCA
+    components : array_like, (Nc, Nb)
+        the principal components
+    coeffs : array_like, (Nterms, Nc)
+        the polynomial coefficients for each principal component
+    report : dict, optional
+        the accuracy report of the emulator
+    key : str, optional
+        the hash of the data vector and fixed parameters used in the
+        training, see :func:`training_key`
+    """
+    def __init__(self, names, lower, upper, terms, mean, scale, components, coeffs,
+                    report=None, key=None):
+        self.names = list(names)
+        self.lower = np.asarray(lower)
+        self.upper = np.asarray(upper)
+        self.terms = np.asarray(terms, dtype=int)
+        self.mean = np.asarray(mean)
+        self.scale = np.asarray(scale)
+        self.components = np.asarray(components)
+        self.coeffs = np.asarray(coeffs)
+        self.report = report if report is not None else {}
+        self.key = key
+
+    @classmethod
+    def fit(cls, names, lower, upper, thetas, models, degree=2, tol=1e-6, scale=None, key=None):
+        """
+        Train an emulator from model vectors evaluated at ``thetas``
+
+        Parameters
+        ----------
+        names : list of str
+            the names of the free parameters
+        lower, upper : array_like
+            the limits of the training box for each free parameter
+        thetas : array_like, (N, ndim)
+            the free parameters of the training points
+        models : array_like, (N, Nb)
+            the model vectors of the training points
+        degree : int, optional
+            the maximum total degree of the polynomials
+        tol : float, optional
+            the fraction of the variance of the normalized model vectors
+            that can be discarded when truncating the principal components
+        scale : array_like, (Nb,), optional
+            the scale to normalize the model vectors by, i.e., the data
+            errors; default is the standard deviation of the training models
+        key : str, optional
+            the hash of the data vector and fixed parameters, see
+            :func:`training_key`
+        """
+        thetas = np.asarray(thetas); models = np.asarray(models)
+        lower = np.asarray(lower); upper = np.asarray(upper)
+
+        terms = polynomial_terms(thetas.shape[1], degree)
+        if len(thetas) < len(terms):
+            args = (len(thetas), len(terms), degree)
+            raise ValueError("%d training points is fewer than the %d polynomial terms of degree %d" %args)
+        if len(thetas) < 2*len(terms):
+            args = (len(thetas), len(terms), degree)
+            logger.warning("%d training points for %d polynomial terms of degree %d; the fit may be poorly constrained" %args, on=0)
+
+        # normalize the model vectors
+        mean = models.mean(axis=0)
+        if scale is None:
+            scale = models.std(axis=0)
+        scale = np.where(scale > 0, scale, 1.)
+        Y = (models - mean) / scale
+
+        # truncate the principal components
+        U, S, Vt = np.linalg.svd(Y, full_matrices=False)
+        variance = np.cumsum(S**2) / np.sum(S**2)
+        Nc = np.searchsorted(variance, 1.-tol) + 1
+        components = Vt[:min(Nc, len(S))]
+
+        # fit the PCA coefficients with polynomials
+        x = 2*(thetas - lower)/(upper - lower) - 1
+        D = legendre_design(x, terms)
+        coeffs = np.linalg.lstsq(D, np.dot(Y, components.T), rcond=None)[0]
+
+        return cls(names, lower, upper, terms, mean, scale, components, coeffs, key=key)
+
+    @property
+    def ndim(self):
+        """
+        The number of free parameters
+        """
+        return len(self.names)
+
+    def __call__(self, theta):
+        """
+        Evaluate the emulated model vector
+
+        Parameters
+        ----------
+        theta : array_like, (ndim,) or (N, ndim)
+            the free parameters to evaluate the model at
+
+        Returns
+        -------
+        model : array_like, (Nb,) or (N, Nb)
+            the emulated model vectors
+        """
+        theta = np.asarray(theta)
+        x = 2*(np.atleast_2d(theta) - self.lower)/(self.upper - self.lower) - 1
+        Y = np.dot(np.dot(legendre_design(x, self.terms), self.coeffs), self.components)
+        toret = self.mean + Y * self.scale
+        return toret[0] if theta.ndim == 1 else toret
+
+    def validate(self, thetas, models, covariance=None):
+        r"""
+        Compute the accuracy of the emulator against full model evaluations
+
+        The report holds the maximum and root-mean-square fractional errors
+        and, if the ``covariance`` is provided, the mean and maximum
+        :math:`\Delta \chi^2` of the emulation error.
+
+        Parameters
+        ----------
+        thetas : array_like, (N, ndim)
+            the free parameters of the held-out points
+        models : array_like, (N, Nb)
+            the full model vectors at the held-out points
+        covariance : CovarianceMatrix, optional
+            the covariance of the data
+
+        Returns
+        -------
+        report : dict
+            the accuracy report, which is also stored as :attr:`report`
+        """
+        models = np.asarray(models)
+        error = self(thetas) - models
+        with np.errstate(invalid='ignore', divide='ignore'):
+            frac = abs(error / models)
+        frac = frac[np.isfinite(frac)]
+
+        report = {}
+        report['nvalidate'] = len(models)
+        report['ncomponents'] = len(self.components)
+        report['max_frac_error'] = frac.max()
+        report['rms_frac_error'] = np.mean(frac**2)**0.5
+        if covariance is not None:
+            w = covariance.whiten(error)
+            dchi2 = np.einsum('ij,ij->i', w, w)
+            report['mean_delta_chi2'] = dchi2.mean()
+            report['max_delta_chi2'] = dchi2.max()
+
+        self.report = report
+        return report
+
+    def format_report(self):
+        """
+        Return a string summarizing the accuracy report
+        """
+        if not len(self.report):
+            return "emulator has not been validated"
+
+        args = (self.report['nvalidate'], self.report['ncomponents'])
+        lines = ["emulator accuracy (%d held-out points, %d principal components):" %args]
+        for k in ['max_frac_error', 'rms_frac_error', 'mean_delta_chi2', 'max_delta_chi2']:
+            if k in self.report:
+                lines.append("   %-20s: %.4g" %(k, self.report[k]))
+        return "\n".join(lines)
+
+    def is_compatible(self, names, lower, upper, key=None):
+        """
+        Whether the emulator was trained for the free parameters ``names``
+        over the box defined by ``lower`` and ``upper``, with the data vector
+        and fixed parameters given by ``key`` (see :func:`training_key`)
+        """
+        if self.names != list(names) or self.key != key:
+            return False
+        return np.allclose(self.lower, lower) and np.allclose(self.upper, upper)
+
+    def to_npz(self, filename):
+        """
+        Save the emulator to a ``.npz`` file
+        """
+        kws = {}
+        for k in ['lower', 'upper', 'terms', 'mean', 'scale', 'components', 'coeffs']:
+            kws[k] = getattr(self, k)
+        kws['names'] = np.array(self.names)
+        if self.key is not None:
+            kws['key'] = np.array(self.key)
+        kws['report_keys'] = np.array(list(self.report.keys()))
+        kws['report_values'] = np.array(list(self.report.values()), dtype=float)
+        np.savez(filename, **kws)
+
+    @classmethod
+    def from_npz(cls, filename):
+        """
+        Load an emulator from a ``.npz`` file
+        """
+        with np.load(filename) as ff:
+            kws = {k:ff[k] for k in ['lower', 'upper', 'terms', 'mean', 'scale', 'components', 'coeffs']}
+            kws['names'] = [str(name) for name in ff['names']]
+            kws['key'] = str(ff['key']) if 'key' in ff else None
+            kws['report'] = dict(zip([str(k) for k in ff['report_keys']], ff['report_values']))
+        return cls(**kws)
+
+def evaluate_models(driver, thetas, pool=None):
+    """
+    Evaluate the full theory prediction of ``driver`` at ``thetas``,
+    optionally distributing batches of points to the workers of ``pool``
+    """
+    from .solvers import objectives
+
+    if pool is None:
+        return driver.batch_model_callable(thetas)
+
+    nbatch = max(getattr(pool, 'size', 1), 1)
+    batches = [b for b in np.array_split(thetas, nbatch) if len(b)]
+    return np.concatenate(pool.map(objectives.model_batch, batches), axis=0)
+
+def train_emulator(driver, ntrain=None, nvalidate=50, degree=2, tol=1e-6, seed=None, pool=None):
+    """
+    Train a :class:`ModelEmulator` for the theory prediction of ``driver``,
+    sampling the prior box of the free parameters
+
+    The emulator is trained on ``ntrain`` points from a Latin hypercube,
+    and its accuracy is computed using ``nvalidate`` random held-out points.
+
+    Parameters
+    ----------
+    driver : FittingDriver
+        the driver
+    ntrain : int, optional
+        the number of training points; default is :attr:`OVERSAMPLING` times
+        the number of polynomial terms, i.e., 364 for 12 free parameters
+        and ``degree=2``
+    nvalidate : int, optional
+        the number of held-out points to validate the emulator with
+    degree : int, optional
+        the maximum total degree of the polynomials
+    tol : float, optional
+        the fraction of the variance that can be discarded when truncating
+        the principal components
+    seed : int, optional
+        the random seed
+    pool : MPIPool, optional
+        a pool to distribute the model evaluations to
+    """
+    names = driver.theory.free_names
+    lower, upper = prior_box(driver.theory.fit_params)
+    if ntrain is None:
+        ntrain = OVERSAMPLING * len(polynomial_terms(len(names), degree))
+
+    # sample the prior box
+    rng = np.random.RandomState(seed)
+    thetas = latin_hypercube(lower, upper, ntrain, seed=rng.randint(2**31))
+    held_out = lower + rng.uniform(size=(nvalidate, len(names))) * (upper - lower)
+
+    # evaluate the full model
+    logger.info("evaluating the full model at %d training points" %(ntrain+nvalidate), on=0)
+    models = evaluate_models(driver, np.concatenate([thetas, held_out]), pool=pool)
+
+    # fit and validate
+    scale = driver.data.combined_error
+    key = training_key(driver)
+    emulator = ModelEmulator.fit(names, lower, upper, thetas, models[:ntrain], degree=degree,
+                                    tol=tol, scale=scale, key=key)
+    if nvalidate > 0:
+        emulator.validate(held_out, models[ntrain:], covariance=driver.data.covariance_matrix)
+        logger.info(emulator.format_report(), on=0)
+
+    return emulator
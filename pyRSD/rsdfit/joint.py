@@ -0,0 +1,212 @@
+from .. import numpy as np
+from . import MPILoggerAdapter, logging
+from .driver import FittingDriver
+from six import string_types
+
+logger = MPILoggerAdapter(logging.getLogger('rsdfit.joint_driver'))
+
+class JointFittingDriver(object):
+    """
+    A driver to fit several data sets jointly, e.g., the NGC and SGC
+    samples or several redshift bins, summing the chi-squared of each
+    :class:`~pyRSD.rsdfit.driver.FittingDriver`.
+
+    Free parameters with the same name are shared between the data sets,
+    unless listed in ``independent``, in which case each data set has its
+    own parameter, named ``name_label``.
+
+    The theory models of data sets with the same linear power spectrum
+    share the PT integrals, which are computed only once (see
+    :class:`~pyRSD.rsd.pt_integrals.PTIntegralsStore`). This includes models
+    loaded from file, whose integrals are merged into the shared store.
+
+    .. note::
+        The joint driver is only available from Python; the ``rsdfit``
+        command-line interface and its solvers run a single data set
+
+    Parameters
+    ----------
+    drivers : list
+        the list of parameter files, or :class:`FittingDriver` objects,
+        one for each data set
+    independent : list of str, optional
+        the names of free parameters that are fit independently for
+        each data set
+    labels : list of str, optional
+        the labels of the data sets, used to name the independent parameters;
+        default is the index of the data set
+    init_model : bool, optional
+        if `True`, initialize the theoretical models upon initialization
+    """
+    def __init__(self, drivers, independent=[], labels=None, init_model=True):
+
+        # initialize the drivers
+        self.drivers = []
+        for d in drivers:
+            if isinstance(d, string_types):
+                d = FittingDriver(d, init_model=init_model)
+            self.drivers.append(d)
+
+        if labels is None:
+            labels = [str(i) for i in range(len(self.drivers))]
+        if len(labels) != len(self.drivers):
+            raise ValueError("the number of labels should be equal to the number of data sets")
+        self.labels = list(labels)
+        self.independent = list(independent)
+
+        # map the free parameters of each driver to the joint free parameters
+        self.free_names = []
+        self._indices = []
+        self._owners = []
+        for driver, label in zip(self.drivers, self.labels):
+            indices = []
+            for name in driver.theory.free_names:
+                joint = name if name not in self.independent else "%s_%s" %(name, label)
+                if joint not in self.free_names:
+                    self.free_names.append(joint)
+                    self._owners.append(driver.theory.fit_params[name])
+                indices.append(self.free_names.index(joint))
+            self._indices.append(np.array(indices, dtype=int))
+
+        # share the integrals already computed by the models
+        for driver in self.drivers:
+            model = driver.theory.model
+            if model is not None:
+                model.share_computed_integrals()
+
+        # log the integrals backends
+        stores = self.integrals_stores
+        args = (len(self.drivers), len(stores), self.dof)
+        logger.info("joint fit of %d data sets using %d PT integrals backend(s); %d degrees of freedom" %args, on=0)
+
+    @property
+    def integrals_stores(self):
+        """
+        The list of the distinct :class:`~pyRSD.rsd.pt_integrals.PTIntegralsStore`
+        objects used by the theory models
+        """
+        toret = []
+        for driver in self.drivers:
+            store = driver.theory.model.integrals_store
+            if store is not None and not any(store is s for s in toret):
+                toret.append(store)
+        return toret
+
+    #---------------------------------------------------------------------------
+    # parameters
+    #---------------------------------------------------------------------------
+    def split(self, theta):
+        """
+        Split the joint free parameter vector ``theta`` into the free
+        parameter vectors of each driver
+        """
+        theta = np.asarray(theta)
+        if len(theta) != self.Np:
+            raise ValueError("expected %d free parameters, not %d" %(self.Np, len(theta)))
+        return [theta[indices] for indices in self._indices]
+
+    def set_free_parameters(self, theta):
+        """
+        Set the free parameters of each driver, returning `False` if any
+        of the parameters are out of bounds
+        """
+        in_bounds = [d.theory.set_free_parameters(t) for d, t in zip(self.drivers, self.split(theta))]
+        return all(in_bounds)
+
+    @property
+    def free_values(self):
+        """
+        The current values of the joint free parameters
+        """
+        return np.array([p.value for p in self._owners])
+
+    @property
+    def free_fiducial(self):
+        """
+        The fiducial values of the joint free parameters
+        """
+        toret = [p.fiducial for p in self._owners]
+        if None in toret:
+            names = [self.free_names[i] for i in range(self.Np) if toret[i] is None]
+            raise ValueError("fiducial values missing for parameters: %s" %str(names))
+        return np.array(toret)
+
+    @property
+    def Nb(self):
+        """
+        The total number of data points
+        """
+        return sum(d.Nb for d in self.drivers)
+
+    @property
+    def Np(self):
+        """
+        The number of joint free parameters
+        """
+        return len(self.free_names)
+
+    @property
+    def dof(self):
+        """
+        The number of degrees of freedom
+        """
+        return self.Nb - self.Np
+
+    #---------------------------------------------------------------------------
+    # probability functions
+    #---------------------------------------------------------------------------
+    def lnprior(self):
+        """
+        The log of the prior of the joint free parameters, counting
+        shared parameters once
+        """
+        return sum(p.lnprior for p in self._owners)
+
+    def chi2(self, theta=None):
+        """
+        The total chi-squared, summed over the data sets
+
+        Parameters
+        ----------
+        theta : array_like, optional
+            the joint free parameters to evaluate the statistic at; if ``None``,
+            the current values of the free parameters are used
+        """
+        if theta is not None:
+            self.set_free_parameters(theta)
+        return sum(d.chi2() for d in self.drivers)
+
+    def lnlike(self, theta=None):
+        """
+        The log of the likelihood, equal to -0.5 * :func:`chi2`
+        """
+        return -0.5*self.chi2(theta=theta)
+
+    def lnprob(self, theta=None):
+        """
+        Set the free parameters, and return the log of the joint
+        posterior probability function
+
+        Parameters
+        ----------
+        theta : array_like, optional
+            the joint free parameters to evaluate the statistic at; if ``None``,
+            the current values of the free parameters are used
+        """
+        if theta is not None:
+            in_bounds = self.set_free_parameters(theta)
+        else:
+            in_bounds = all(p.within_bounds() for d in self.drivers for p in d.theory.free)
+
+        # return -np.inf if any parameters are out of bounds
+        if not in_bounds:
+            return -np.inf
+
+        lp = self.lnprior()
+        if not np.isfinite(lp):
+            return -np.inf
+
+        lnlike = self.lnlike()
+        if np.isnan(lnlike):
+            raise ValueError("log-likelihood calculation resulted in NaN")
+        return lp + lnlike
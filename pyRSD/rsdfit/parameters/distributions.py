@@ -40,7 +40,7 @@ class BoundDistribution(object):
     def log_pdf(self, x, k=1000):
         x = self.sign * (x-self.value)
         if not self.analytic:
-            return -np.inf if x < 0 else 0.
+            return np.where(x < 0, -np.inf, 0.)[()]
         else:
             return -np.logaddexp(0, -2*k*x)
 
@@ -414,8 +414,13 @@ class Parameter(PickeableCache, lmfit.Parameter):
         If the current value is outside `Parameter.min` or `Parameter.max`,
         return `numpy.inf`
         """
-        x = self.user_value
+        return self.lnprior_at(self.user_value)
 
+    def lnprior_at(self, x):
+        """
+        Return the log of the prior, as given by :attr:`lnprior`, evaluated
+        at the value ``x``, which can also be an array of values
+        """
         # this will be 0 if within bounds, -np.inf otherwise
         lnprior = self.min_bound.log_pdf(x) + self.max_bound.log_pdf(x)
 
@@ -447,14 +452,14 @@ class Parameter(PickeableCache, lmfit.Parameter):
         """
         Returns `True` if the specified value is within the (min, max)
         bounds and if the prior is uniform, within the lower/upper values
-        of the prior
+        of the prior; ``x`` can also be an array of values
         """
         if x is None: x = self.user_value
-        toret = True
+        toret = (x >= self.min_bound.value) & (x <= self.max_bound.value)
         if self.has_prior and self.prior_name == 'uniform':
-            toret = (x >= self.prior.lower) and (x <= self.prior.upper)
+            toret &= (x >= self.prior.lower) & (x <= self.prior.upper)
 
-        return toret and (x >= self.min_bound.value and x <= self.max_bound.value)
+        return toret
 
     #---------------------------------------------------------------------------
     # functions
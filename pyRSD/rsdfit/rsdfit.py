@@ -1,11 +1,10 @@
 from pyRSD import numpy as np, os
-from pyRSD.rsdfit import FittingDriver, params_filename, model_filename, logging
+from pyRSD.rsdfit import FittingDriver, params_filename, model_filename, emulator_filename, logging
 from pyRSD.rsdfit import GlobalFittingDriver
 from pyRSD.rsdfit.util import rsd_io, rsdfit_parser
-from pyRSD.rsdfit.util import rsd_logging, mpi_manager
+from pyRSD.rsdfit.util import rsd_logging, mpi_manager, pools
 
-from mpi4py import MPI
-from emcee.utils import MPIPool
+from six import string_types
 
 def find_init_result(val):
     """
@@ -50,7 +49,8 @@ class RSDFitDriver(object):
     ----------
     comm : MPI communicator
         the global MPI communicator that will optionally
-        be split to distribute work in parallel
+        be split to distribute work in parallel; a
+        :class:`~pyRSD.rsdfit.util.pools.SerialComm` if not using MPI
     mode : str
         the subparser name
     kwargs:
@@ -76,7 +76,7 @@ class RSDFitDriver(object):
         Parse the command-line options and return an 
         initialized `RSDFitDriver`.
         """
-        if comm is None: comm = MPI.COMM_WORLD
+        if comm is None: comm = pools.world_comm()
 
         # rank 0 parses the command-line options
         if comm.size > 1:
@@ -130,7 +130,7 @@ class RSDFitDriver(object):
                 else:
                     if self.comm.rank == 0 and not self.no_save_model:
                         model_dir = driver.params.get('model_dir', self.folder)
-                        driver.theory.model.to_npy(os.path.join(model_dir, model_filename))
+                        driver.theory.model.to_snapshot(os.path.join(model_dir, model_filename))
 
             # only one rank needs to write out
             if self.comm.rank == 0:
@@ -173,6 +173,13 @@ class RSDFitDriver(object):
             if self.burnin is not None:
                 driver.params.add('burnin', value=self.burnin)
 
+        # the emulator is stored next to the model
+        if self.mode != 'analyze':
+            model_dir = driver.params.get('model_dir', self.folder)
+            if isinstance(self.model, string_types):
+                model_dir = os.path.dirname(os.path.abspath(self.model))
+            driver.params.add('emulator_file', value=os.path.join(model_dir, emulator_filename))
+
         self.algorithm = driver
 
     def preprocess(self):
@@ -197,6 +204,10 @@ class RSDFitDriver(object):
         if self.nchains > self.comm.size:
             raise ValueError("number of chains requested must be less than total processes")
 
+        # only MPI can run multiple chains
+        if getattr(self, 'pool_type', 'mpi') != 'mpi' and self.nchains > 1:
+            raise ValueError("running multiple chains requires the `mpi` pool type")
+
         # add the console logger
         silent = getattr(self, 'silent', False)
         if not silent: rsd_logging.add_console_logger(self.comm.rank)
@@ -208,6 +219,17 @@ class RSDFitDriver(object):
                 h for h in logger.handlers if not isinstance(h, logging.StreamHandler)]
             logger.addHandler(logging.NullHandler())
 
+    def model_file(self):
+        """
+        Return the name of the file holding the model, or ``None``
+        if the model was not saved
+        """
+        if isinstance(self.model, string_types):
+            return self.model
+
+        model_dir = self.algorithm.params.get('model_dir', self.folder)
+        return rsd_io.find_model_file(model_dir)
+
     def output_name(self, results, chain_number):
         """
         Return the name of the output file
@@ -226,7 +248,8 @@ class RSDFitDriver(object):
         Run the full `rsdfit` pipeline
 
         This uses `MPIManager` to enforce the pool behavior when calling
-        the `run` function of the desired algorithm
+        the `run` function of the desired algorithm, or `PoolManager` for
+        the pool types that do not require MPI
         """
         # analyze mode
         if self.mode == 'analyze':
@@ -236,9 +259,17 @@ class RSDFitDriver(object):
         # set the global algorithm for each rank
         GlobalFittingDriver.set(self.algorithm)
 
-        # manage the MPI ranks
+        # manage the MPI ranks or the pool of workers
         debug = getattr(self, 'debug', False)
-        with mpi_manager.MPIManager(self.comm, self.nchains, debug=debug) as mpi_master:
+        if getattr(self, 'pool_type', 'mpi') == 'mpi':
+            manager = mpi_manager.MPIManager(self.comm, self.nchains, debug=debug, driver=self.algorithm)
+        else:
+            initargs = (os.path.join(self.folder, params_filename), self.model_file(),
+                        self.algorithm.params.get('emulator_file', None))
+            manager = pools.PoolManager(self.pool_type, nprocs=getattr(self, 'nprocs', None),
+                                        initializer=pools.initialize_worker, initargs=initargs)
+
+        with manager as mpi_master:
 
             # log all the results to a file
             with rsd_logging.FileLogger(mpi_master.rank, debug=debug) as logger:
@@ -267,7 +298,7 @@ class RSDFitDriver(object):
 def main():
 
     # add a console logger
-    rsd_logging.add_console_logger(MPI.COMM_WORLD.rank)
+    rsd_logging.add_console_logger(pools.world_comm().rank)
 
     # create and run
     driver = RSDFitDriver.create()
@@ -60,9 +60,8 @@ class ChainManager(object):
             update_progress(self.free_names, self.sampler, self.niters, self.nwalkers)
 
     def check_status(self):
-        from mpi4py import MPI
-
         if self.comm is not None:
+            from mpi4py import MPI
             if self.comm.Iprobe(source=MPI.ANY_SOURCE, tag=self.tags.EXIT):
                 raise ExitingException
             if self.comm.Iprobe(source=MPI.ANY_SOURCE, tag=self.tags.CONVERGED):
@@ -89,12 +88,12 @@ class ChainManager(object):
                 converged = test_convergence(chains, start_iter+niter+1, epsilon)
                 if converged: raise ConvergenceException
 
-    def sample(self, p0, lnprob0):
+    def sample(self, p0, lnprob0, start=0, stop=None):
         kwargs = {}
         kwargs['lnprob0'] = lnprob0
-        kwargs['iterations'] = self.niters
+        kwargs['iterations'] = (self.niters if stop is None else stop) - start
         kwargs['storechain'] = True
-        return enumerate(self.sampler.sample(p0, **kwargs))
+        return enumerate(self.sampler.sample(p0, **kwargs), start)
 
     def __exit__(self, exc_type, exc_value, exc_traceback):
 
@@ -140,6 +139,45 @@ class ChainManager(object):
 
         return True
 
+#------------------------------------------------------------------------------
+# vectorized evaluation of the walkers
+#------------------------------------------------------------------------------
+class BatchedPool(object):
+    """
+    A pool-like object that evaluates the positions of all walkers with
+    a single call to a vectorized log-probability function
+
+    ``emcee<3.0`` has no ``vectorize`` option, but the sampler hands the
+    full list of walker positions to ``pool.map``; this class intercepts
+    that call. If a ``pool`` is provided, the positions are split into
+    one batch per worker of the pool.
+
+    Parameters
+    ----------
+    batch_func : callable
+        function taking an array of shape (N, ndim) and returning
+        the log-probability for each of the N positions
+    pool : emcee.MPIPool, optional
+        pool object to distribute the batches to
+    """
+    def __init__(self, batch_func, pool=None):
+        self.batch_func = batch_func
+        self.pool = pool
+
+    def map(self, func, iterable):
+        """
+        Evaluate the positions in ``iterable``, ignoring the scalar ``func``
+        passed by the sampler
+        """
+        X = np.asarray(list(iterable))
+        if self.pool is None:
+            return list(self.batch_func(X))
+
+        # one batch per worker
+        nbatch = max(getattr(self.pool, 'size', 1), 1)
+        batches = [b for b in np.array_split(X, nbatch) if len(b)]
+        return list(np.concatenate(self.pool.map(self.batch_func, batches)))
+
 #------------------------------------------------------------------------------
 # tools setup
 #------------------------------------------------------------------------------
@@ -230,7 +268,20 @@ def test_convergence(chains0, niter, epsilon):
 #------------------------------------------------------------------------------
 # the main function to runs
 #------------------------------------------------------------------------------
-def run(params, fit_params, pool=None, chains_comm=None, init_values=None):
+def set_objective(sampler, objective, pool=None, vectorize=False):
+    """
+    Set the log-probability function of ``sampler``, or the batch function
+    of its :class:`BatchedPool` if ``vectorize`` is ``True``
+
+    The pickleable wrapper of ``emcee`` is replaced, such that an MPI pool
+    sends the new function to its workers.
+    """
+    if vectorize:
+        sampler.pool = BatchedPool(objective, pool=pool)
+    else:
+        sampler.lnprobfn = type(sampler.lnprobfn)(objective, sampler.args, sampler.kwargs)
+
+def run(params, fit_params, pool=None, chains_comm=None, init_values=None, emulator=None):
     """
     Perform MCMC sampling of the parameter space of a system using `emcee`
 
@@ -241,10 +292,14 @@ def run(params, fit_params, pool=None, chains_comm=None, init_values=None):
     fit_params : ParameterSet
         the theoretical parameters
     pool : emcee.MPIPool, optional
-        Pool object if we are using MPI to run emcee
+        Pool object if we are using MPI to run emcee; any pool
+        from :mod:`pyRSD.rsdfit.util.pools` can also be used
     init_values : array_like, `EmceeResults`
         Initial positions; if not `None`, initialize the emcee walkers
         in a small, random ball around these positions
+    emulator : ModelEmulator, optional
+        if provided, use the emulated theory prediction for the burn-in
+        iterations or the whole chain, as set by the ``emulator`` parameter
 
     Notes
     -----
@@ -268,6 +323,7 @@ def run(params, fit_params, pool=None, chains_comm=None, init_values=None):
     init_from = params.get('init_from', 'prior')
     epsilon   = params.get('epsilon', 0.02)
     test_conv = params.get('test_convergence', False)
+    vectorize = params.get('vectorize', False)
 
     #---------------------------------------------------------------------------
     # let's check a few things so we dont mess up too badly
@@ -338,26 +394,64 @@ def run(params, fit_params, pool=None, chains_comm=None, init_values=None):
     # initialize the sampler
     logger.warning("EMCEE: initializing sampler with {} walkers".format(nwalkers))
     objective = functools.partial(objectives.lnprob)
+    batch_objective = objectives.lnprob_batch
     sampler = emcee.EnsembleSampler(nwalkers, ndim, objective, pool=pool)
+    if vectorize:
+        logger.warning("EMCEE: evaluating all walkers with the vectorized log-probability")
+        set_objective(sampler, batch_objective, pool=pool, vectorize=True)
 
     # iterator interface allows us to tap ctrl+c and know where we are
     niters -= start_iter
     burnin = 0 if start_iter > 0 else params.get('burnin', 100)
     logger.warning("EMCEE: running {} iterations with {} free parameters...".format(niters, ndim))
 
+    # use the emulator for the burn-in or the whole chain
+    emulate = params.get('emulator', None) if emulator is not None else None
+    if emulate == 'burnin' and burnin == 0:
+        emulate = None
+    if emulate is not None:
+        # NOTE: the workers load the emulator from the driver, rather than
+        # receiving it with each task
+        f = objectives.emulated_lnprob_batch if vectorize else objectives.emulated_lnprob
+        set_objective(sampler, f, pool=pool, vectorize=vectorize)
+        if emulate == 'burnin':
+            logger.warning("EMCEE: using the emulator for the first {} iterations".format(burnin))
+        else:
+            logger.warning("EMCEE: using the emulator for all iterations")
+
     #---------------------------------------------------------------------------
     # do the sampling
     #---------------------------------------------------------------------------
+    # with the emulator for the burn-in, the sampling is restarted after the
+    # burn-in, such that the full model recomputes the log-probability of
+    # the current positions
+    stages = [(0, niters)]
+    if emulate == 'burnin' and burnin < niters:
+        stages = [(0, burnin), (burnin, niters)]
+
     with ChainManager(sampler, niters, nwalkers, fit_params.free_names, chains_comm) as manager:
-        for niter, result in manager.sample(p0, lnprob0):
+        p, lnprob = p0, lnprob0
+        for start, stop in stages:
+
+            # switch from the emulator to the full model after the burn-in
+            if start > 0:
+                logger.warning("EMCEE: burn-in finished; switching from the emulator to the full model")
+                f = batch_objective if vectorize else objective
+                set_objective(sampler, f, pool=pool, vectorize=vectorize)
+                lnprob = None
+
+            for niter, result in manager.sample(p, lnprob, start=start, stop=stop):
+
+                # check if we need to exit due to exception/convergence
+                manager.check_status()
 
-            # check if we need to exit due to exception/convergence
-            manager.check_status()
+                # update progress and test convergence
+                manager.update_progress(niter)
+                if test_conv:
+                    manager.check_convergence(niter, epsilon, start_iter, start_chain)
 
-            # update progress and test convergence
-            manager.update_progress(niter)
-            if test_conv:
-                manager.check_convergence(niter, epsilon, start_iter, start_chain)
+            # the positions at the end of this stage
+            p = result[0]
 
     # make the results and return
     new_results = EmceeResults(sampler, fit_params, burnin)
@@ -1,3 +1,4 @@
+from ... import numpy as np
 from pyRSD.rsdfit import GlobalFittingDriver
 
 
@@ -31,6 +32,48 @@ def lnprob(x=None, scaling=False):
     return driver.lnprob(x)
 
 
+def lnprob_batch(X, scaling=False):
+    """
+    Wrapper for the log-probability (including priors) of a batch
+    of parameter vectors, with shape (N, Np)
+    """
+    driver = GlobalFittingDriver.get()
+    X = np.atleast_2d(X)
+    if scaling:
+        X = driver.theory.fit_params.inverse_scale(X)
+    return driver.lnprob_batch(X)
+
+
+def emulated_lnprob(x, scaling=False):
+    """
+    Wrapper for the log-probability (including priors), using
+    the emulator of the driver for the theory prediction
+    """
+    driver = GlobalFittingDriver.get()
+    with driver.use_emulator(driver.get_emulator(train=False)):
+        return lnprob(x, scaling=scaling)
+
+
+def emulated_lnprob_batch(X, scaling=False):
+    """
+    Wrapper for the log-probability (including priors) of a batch of
+    parameter vectors, using the emulator of the driver for the theory
+    prediction
+    """
+    driver = GlobalFittingDriver.get()
+    with driver.use_emulator(driver.get_emulator(train=False)):
+        return lnprob_batch(X, scaling=scaling)
+
+
+def model_batch(X):
+    """
+    Wrapper for the full theory prediction of a batch of parameter
+    vectors, with shape (N, Np)
+    """
+    driver = GlobalFittingDriver.get()
+    return driver.batch_model_callable(np.atleast_2d(X))
+
+
 def grad_minus_lnlike(x, **kwargs):
     """
     Wrapper for ``FittingDriver.gradient`` which explictly
@@ -1,5 +1,6 @@
 from pyRSD.rsdfit.parameters import Parameter, ParameterSet
 from pyRSD.rsd._cache import Property
+from pyRSD.rsd.tools import raw_output
 from pyRSD.rsd.transfers import WindowFunctionTransfer, gridded_transfers
 from pyRSD.rsdfit.theory import decorators
 
@@ -266,6 +267,25 @@ class BasePowerParameters(ParameterSet):
         """
         return dict((key, self[key].value) for key in self.valid_model_params if key in self)
 
+    def batch_to_dict(self, thetas):
+        """
+        Return the dictionary given by :func:`to_dict` for each of the
+        free parameter vectors in ``thetas``
+
+        Constrained parameters are evaluated for each vector, and the
+        current values of the free parameters are restored on exit. The
+        model itself is not updated.
+        """
+        original = dict(zip(self.free_names, self.free_values))
+        toret = []
+        try:
+            for theta in thetas:
+                self.update_values(**dict(zip(self.free_names, theta)))
+                toret.append(self.to_dict())
+        finally:
+            self.update_values(**original)
+        return toret
+
     def set_free_parameters(self, theta):
         """
         Given an array of values `theta`, set the free parameters of
@@ -548,6 +568,24 @@ class BasePowerTheory(object):
         """
         return self.lnprior_free
 
+    def lnprior_batch(self, thetas):
+        """
+        Return the log prior, as given by :attr:`lnprior`, for each of the
+        free parameter vectors in ``thetas``, with shape ``(N, ndim)``
+
+        The priors of each free parameter are evaluated for the whole column
+        of values at once, and vectors outside of the bounds of any free
+        parameter are assigned ``-np.inf``
+        """
+        thetas = np.atleast_2d(thetas)
+        with np.errstate(invalid='ignore'):
+            valid = np.ones(len(thetas), dtype=bool)
+            toret = np.zeros(len(thetas))
+            for i, param in enumerate(self.free):
+                valid &= param.within_bounds(thetas[:, i])
+                toret += param.lnprior_at(thetas[:, i])
+        return np.where(valid, toret, -np.inf)
+
     @property
     def dlnprior(self):
         """
@@ -693,13 +731,55 @@ class BasePowerTheory(object):
                 self.model.update(**model_params)
 
             # evaluate the P(k,mu) for the (k,mu) pairs we need
-            P = self.model.power(k,mu)
+            with raw_output():
+                P = self.model.power(k,mu)
 
             # apply the transfers to the power
             return apply_transfers(P, data, transfers, stat_ids, slices, theory_decorator)
 
         return evaluate
 
+    def get_batch_model_callable(self, data, transfers, stat_ids,
+                                  model_params=None,
+                                  theory_decorator={}):
+        """
+        Return a callable that evaluates the flattened theory prediction
+        for a batch of free parameter vectors.
+
+        The callable takes an array of shape ``(N, ndim)`` and returns
+        the theory predictions with shape ``(N, Nb)``. The (k,mu) pairs
+        are shared by all parameter vectors, and the state of the
+        model and :attr:`fit_params` is unchanged on exit.
+
+        The model power is evaluated with
+        :func:`~pyRSD.rsd.DarkMatterSpectrum.power_batch`, which updates the
+        model once for each distinct set of parameters that change the
+        cosmology, and broadcasts the remaining parameters over the batch.
+        The transfers are applied to the whole batch with matrix
+        multiplications, except for a window function without a precomputed
+        convolution matrix, which is applied to each vector in turn.
+
+        See :func:`get_model_callable` for a description of the parameters.
+        """
+        # the flattened (k,mu) pairs shared by the whole batch
+        k, mu, slices = self.get_kmu_pairs(transfers)
+
+        def evaluate(thetas):
+
+            # the model parameters for each free parameter vector
+            batch = self.fit_params.batch_to_dict(thetas)
+            if model_params is not None:
+                for params in batch:
+                    params.update(model_params)
+
+            # evaluate P(k,mu) for each set of parameters
+            P = self.model.power_batch(k, mu, batch)
+
+            # apply the transfers to all rows
+            return apply_transfers(P, data, transfers, stat_ids, slices, theory_decorator)
+
+        return evaluate
+
     def get_kmu_pairs(self, transfers):
         """
         Compute the flattened ``k`` and ``mu`` values needed to evaluate the
@@ -720,14 +800,30 @@ class BasePowerTheory(object):
 
         return np.concatenate(k), np.concatenate(mu), slices
 
+def _find_bin(transfers, binval):
+    """
+    Return the index of the first transfer computing the bin ``binval``,
+    either an ``ell`` value or a ``mu`` wedge, and the index of the bin
+    along the second axis of the results of that transfer
+    """
+    for i, t in enumerate(transfers):
+        if hasattr(t, 'ells'):
+            match = t.ells == binval
+        else:
+            match = np.isclose(t.mu_cen, np.mean(binval))
+        if match.any():
+            return i, np.nonzero(match)[0][0]
+    raise ValueError("no transfer function computes the bin %s" %str(binval))
+
 def apply_transfers(P, data, transfers, stat_ids, slices, theory_decorator):
     """
     Apply one (or more) transfer functions to the input P(k,mu) values.
 
     Parameters
     ----------
-    P : xarray.DataArray
-        the power values calculated on the (k,mu) grid
+    P : xarray.DataArray, array_like
+        the power values calculated on the (k,mu) grid; a 2D array holds
+        the power for a batch of parameter sets, one per row
     data : PowerData
         the data object
     transfers : list
@@ -744,16 +840,34 @@ def apply_transfers(P, data, transfers, stat_ids, slices, theory_decorator):
     # based on the mode, pkmu or poles
     dim = 'ell' if data.mode == 'poles' else 'mu'
 
-    # apply the transfer function to the correct slice of P(k,mu)
-    results = []
-    for i, t in enumerate(transfers):
-        results.append(t(P[slices[i]]))
-
-    # concatenate results into a single array if we had multiple transfers
-    if len(results) > 1:
-        result = xr.concat(results, dim=results[0].dims[-1])
+    # the transfers are computed with matrix multiplications, using the
+    # flat form of each transfer, except for the window function convolved
+    # with FFTLog, i.e., without a precomputed window matrix
+    flat = None; k_flat = None
+    if isinstance(transfers[0], WindowFunctionTransfer):
+        if transfers[0].use_matrix:
+            k_flat = [data.measurements[data.statistics.index(stat)].k for stat in stat_ids]
+            k_flat = np.unique(np.concatenate(k_flat))
+            flat = [transfers[0].apply_flat(P[..., slices[0]], k_flat)]
     else:
-        result = results[0]
+        flat = [t.apply_flat(P[..., slices[i]]) for i, t in enumerate(transfers)]
+
+    # a batch of parameter sets without a matrix form is done row by row
+    if flat is None and np.ndim(P) == 2:
+        args = (data, transfers, stat_ids, slices, theory_decorator)
+        return np.array([apply_transfers(p, *args) for p in P])
+
+    if flat is None:
+        # apply the transfer function to the correct slice of P(k,mu)
+        results = []
+        for i, t in enumerate(transfers):
+            results.append(t(P[slices[i]]))
+
+        # concatenate results into a single array if we had multiple transfers
+        if len(results) > 1:
+            result = xr.concat(results, dim=results[0].dims[-1])
+        else:
+            result = results[0]
 
     # format the results
     toret = []
@@ -772,6 +886,17 @@ def apply_transfers(P, data, transfers, stat_ids, slices, theory_decorator):
         theory = []
         for bb in binval:
 
+            # select the proper slice of the flat results
+            if flat is not None:
+                i, index = _find_bin(transfers, bb)
+                if k_flat is not None:
+                    theory.append(flat[i][..., np.searchsorted(k_flat, m.k), index])
+                elif isinstance(transfers[i], gridded_transfers):
+                    theory.append(flat[i][..., transfers[i].flat_slices[index]])
+                else:
+                    theory.append(flat[i][..., index])
+                continue
+
             # select the proper binval from the DataArray
             r = result.sel(**{dim:bb})
 
@@ -803,4 +928,4 @@ def apply_transfers(P, data, transfers, stat_ids, slices, theory_decorator):
 
         toret.append(theory)
 
-    return np.concatenate(toret)
+    return np.concatenate(toret, axis=-1)
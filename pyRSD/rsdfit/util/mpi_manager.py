@@ -27,7 +27,7 @@ class MPIManager(object):
     """
     logger = logging.getLogger("MPIManager")
     
-    def __init__(self, comm, nruns, debug=False):
+    def __init__(self, comm, nruns, debug=False, driver=None):
         """
         Parameters
         ----------
@@ -38,10 +38,15 @@ class MPIManager(object):
         debug : bool, optional
             set the logging level to debug in the `MPIPool`; default
             is `False`
+        driver : FittingDriver, optional
+            if provided, the large arrays of the fit are placed in
+            node-local shared memory before the workers of the pool
+            begin waiting for tasks; see :func:`FittingDriver.share_state`
         """
         self.comm  = comm
         self.nruns = nruns
         self.debug = debug
+        self.driver = driver
         if debug: self.logger.setLevel(logging.DEBUG)
     
         # initialize comm for parallel runs
@@ -80,6 +85,10 @@ class MPIManager(object):
             kws = {'loadbalance':True, 'comm':self.pool_comm, 'debug':self.debug}
             self.pool = MPIPool(**kws)
                     
+        # share the state of the fit b/w the ranks of the pool
+        if self.pool is not None and self.driver is not None:
+            self.driver.share_state(self.pool_comm)
+
         # explicitly force non-master ranks in pool to wait
         if self.pool is not None and not self.pool.is_master():
             self.pool.wait()
@@ -0,0 +1,201 @@
+"""
+Pools of workers for running ``rsdfit`` without MPI.
+
+Each pool has the ``map`` function used by ``emcee`` and
+:func:`~pyRSD.rsdfit.driver.FittingDriver.grad_minus_lnlike`, as well as the
+``size``, ``is_master``, and ``close`` attributes of :class:`emcee.utils.MPIPool`.
+"""
+import traceback
+from ... import os
+from .. import logging
+
+POOL_TYPES = ['mpi', 'process', 'thread', 'serial']
+
+class SerialComm(object):
+    """
+    A stand-in for ``MPI.COMM_WORLD`` when running with a single process
+    """
+    rank = 0
+    size = 1
+
+    def barrier(self):
+        pass
+
+    def Barrier(self):
+        pass
+
+    def bcast(self, obj, root=0):
+        return obj
+
+def world_comm():
+    """
+    Return ``MPI.COMM_WORLD``, or a :class:`SerialComm` if
+    :mod:`mpi4py` is not installed
+    """
+    try:
+        from mpi4py import MPI
+        return MPI.COMM_WORLD
+    except ImportError:
+        return SerialComm()
+
+def initialize_worker(params_file, model_file=None, emulator_file=None):
+    """
+    Initialize the :class:`GlobalFittingDriver` of a pool worker
+
+    This is called once per worker, such that the model is loaded
+    from ``model_file`` only once, rather than sent with each task.
+
+    Parameters
+    ----------
+    params_file : str
+        the name of the file holding the driver parameters
+    model_file : str, optional
+        the name of the file holding the model; if not provided,
+        the model is initialized from scratch
+    emulator_file : str, optional
+        the name of the file holding the trained emulator, which is
+        loaded by the worker when first needed
+    """
+    from pyRSD.rsdfit import FittingDriver, GlobalFittingDriver
+
+    driver = FittingDriver(params_file, init_model=model_file is None)
+    if model_file is not None:
+        driver.model = model_file
+    if emulator_file is not None:
+        driver.params.add('emulator_file', value=emulator_file)
+    GlobalFittingDriver.set(driver, local=True)
+
+class SerialPool(object):
+    """
+    A pool that evaluates all tasks in the current process
+    """
+    size = 1
+
+    def is_master(self):
+        return True
+
+    def map(self, function, tasks):
+        return list(map(function, tasks))
+
+    def close(self):
+        pass
+
+class ExecutorPool(object):
+    """
+    A pool that evaluates tasks with a :mod:`concurrent.futures` executor
+
+    Parameters
+    ----------
+    executor : concurrent.futures.Executor
+        the executor to submit tasks to
+    size : int
+        the number of workers of the executor
+    chunked : bool, optional
+        if ``True``, split the tasks into one chunk per worker, such that
+        the function is only pickled once per worker
+    """
+    def __init__(self, executor, size, chunked=False):
+        self.executor = executor
+        self.size = size
+        self.chunked = chunked
+
+    def is_master(self):
+        return True
+
+    def map(self, function, tasks):
+        tasks = list(tasks)
+        kws = {}
+        if self.chunked:
+            kws['chunksize'] = max(1, -(-len(tasks) // self.size))
+        return list(self.executor.map(function, tasks, **kws))
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+def create_pool(pool_type, nprocs=None, initializer=None, initargs=()):
+    """
+    Return a pool of workers that does not require MPI
+
+    Parameters
+    ----------
+    pool_type : {'process', 'thread', 'serial'}
+        the type of pool
+    nprocs : int, optional
+        the number of workers; default is the number of cores
+    initializer : callable, optional
+        a function called once by each worker, i.e., :func:`initialize_worker`
+    initargs : tuple, optional
+        the arguments passed to ``initializer``
+    """
+    if pool_type == 'serial':
+        return SerialPool()
+
+    if nprocs is None:
+        nprocs = os.cpu_count() or 1
+    kws = {'max_workers':nprocs, 'initializer':initializer, 'initargs':initargs}
+
+    if pool_type == 'process':
+        from concurrent.futures import ProcessPoolExecutor
+        return ExecutorPool(ProcessPoolExecutor(**kws), nprocs, chunked=True)
+    elif pool_type == 'thread':
+        from concurrent.futures import ThreadPoolExecutor
+        return ExecutorPool(ThreadPoolExecutor(**kws), nprocs)
+    else:
+        raise ValueError("pool type should be one of %s, not '%s'" %(str(POOL_TYPES[1:]), pool_type))
+
+class PoolManager(object):
+    """
+    Context manager for a pool of workers that does not require MPI, with
+    the same attributes as :class:`~pyRSD.rsdfit.util.mpi_manager.MPIManager`
+
+    Only a single chain can be run, so :attr:`rank` is always 0.
+    """
+    logger = logging.getLogger("PoolManager")
+
+    def __init__(self, pool_type, nprocs=None, initializer=None, initargs=()):
+        """
+        Parameters
+        ----------
+        pool_type : {'process', 'thread', 'serial'}
+            the type of pool
+        nprocs : int, optional
+            the number of workers; default is the number of cores
+        initializer : callable, optional
+            a function called once by each worker
+        initargs : tuple, optional
+            the arguments passed to ``initializer``
+        """
+        self.pool_type = pool_type
+        self.nprocs = nprocs
+        self.initializer = initializer
+        self.initargs = initargs
+
+        self.rank = 0
+        self.par_runs_comm = None
+        self.pool = None
+
+    def __enter__(self):
+        """
+        Start the pool of workers
+        """
+        pool = create_pool(self.pool_type, nprocs=self.nprocs,
+                            initializer=self.initializer, initargs=self.initargs)
+
+        # no pool needed for serial evaluation
+        if not isinstance(pool, SerialPool):
+            self.pool = pool
+            self.logger.debug("using a '%s' pool with %d worker(s)" %(self.pool_type, pool.size))
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        """
+        Shut down the workers of the pool
+        """
+        if exc_value is not None:
+            trace = ''.join(traceback.format_exception(exc_type, exc_value, exc_traceback, limit=5))
+            self.logger.error("traceback:\n%s" %trace)
+
+        if self.pool is not None:
+            self.pool.close()
+
+        return True
@@ -56,16 +56,28 @@ def load_model(filename, **kwargs):
     if not os.path.exists(filename):
         raise ConfigurationError('cannot load model from file `%s`; does not exist' %filename)
     _, ext = os.path.splitext(filename)
-    if ext == '.npy':
+    if os.path.isdir(filename) or ext == '.npy':
         from ...rsd import load_model
         model = load_model(filename, **kwargs)
     elif ext == '.pickle':
         model = load_pickle(filename)
     else:
-        raise ValueError("extension for model file not recognized; must be `.npy` or `.pickle`")
+        raise ValueError("extension for model file not recognized; must be a snapshot directory, `.npy` or `.pickle`")
 
     return model
 
+def find_model_file(dirname):
+    """
+    Return the name of the model file in the directory ``dirname``, preferring
+    a snapshot to a legacy ``.npy`` file, or ``None`` if there is none
+    """
+    from .. import model_filename, legacy_model_filename
+    for filename in [model_filename, legacy_model_filename]:
+        path = os.path.join(dirname, filename)
+        if os.path.exists(path):
+            return path
+    return None
+
 def create_output_file(folder, solver_type, chain_number, iterations, walkers=0, restart=None):
     """
     Automatically create a new name for the results file.
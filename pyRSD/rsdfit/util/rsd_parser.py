@@ -1,4 +1,4 @@
-from .. import logging, model_filename, params_filename
+from .. import logging, params_filename
 from ... import os
 
 import argparse as ap
@@ -65,6 +65,19 @@ def positive_int(string):
         raise ap.ArgumentTypeError("argument requires a positive integer")
 
 
+def add_pool_arguments(subparser):
+    """
+    Add the arguments specifying the pool of workers
+    """
+    from .pools import POOL_TYPES
+
+    h = 'the type of pool used to distribute the calculation; all but `mpi` run without an MPI launcher'
+    kwargs = {'dest':'pool_type', 'choices':POOL_TYPES, 'default':'mpi', 'help':h}
+    subparser.add_argument('--pool', **kwargs)
+
+    h = 'the number of workers of a `process` or `thread` pool; default is the number of cores'
+    subparser.add_argument('--nprocs', help=h, type=positive_int)
+
 def setup_mcmc_subparser(parent):
     """
     Setup the subparser for the ``mcmc`` subcommand
@@ -107,6 +120,9 @@ def setup_mcmc_subparser(parent):
     h = 'whether to print more info about the mpi4py.Pool object'
     subparser.add_argument('--debug', help=h, action='store_true', default=False)
 
+    # the pool of workers
+    add_pool_arguments(subparser)
+
     # dont save model
     h = 'do not save the model instance'
     subparser.add_argument('--no-save-model', help=h, action='store_true', default=False)
@@ -145,6 +161,9 @@ def setup_nlopt_subparser(parent):
     h = 'whether to print more info about the mpi4py.Pool object'
     subparser.add_argument('--debug', help=h, action='store_true', default=False)
 
+    # the pool of workers
+    add_pool_arguments(subparser)
+
     # dont save model
     h = 'do not save the model instance'
     subparser.add_argument('--no-save-model', help=h, action='store_true', default=False)
@@ -182,6 +201,9 @@ def setup_restart_subparser(parent):
     h = 'whether to print more info about the mpi4py.Pool object'
     subparser.add_argument('--debug', help=h, action='store_true', default=False)
 
+    # the pool of workers
+    add_pool_arguments(subparser)
+
 def setup_analyze_subparser(parent):
     """
     Setup the subparser for the ``restart`` subcommand
@@ -345,7 +367,7 @@ def verify_arguments(ns):
     """
     Run a few quick verification tests on the supplied arguments
     """
-    from .rsd_io import ConfigurationError
+    from .rsd_io import ConfigurationError, find_model_file
     ## restart from existing
     if ns.subparser_name == 'restart':
 
@@ -356,8 +378,8 @@ def verify_arguments(ns):
         if not os.path.exists(ns.params):
             raise ConfigurationError("Restarting but associated `%s` doesn't exist" %params_filename)
         if ns.model is None:
-            ns.model = os.path.join(ns.folder, model_filename)
-            if not os.path.exists(ns.model):
+            ns.model = find_model_file(ns.folder)
+            if ns.model is None:
                 raise ConfigurationError("Restarting but cannot find existing model file to read")
         logger.warning("Restarting from %s and using associated params.dat" %ns.restart_files[0])
 
@@ -368,7 +390,7 @@ def verify_arguments(ns):
         # try to use an existing params.dat
         if os.path.isdir(ns.folder):
             params_path = os.path.join(ns.folder, params_filename)
-            model_path = os.path.join(ns.folder, model_filename)
+            model_path = find_model_file(ns.folder)
             if os.path.exists(params_path):
                 # if the params.dat exists, and param files were given,
                 # use the params.dat, and notify the user
@@ -384,7 +406,7 @@ def verify_arguments(ns):
                         " line option -p any.param)")
 
             # also check for existing model file now
-            if os.path.exists(model_path):
+            if model_path is not None:
                 if ns.model is None:
                     ns.model = model_path
         else:
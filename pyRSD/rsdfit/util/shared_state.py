@@ -0,0 +1,187 @@
+"""
+Node-local shared memory for the large, immutable arrays of a fit.
+
+The arrays are placed once in an MPI-3 shared memory window on each node, such
+that the processes of a pool hold a single copy per node. Tasks sent through
+the pool can then reference the arrays with a :class:`SharedArray` handle,
+which pickles to a short key rather than the full array.
+"""
+from ... import numpy as np
+from pyRSD.rsd.tools import get_hash_key
+
+# the arrays in the shared state of this process, keyed by content
+_registry = {}
+
+# the MPI windows holding the memory of the shared arrays
+_windows = []
+
+# the keys of the arrays passed to handle(), keyed by identity
+_handles = {}
+
+class SharedArray(object):
+    """
+    A handle to an array in the shared state, which only pickles its key
+
+    Parameters
+    ----------
+    key : str
+        the hash key of the array contents
+    """
+    def __init__(self, key):
+        self.key = key
+
+    def __reduce__(self):
+        return (SharedArray, (self.key,))
+
+    def resolve(self):
+        """
+        Return the array referenced by this handle
+        """
+        try:
+            return _registry[self.key]
+        except KeyError:
+            raise RuntimeError("array '%s' is not in the shared state of this process" %self.key)
+
+def handle(value):
+    """
+    Return a :class:`SharedArray` handle to ``value`` if an array with
+    the same contents is in the shared state, else return ``value``
+
+    The contents of ``value`` are only hashed the first time it is
+    passed, and are assumed not to be modified in place afterwards.
+    """
+    if not len(_registry) or not isinstance(value, np.ndarray):
+        return value
+
+    # the key is computed once per array, keeping a reference such
+    # that the identity cannot be reused
+    entry = _handles.get(id(value))
+    if entry is None or entry[0] is not value:
+        key = get_hash_key(np.ascontiguousarray(value))
+        entry = _handles[id(value)] = (value, key if key in _registry else None)
+
+    key = entry[1]
+    return SharedArray(key) if key is not None else value
+
+def resolve(value):
+    """
+    Return the array referenced by ``value``, if it is a :class:`SharedArray`
+    """
+    if isinstance(value, SharedArray):
+        return value.resolve()
+    return value
+
+def _node_comm(comm):
+    """
+    Return the communicator of the ranks in ``comm`` on the same node,
+    or ``None`` if shared memory windows are not supported
+    """
+    if comm is None or comm.size == 1:
+        return None
+    try:
+        from mpi4py import MPI
+        return comm.Split_type(MPI.COMM_TYPE_SHARED)
+    except (ImportError, AttributeError, NotImplementedError):
+        return None
+
+def _evaluate(value):
+    """
+    Return ``value`` as a contiguous array, calling it first if it
+    is a function computing the array
+    """
+    if callable(value):
+        value = value()
+    return np.ascontiguousarray(value)
+
+def _allocate(comm, value):
+    """
+    Copy ``value`` into a shared memory window allocated by the
+    first rank of the node communicator ``comm``
+
+    Only the first rank evaluates ``value``, broadcasting the shape,
+    data type and hash key of the array to the other ranks, which
+    attach to the window.
+    """
+    from mpi4py import MPI
+
+    if comm.rank == 0:
+        value = _evaluate(value)
+        meta = (value.shape, value.dtype, get_hash_key(value))
+    else:
+        meta = None
+    shape, dtype, key = comm.bcast(meta, root=0)
+
+    nbytes = int(np.prod(shape)) * dtype.itemsize
+    if not nbytes:
+        toret = np.empty(shape, dtype=dtype)
+        toret.flags.writeable = False
+        return toret, key
+
+    size = nbytes if comm.rank == 0 else 0
+    win = MPI.Win.Allocate_shared(size, dtype.itemsize, comm=comm)
+    buf, _ = win.Shared_query(0)
+    toret = np.ndarray(buffer=buf, dtype=dtype, shape=shape)
+
+    if comm.rank == 0:
+        toret[...] = value
+    comm.Barrier()
+
+    _windows.append(win)
+    toret.flags.writeable = False
+    return toret, key
+
+def share(comm, arrays):
+    """
+    Add the input arrays to the shared state of this process, placing
+    them in node-local shared memory
+
+    This is a collective operation on ``comm``; all ranks must pass the
+    same names. The values can be functions computing the arrays, which
+    are then only called on the first rank of each node, the other ranks
+    attaching to the shared memory. If ``comm`` is ``None`` or shared
+    memory is not supported, the arrays are computed and registered by
+    each process, such that handles to them can still be resolved.
+
+    Parameters
+    ----------
+    comm : MPI.Communicator
+        the communicator of the ranks sharing the arrays
+    arrays : dict
+        the arrays to share, or the functions computing them, keyed by name
+
+    Returns
+    -------
+    dict :
+        the shared (read-only) arrays, keyed by name
+    """
+    node_comm = _node_comm(comm)
+    _handles.clear()
+
+    toret = {}
+    try:
+        for name in sorted(arrays):
+            if node_comm is not None:
+                value, key = _allocate(node_comm, arrays[name])
+            else:
+                value = _evaluate(arrays[name])
+                key = get_hash_key(value)
+            _registry[key] = value
+            toret[name] = value
+    finally:
+        if node_comm is not None:
+            node_comm.Free()
+
+    return toret
+
+def clear():
+    """
+    Remove all arrays from the shared state, freeing the shared memory
+
+    Freeing the memory is a collective operation on the communicators
+    passed to :func:`share`, and the arrays it returned must no longer
+    be used.
+    """
+    _registry.clear()
+    _handles.clear()
+    while len(_windows):
+        _windows.pop().Free()
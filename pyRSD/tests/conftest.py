@@ -1,13 +1,17 @@
-from .. import pytest
-from .. import cache_manager
-from pyRSD.rsdfit import FittingDriver
+from . import pytest
+from . import cache_manager
 from pyRSD import data_dir
 import os
 
-@pytest.fixture(scope='session', autouse=True)
+@pytest.fixture(scope='session')
 def driver(request):
+    """
+    The galaxy model fitting driver, shared by the tests of the galaxy
+    derivatives and the driver
+    """
 
     from pyRSD.rsd import GalaxySpectrum
+    from pyRSD.rsdfit import FittingDriver
 
     # add the PYRSD_DATA env var
     os.environ['PYRSD_DATA'] = data_dir
@@ -0,0 +1,39 @@
+from pyRSD import pygcl
+from pyRSD.rsd.tools import BiasToMassRelation, bias_Tinker
+from scipy.optimize import brentq
+import numpy as np
+import pytest
+
+@pytest.fixture(scope='module')
+def relation():
+    cosmo = pygcl.Cosmology("teppei_sims.ini", pygcl.transfers.EH)
+    return BiasToMassRelation(0.55, cosmo)
+
+def mass_from_brentq(relation, sigma8_z, b1):
+    cosmo = relation.cosmo
+    rescaling = sigma8_z / cosmo.sigma8()
+    mass_to_radius = lambda M: (3.*M*1e13/(4.*np.pi*cosmo.rho_bar_z(0.)))**(1./3.)
+    objective = lambda M: bias_Tinker(rescaling*relation.power_lin.Sigma(mass_to_radius(M))) - b1
+    return brentq(objective, 1e-8, 1e3, xtol=1e-12)*1e13
+
+def test_inversion(relation):
+
+    sigma8s = np.array([0.4, 0.6, 0.8, 0.95])
+    b1s = np.array([1.0, 1.5, 3.0, 6.0])
+    expected = np.array([mass_from_brentq(relation, s8, b1) for s8, b1 in zip(sigma8s, b1s)])
+
+    # arrays, and scalars
+    np.testing.assert_allclose(relation(sigma8s, b1s), expected, rtol=1e-6)
+    assert np.isscalar(relation(sigma8s[0], b1s[0]))
+
+    # the table agrees with the exact inversion within the grid
+    relation.interpolate = True
+    try:
+        np.testing.assert_allclose(relation(sigma8s, b1s), expected, rtol=1e-2)
+        np.testing.assert_allclose(relation(0.2, 2.), mass_from_brentq(relation, 0.2, 2.), rtol=1e-6)
+    finally:
+        relation.interpolate = False
+
+    # out of the range of the Tinker relation
+    with pytest.raises(ValueError):
+        relation(0.8, 0.5)
@@ -0,0 +1,34 @@
+from pyRSD.rsd import tools
+import numpy as np
+import xarray as xr
+
+class Model(object):
+
+    @tools.broadcast_kmu
+    def inner(self, k, mu):
+        return k * mu**2
+
+    @tools.broadcast_kmu
+    def outer(self, k, mu):
+        P = self.inner(k, mu)
+        assert type(P) is np.ndarray
+        return 2*P
+
+def test_broadcast_kmu():
+
+    m = Model()
+    k = np.linspace(0.01, 0.4, 10); mu = np.linspace(0., 1., 5)
+
+    # the outermost call returns a DataArray
+    P = m.outer(k, mu)
+    assert isinstance(P, xr.DataArray) and P.shape == (10, 5)
+    np.testing.assert_allclose(P.values, 2*k[:,None]*mu[None,:]**2)
+
+    # numpy arrays inside a raw_output context
+    with tools.raw_output():
+        P2 = m.outer(k, mu)
+    assert type(P2) is np.ndarray
+    np.testing.assert_array_equal(P2, P.values)
+
+    # the context is exited properly
+    assert isinstance(m.inner(0.1, 0.5), xr.DataArray)
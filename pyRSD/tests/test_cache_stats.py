@@ -0,0 +1,58 @@
+from pyRSD.rsd._cache import Cache, parameter, cached_property
+import json
+
+class Model(Cache):
+
+    def __init__(self, a=1., b=2.):
+        self.a = a
+        self.b = b
+
+    @parameter
+    def a(self, val):
+        return val
+
+    @parameter
+    def b(self, val):
+        return val
+
+    @cached_property("a")
+    def x(self):
+        return 2*self.a
+
+    @cached_property("x", "b")
+    def y(self):
+        return self.x + self.b
+
+def test_cache_stats():
+
+    m = Model()
+    assert m.cache_stats is None
+
+    with m.track_cache() as stats:
+        m.y; m.y
+        m.b = 3.
+        m.y
+        m.a = 2.
+        m.y
+
+    # statistics are disabled on exit
+    assert m.cache_stats is None
+
+    assert stats.nodes['y']['misses'] == 3
+    assert stats.nodes['y']['hits'] == 1
+    assert stats.nodes['x']['misses'] == 2
+    assert stats.nodes['x']['hits'] == 1
+
+    # b only invalidates y, a invalidates both
+    assert stats.invalidations['b']['fanout'] == 1
+    assert stats.invalidations['a']['fanout'] == 2
+    assert sorted(stats.invalidations['a']['nodes']) == ['x', 'y']
+
+    # self time never exceeds inclusive time
+    for d in stats.nodes.values():
+        assert d['self_time'] <= d['time'] + 1e-12
+
+    # exports
+    d = json.loads(stats.to_json())
+    assert {'source':'x', 'target':'y'} in d['edges']
+    assert 'digraph Model' in stats.to_dot()
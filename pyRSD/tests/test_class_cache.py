@@ -0,0 +1,54 @@
+from pyRSD import pygcl
+from pyRSD.rsd import DarkMatterSpectrum
+from pyRSD.rsd.cosmology import Planck15
+import pickle
+import pytest
+
+def test_class_params_key():
+
+    pars = {'h':0.6774, 'omega_b':0.0223, 'output':'mPk'}
+    key = pygcl.class_params_key(pars, pygcl.transfers.EH)
+
+    # the key does not depend on the formatting of the parameters
+    same = {'output':'dTk, mPk', 'omega_b':'0.02230', 'h':'0.6774'}
+    assert pygcl.class_params_key(same, pygcl.transfers.EH) == key
+    assert pygcl.class_params_key(pars, pygcl.transfers.CLASS) != key
+    assert pygcl.class_params_key(dict(pars, h=0.7), pygcl.transfers.EH) != key
+
+def test_class_cache(monkeypatch):
+
+    # by default, a new object that can be modified is returned
+    pygcl.clear_class_cache()
+    c0 = Planck15.to_class(transfer=pygcl.transfers.EH)
+    assert not c0.read_only
+    c0.SetSigma8(0.5)
+    assert Planck15.to_class(transfer=pygcl.transfers.EH) is not c0
+
+    c1 = Planck15.to_class(transfer=pygcl.transfers.EH, cache=True)
+    c2 = Planck15.to_class(transfer=pygcl.transfers.EH, cache=True)
+    assert c1 is c2
+    assert Planck15.to_class(transfer=pygcl.transfers.EH, cache=False) is not c1
+
+    # the shared object cannot be modified in place, but its clones can
+    assert c1.read_only
+    with pytest.raises(ValueError):
+        c1.SetSigma8(0.5)
+    assert c1.sigma8() == Planck15.sigma8
+    c3 = c1.clone()
+    assert not c3.read_only
+    c3.SetSigma8(0.5)
+    assert c1.sigma8() == Planck15.sigma8
+
+    # with the cache enabled, models with the same cosmology, and unpickled
+    # models, share the CLASS outputs
+    monkeypatch.setattr(pygcl, 'CLASS_CACHE', True)
+    m1 = DarkMatterSpectrum(params=Planck15, transfer_fit='EH')
+    m2 = pickle.loads(pickle.dumps(m1))
+    assert m1.cosmo is c1
+    assert m2.cosmo is c1
+    assert m2.cosmo.sigma8() == Planck15.sigma8
+
+    # other objects are unpickled as new objects
+    c4 = pickle.loads(pickle.dumps(c3))
+    assert c4 is not c3 and not c4.read_only
+    assert c4.sigma8() == 0.5
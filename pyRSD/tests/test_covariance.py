@@ -0,0 +1,23 @@
+import numpy as np
+from pyRSD.rsdfit.data import CovarianceMatrix
+
+def test_whiten():
+
+    # a random positive-definite matrix
+    N = 50
+    A = np.random.random(size=(N, N))
+    C = CovarianceMatrix(np.dot(A, A.T) + N*np.identity(N))
+    C.inverse_rescaling = 0.9
+
+    # the chi2 from whitening matches the chi2 from the inverse
+    d = np.random.random(size=(10, N))
+    w = C.whiten(d)
+    chi2 = np.einsum('ij,jk,ik->i', d, C.inverse, d)
+    np.testing.assert_allclose(np.einsum('ij,ij->i', w, w), chi2)
+
+    # batched and single vectors are consistent
+    np.testing.assert_allclose(C.whiten(d[0]), w[0])
+
+    # the Cholesky factor is recomputed when the rescaling changes
+    C.inverse_rescaling = 1.0
+    np.testing.assert_allclose(np.dot(C.cholesky, C.cholesky.T), C.values)
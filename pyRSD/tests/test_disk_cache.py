@@ -0,0 +1,36 @@
+import numpy as np
+from pyRSD.rsd._disk_cache import DiskCache
+import os
+
+def test_roundtrip(tmpdir):
+
+    cache = DiskCache('test', root=str(tmpdir))
+    x = np.random.random(size=(3, 100))
+
+    # missing values return None
+    assert cache.load('key', 'x') is None
+
+    # save and load as memory map
+    assert cache.save('key', 'x', x)
+    y = cache.load('key', 'x')
+    assert isinstance(y, np.memmap)
+    np.testing.assert_array_equal(x, y)
+
+    assert 'key' in cache
+    assert cache.keys() == ['key']
+    assert not any(f.endswith('.tmp') for f in os.listdir(os.path.join(cache.path, 'key')))
+
+def test_lru_eviction(tmpdir):
+
+    x = np.zeros(1000) # 8000 bytes of data
+    cache = DiskCache('test', root=str(tmpdir), max_size=20000)
+
+    for i, key in enumerate(['a', 'b']):
+        cache.save(key, 'x', x)
+        os.utime(os.path.join(cache.path, key), (100*i, 100*i))
+
+    # loading marks a as recently used, so b is evicted
+    cache.load('a', 'x')
+    cache.save('c', 'x', x)
+    assert sorted(cache.keys()) == ['a', 'c']
+    assert cache.size() <= cache.max_size
@@ -0,0 +1,4 @@
+import numdifftools, numpy
+from pyRSD.rsdfit.util.rsd_logging import add_console_logger
+
+add_console_logger(0)
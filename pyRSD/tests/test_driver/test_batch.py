@@ -0,0 +1,84 @@
+import numpy as np
+
+def test_power_batch(driver):
+
+    model = driver.theory.model
+    driver.set_fiducial()
+
+    # the (k,mu) pairs
+    k = np.linspace(0.01, 0.4, 50)
+    mu = np.linspace(0., 1., 50)
+
+    # parameter sets that are broadcast, and one that changes the growth rate
+    thetas = [{'fs':0.10, 'sigma_c':1., 'b1_cA':1.9, 'alpha_par':1.02},
+              {'fs':0.15, 'sigma_c':2., 'b1_sB':3.4, 'alpha_perp':0.98},
+              {'fs':0.20, 'sigma_c':0.5, 'f':0.75}]
+    assert all(name in model.batch_parameters for name in ['fs', 'sigma_c', 'b1_cA', 'alpha_par'])
+    P = model.power_batch(k, mu, thetas)
+    assert P.shape == (len(thetas), len(k))
+
+    # compare to individual evaluations
+    for i, theta in enumerate(thetas):
+        with model.preserve():
+            model.update(**theta)
+            np.testing.assert_allclose(P[i], model.power(k, mu).values)
+
+def test_power_batch_groups(driver, monkeypatch):
+
+    model = driver.theory.model
+    driver.set_fiducial()
+    k = np.linspace(0.01, 0.4, 10)
+    mu = np.linspace(0., 1., 10)
+
+    calls = []
+    update = model.update
+    def counted(**kws):
+        calls.append(kws)
+        return update(**kws)
+    monkeypatch.setattr(model, 'update', counted)
+
+    # parameter sets sharing f and sigma8_z are updated once
+    thetas = [{'f':0.75, 'sigma8_z':0.6, 'fs':fs, 'alpha_par':1.01} for fs in [0.1, 0.15, 0.2]]
+    model.power_batch(k, mu, thetas)
+    assert len(calls) == 1
+
+    # f and sigma8_z are not broadcast, with one update for each value
+    del calls[:]
+    thetas = [{'f':f, 'sigma8_z':s8} for f, s8 in [(0.75, 0.6), (0.78, 0.6), (0.75, 0.62)]]
+    model.power_batch(k, mu, thetas)
+    assert len(calls) == 3
+
+def test_lnprior_batch(driver):
+
+    driver.set_fiducial()
+    theta0 = driver.theory.free_values
+
+    # one out of bounds
+    thetas = np.array([theta0, theta0*1.01, theta0])
+    thetas[-1][0] = np.inf
+
+    lp = driver.theory.lnprior_batch(thetas)
+    assert np.isfinite(lp[:2]).all() and lp[-1] == -np.inf
+    for i in range(2):
+        with driver.theory.preserve(thetas[i]):
+            np.testing.assert_allclose(lp[i], driver.theory.lnprior)
+
+def test_lnprob_batch(driver):
+
+    driver.set_fiducial()
+    theta0 = driver.theory.free_values
+
+    # small scatter around the fiducial values
+    np.random.seed(42)
+    thetas = np.array([theta0*(1 + 1e-3*np.random.randn(len(theta0))) for i in range(4)])
+
+    # one out of bounds
+    thetas[-1][0] = np.inf
+
+    y = np.array([driver.lnprob(t) for t in thetas])
+
+    # the batch does not change the free parameters
+    driver.set_fiducial()
+    x = driver.lnprob_batch(thetas)
+    np.testing.assert_allclose(driver.theory.free_values, theta0)
+    np.testing.assert_allclose(x, y, rtol=1e-6)
@@ -0,0 +1,43 @@
+from pyRSD.rsdfit import FittingDriver, JointFittingDriver
+from pyRSD import data_dir
+import numpy as np
+import pickle
+import pytest
+import os
+
+def test_joint_driver(driver):
+
+    # a second data set, with a copy of the model and its integrals
+    driver.set_fiducial(); driver.chi2()
+    path = os.path.join(data_dir, 'examples', 'params.dat')
+    other = FittingDriver(path, init_model=False)
+    other.model = pickle.loads(pickle.dumps(driver.model))
+    other.set_fiducial()
+
+    joint = JointFittingDriver([driver, other], independent=['b1_cA'], labels=['ngc', 'sgc'])
+    assert joint.Np == driver.Np + 1
+
+    # the copy of the model shares the integrals computed by the first model
+    assert len(joint.integrals_stores) == 1
+    shared = [name for name in driver.model._shared_names if name in driver.model._cache]
+    assert len(shared)
+    for name in shared:
+        assert other.model._cache[name] is driver.model._cache[name]
+
+    assert 'b1_cA_ngc' in joint.free_names and 'b1_cA_sgc' in joint.free_names
+    assert joint.Nb == 2*driver.Nb
+
+    try:
+        # the chi2 is summed, and the shared priors counted once
+        theta = joint.free_values
+        np.testing.assert_allclose(joint.chi2(theta), 2*driver.chi2())
+        lp = driver.lnprior() + driver.theory.fit_params['b1_cA'].lnprior
+        assert joint.lnprior() == pytest.approx(lp)
+
+        # the independent parameters only change one data set
+        theta[joint.free_names.index('b1_cA_sgc')] *= 1.05
+        assert np.isfinite(joint.lnprob(theta))
+        assert other.theory.fit_params['b1_cA'].value != driver.theory.fit_params['b1_cA'].value
+        assert joint.chi2() != pytest.approx(2*driver.chi2())
+    finally:
+        driver.set_fiducial()
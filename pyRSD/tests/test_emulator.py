@@ -0,0 +1,39 @@
+import numpy as np
+from pyRSD.rsdfit.emulator import ModelEmulator, latin_hypercube, polynomial_terms
+
+def model(theta, k):
+    b1, f, sigma = theta.T
+    return (b1[:,None]**2 + 2./3*b1[:,None]*f[:,None] + f[:,None]**2/5.) / (1 + (k*sigma[:,None])**2)
+
+def test_emulator(tmpdir):
+
+    names = ['b1', 'f', 'sigma']
+    lower = np.array([1.5, 0.6, 2.]); upper = np.array([2.5, 0.9, 6.])
+    k = np.linspace(0.01, 0.4, 40)
+
+    # train and validate on independent points
+    thetas = latin_hypercube(lower, upper, 300, seed=42)
+    emulator = ModelEmulator.fit(names, lower, upper, thetas, model(thetas, k), degree=4, key='data')
+
+    held_out = latin_hypercube(lower, upper, 50, seed=43)
+    report = emulator.validate(held_out, model(held_out, k))
+    assert report['max_frac_error'] < 1e-2
+
+    # single and batched evaluations
+    np.testing.assert_allclose(emulator(held_out[0]), emulator(held_out)[0])
+
+    # save and load
+    filename = str(tmpdir.join('emulator.npz'))
+    emulator.to_npz(filename)
+    other = ModelEmulator.from_npz(filename)
+    assert other.is_compatible(names, lower, upper, key='data')
+    assert not other.is_compatible(names, lower, upper, key='other')
+    assert not other.is_compatible(names, lower, 1.1*upper, key='data')
+    assert other.report == emulator.report
+    np.testing.assert_allclose(other(held_out), emulator(held_out))
+
+def test_polynomial_terms():
+
+    terms = polynomial_terms(12, 3)
+    assert len(terms) == 455
+    assert terms.sum(axis=1).max() == 3
@@ -0,0 +1,28 @@
+from . import numpy as np
+
+NMU = 11
+
+def test_bias_basis(driver):
+
+    model = driver.theory.model
+    k = driver.data.combined_k
+    mu = np.linspace(0., 1., NMU)
+
+    # the two-halo terms, for each pair of linear biases
+    terms = []
+    for name in ['Pcc', 'Pcs', 'Pss']:
+        for term in model._Pgal[name].terms:
+            terms += [t for t in term.terms if t.name.endswith('_2h')]
+
+    # evaluate from the bias basis
+    x = [(t(k, mu), t.derivative_k(k, mu), t.derivative_mu(k, mu)) for t in terms]
+
+    # and by setting the biases of the model
+    model.use_bias_basis = False
+    try:
+        for t, xx in zip(terms, x):
+            y = (t(k, mu), t.derivative_k(k, mu), t.derivative_mu(k, mu))
+            for a, b in zip(xx, y):
+                np.testing.assert_allclose(a, b, rtol=1e-6)
+    finally:
+        model.use_bias_basis = True
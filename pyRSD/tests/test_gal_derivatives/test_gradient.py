@@ -0,0 +1,42 @@
+from . import numpy as np
+from pyRSD.rsd.power.gradient import compute, compute_all
+
+NMU = 11
+
+def test_gradient(driver):
+
+    model = driver.theory.model
+    pars = driver.theory.fit_params
+    gradient = driver.theory.pkmu_gradient
+
+    # every free parameter is in the coverage report
+    assert sorted(gradient.coverage) == sorted(pars.free_names)
+    for name in gradient.numerical_names:
+        assert gradient.coverage[name]['method'] == 'numerical'
+    assert 'analytic' in gradient.coverage_report()
+
+    # the (k,mu) pairs
+    k = driver.data.combined_k
+    mu = np.linspace(0., 1., NMU)
+    k, mu = np.broadcast_arrays(k[:, np.newaxis], mu[np.newaxis, :])
+    k = k.ravel(order='F'); mu = mu.ravel(order='F')
+
+    # the single pass matches the derivative of each parameter separately
+    theta = pars.free_values
+    version = model.cache_version
+    x = gradient(k, mu, theta)
+    assert model.cache_version == version
+    for i, name in enumerate(pars.free_names):
+        if name in gradient.numerical_names:
+            continue
+        with model.use_cache():
+            y = compute(gradient.registry, name, model, pars, k, mu)
+        np.testing.assert_allclose(x[i], y, rtol=1e-10)
+
+    # the terms shared between derivatives are evaluated once
+    names = [name for name in pars.free_names if name not in gradient.numerical_names]
+    with model.use_cache() as memo:
+        compute_all(gradient.registry, names, model, pars, k, mu)
+        evaluated = [key[0] for key in memo._data]
+    for name in ['power', 'derivative_k', 'derivative_mu', 'Pgal_cc_no_fog']:
+        assert evaluated.count(name) <= 1
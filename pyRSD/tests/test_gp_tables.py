@@ -0,0 +1,52 @@
+from pyRSD.rsd.simulation import VelocityDispersionFits, NonlinearBiasFits
+import numpy as np
+import pytest
+import os
+
+def test_velocity_dispersion(tmpdir, monkeypatch):
+
+    monkeypatch.setenv('PYRSD_CACHE_DIR', str(tmpdir))
+
+    exact = VelocityDispersionFits()
+    gp = VelocityDispersionFits(use_grid=True, grid_size=50)
+    assert gp.grid_error() < gp.grid_rtol
+
+    # inside the grid, the table agrees with the Gaussian process
+    sigma8s, b1s = gp.grid_axes
+    s8 = np.linspace(sigma8s[0], sigma8s[-1], 10)
+    b1 = np.linspace(b1s[0], b1s[-1], 10)
+    std = np.std(exact.y)
+    np.testing.assert_allclose(gp(sigma8_z=s8, b1=b1), exact(sigma8_z=s8, b1=b1), atol=gp.grid_rtol*std)
+
+    # outside the grid, the Gaussian process is used
+    assert gp(sigma8_z=s8[0], b1=b1s[-1]+0.5) == exact(sigma8_z=s8[0], b1=b1s[-1]+0.5)
+
+    # the table is reloaded from disk
+    assert len(os.listdir(os.path.join(str(tmpdir), 'simulation_fits'))) == 1
+    gp2 = VelocityDispersionFits(use_grid=True, grid_size=50)
+    np.testing.assert_array_equal(gp2.grid_table.values, gp.grid_table.values)
+
+def test_nonlinear_biases(tmpdir, monkeypatch):
+
+    monkeypatch.setenv('PYRSD_CACHE_DIR', str(tmpdir))
+
+    exact = NonlinearBiasFits()
+    gp = NonlinearBiasFits(use_grid=True)
+    b1 = np.linspace(1.2, 3.5, 20)
+    for name in gp.dependents:
+        std = np.std(exact._data[name].y)
+        np.testing.assert_allclose(gp(b1=b1, select=name), exact(b1=b1, select=name), atol=gp._data[name].grid_rtol*std)
+
+    # toggle the tables
+    gp.use_grid = False
+    assert not any(d.use_grid for d in gp._data.values())
+
+def test_biased_spectrum_dependencies():
+
+    from pyRSD.rsd import BiasedSpectrum
+
+    # the predictions of the Gaussian processes are recomputed when toggling the tables
+    deps = BiasedSpectrum.__dict__['use_gp_tables']._deps
+    for name in ['sigmav_halo', 'sigmav_halo_bar', 'b2_00_a', 'b2_01_b', 'stochasticity',
+                 'mu2_model_correction', 'mu4_model_correction', 'bias_pair_spectra']:
+        assert name in deps
@@ -0,0 +1,69 @@
+from pyRSD import pygcl
+from pyRSD.rsd import DarkMatterSpectrum
+from pyRSD.rsd.hzpt import InterpolatedHZPTModels
+from pyRSD.rsd.hzpt.interpolated import compute_zeldovich_tables, evaluate_zeldovich_terms
+import numpy as np
+import pytest
+import os
+
+@pytest.fixture(scope='module')
+def models():
+    cosmo = pygcl.Cosmology("teppei_sims.ini", pygcl.transfers.EH)
+    return InterpolatedHZPTModels(cosmo, 0.8, 0.7)
+
+@pytest.mark.parametrize("pool", ['serial', 'thread', 'process'])
+def test_pools(models, pool):
+
+    base = models._base_zeldovich
+    s8, k = np.linspace(0.5, 0.9, 5), np.logspace(-3, 0, 20)
+    expected = evaluate_zeldovich_terms((base, s8, k))
+
+    tables = compute_zeldovich_tables(base, s8, k, pool=pool, nprocs=2)
+    np.testing.assert_allclose(tables, expected, rtol=1e-12)
+
+    # the terms match the Zel'dovich drivers of the models
+    models._P01._driver.SetSigma8AtZ(s8[2])
+    np.testing.assert_allclose(tables[1,2], models._P01.zeldovich(k), rtol=1e-12)
+    models._P01._driver.SetSigma8AtZ(models.sigma8_z)
+
+def test_disk_cache(models, tmpdir, monkeypatch):
+
+    monkeypatch.setenv('PYRSD_CACHE_DIR', str(tmpdir))
+    grid = {'sigma8_z' : np.linspace(0.5, 0.9, 5), 'k' : np.logspace(-3, 0, 20)}
+
+    # P00 and Phm share the same table
+    table = models.table.__class__(models)
+    table.grid = grid
+    assert table.values.shape == (3, 5, 20)
+    np.testing.assert_array_equal(table['P00'].values, table['Phm'].values)
+
+    # saved to disk, and loaded by a new table
+    assert len(os.listdir(os.path.join(str(tmpdir), 'hzpt_tables'))) == 1
+    other = InterpolatedHZPTModels(models.cosmo, 0.8, 0.7, pool='invalid') # the tables are not recomputed
+    table2 = models.table.__class__(other)
+    table2.grid = grid
+    np.testing.assert_array_equal(table2.values, table.values)
+    assert isinstance(table2.values, np.memmap)
+
+@pytest.mark.parametrize("pool", ['thread', 'process'])
+def test_parallel_tables(models, pool, tmpdir, monkeypatch):
+
+    monkeypatch.setenv('PYRSD_CACHE_DIR', str(tmpdir))
+    grid = {'sigma8_z' : np.linspace(0.5, 0.9, 6), 'k' : np.logspace(-3, 0, 20)}
+
+    # the tables are built with the pool of the models
+    parallel = InterpolatedHZPTModels(models.cosmo, 0.8, 0.7, pool=pool, nprocs=2)
+    parallel.table.grid = grid
+    expected = evaluate_zeldovich_terms((models._base_zeldovich, grid['sigma8_z'], grid['k']))
+    np.testing.assert_allclose(parallel.table.values, expected, rtol=1e-12)
+
+def test_model_pool():
+
+    # the pool is a keyword of the model, passed on to the HZPT models
+    model = DarkMatterSpectrum(transfer_fit='EH', hzpt_pool='process', hzpt_nprocs=2)
+    assert model.hzpt.pool == 'process' and model.hzpt.nprocs == 2
+
+    model.hzpt_pool = 'thread'
+    assert model.hzpt.pool == 'thread'
+    with pytest.raises(ValueError):
+        model.hzpt_pool = 'invalid'
@@ -0,0 +1,55 @@
+import subprocess
+import pytest
+import sys
+import os
+
+# the maximum cumulative time to import pyRSD.rsd, in seconds, which is
+# only tested if set, since it depends on the machine
+IMPORT_BUDGET = os.environ.get('PYRSD_IMPORT_BUDGET', None)
+
+def run(code, importtime=False):
+    """
+    Run ``code`` in a new interpreter, returning the stdout and stderr
+    """
+    cmd = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', code]
+    p = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+    out, err = p.communicate()
+    assert p.returncode == 0, err
+    return out, err
+
+def import_times(module):
+    """
+    The cumulative import time in seconds of each module imported by
+    ``import module``, as reported by ``python -X importtime``
+    """
+    _, err = run("import %s" %module, importtime=True)
+    toret = {}
+    for line in err.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        try:
+            toret[fields[2].strip()] = int(fields[1]) * 1e-6
+        except ValueError: # the header
+            continue
+    return toret
+
+def test_lazy_import():
+
+    # the extension and the models are not loaded
+    times = import_times('pyRSD.rsd')
+    for name in ['pyRSD.gcl', 'pyRSD.pygcl', 'pyRSD.rsd.power.dm']:
+        assert name not in times
+
+@pytest.mark.skipif(IMPORT_BUDGET is None, reason="PYRSD_IMPORT_BUDGET is not set")
+def test_import_time():
+
+    times = import_times('pyRSD.rsd')
+    assert times['pyRSD.rsd'] < float(IMPORT_BUDGET)
+
+def test_deferred_imports():
+
+    code = "import sys; from pyRSD.rsd import DarkMatterSpectrum; "
+    code += "print(' '.join(m for m in ['george', 'sklearn', 'pandas'] if m in sys.modules))"
+    out, _ = run(code)
+    assert out.strip() == ''
@@ -0,0 +1,76 @@
+from pyRSD.rsd._cache import Cache, MemoCache, parameter
+from pyRSD.rsd.tools import cacheable
+import numpy as np
+
+class Model(Cache):
+
+    def __init__(self, a=1.):
+        self.a = a
+        self.ncalls = 0
+
+    @parameter
+    def a(self, val):
+        return val
+
+class Term(object):
+
+    def __init__(self, model):
+        self.model = model
+
+    @cacheable
+    def __call__(self, k, mu):
+        self.model.ncalls += 1
+        return self.model.a * k * mu
+
+def test_memo_cache():
+
+    m = Model(); term = Term(m)
+    k = np.linspace(0.01, 0.4, 100); mu = np.linspace(0., 1., 100)
+
+    # not memoized outside of the context
+    term(k, mu); term(k, mu)
+    assert m.ncalls == 2
+
+    with m.use_cache() as memo:
+
+        # memoized by array identity
+        x = term(k, mu); y = term(k, mu)
+        assert x is y and m.ncalls == 3
+        term(k.copy(), mu)
+        assert m.ncalls == 4
+
+        # changing a parameter changes the cache version
+        version = m.cache_version
+        m.a = 2.
+        assert m.cache_version != version
+        np.testing.assert_allclose(term(k, mu), 2*k*mu)
+        assert m.ncalls == 5
+
+        # setting the same value does not
+        m.a = 2.
+        term(k, mu)
+        assert m.ncalls == 5
+        assert memo.info()['hits'] == 2 and memo.info()['misses'] == 3
+
+        # nested contexts share the memo
+        with m.use_cache() as inner:
+            assert inner is memo
+        assert m._memo is memo
+
+    # the memo is scoped to the model
+    other = Model(); other_term = Term(other)
+    with m.use_cache(), other.use_cache():
+        term(k, mu); other_term(k, mu)
+        assert m.ncalls == 6 and other.ncalls == 1
+
+def test_memo_cache_maxsize():
+
+    memo = MemoCache(maxsize=2)
+    arrays = [np.ones(10)*i for i in range(3)]
+    for a in arrays:
+        memo.evaluate('f', 0, np.sum, a)
+    assert len(memo) == 2
+
+    # the least recently used value was removed
+    memo.evaluate('f', 0, np.sum, arrays[0])
+    assert memo.misses == 4
@@ -0,0 +1,87 @@
+from pyRSD.rsd import tools
+from pyRSD.rsd.tools import LegendreProjection
+from pyRSD.rsd.transfers import MultipoleTransfer
+from scipy.special import eval_legendre
+from scipy.integrate import quad
+import numpy as np
+import pytest
+
+class Model(object):
+    """
+    A Kaiser power spectrum with Gaussian Fingers-of-God damping
+    """
+    def __init__(self, sigma=4.):
+        self.sigma = sigma
+
+    @tools.broadcast_kmu
+    def power(self, k, mu, **kwargs):
+        Plin = k**(-1.5) * np.exp(-k**2)
+        return (1 + 0.8*mu**2)**2 * Plin * np.exp(-(k*mu*self.sigma)**2)
+
+    @tools.monopole
+    def monopole(self, k, mu, **kwargs):
+        return self.power(k, mu, **kwargs)
+
+    @tools.quadrupole
+    def quadrupole(self, k, mu, **kwargs):
+        return self.power(k, mu, **kwargs)
+
+def exact_poles(model, k, ells):
+    toret = np.empty((len(k), len(ells)))
+    for i, kk in enumerate(k):
+        for j, ell in enumerate(ells):
+            f = lambda mu: (2*ell+1)*eval_legendre(ell, mu)*model.power(kk, mu).values[0]
+            toret[i,j] = quad(f, 0., 1.)[0]
+    return toret
+
+def test_polynomial():
+
+    # the integrand is a polynomial of degree 16 in mu, exact with 9 nodes
+    k = np.linspace(0.01, 0.5, 20)
+    ells = [0, 2, 4, 6, 8]
+    coeffs = np.random.uniform(size=(len(k), len(ells)))
+    proj = LegendreProjection(ells, Nmu=9)
+    pkmu = sum(coeffs[:,i,None]*eval_legendre(ell, proj.mu) for i, ell in enumerate(ells))
+    np.testing.assert_allclose(proj(pkmu), coeffs, rtol=1e-12)
+
+    # each row projected onto its own multipole
+    np.testing.assert_allclose(proj.diagonal(pkmu[:len(ells)]), np.diag(coeffs[:len(ells)]), rtol=1e-12)
+
+def test_fog_integrand():
+
+    model = Model()
+    k = np.linspace(0.01, 0.4, 10)
+    ells = [0, 2, 4]
+    exact = exact_poles(model, k, ells)
+
+    # 12 nodes by default
+    t = MultipoleTransfer(k, ells)
+    assert t.Nmu == tools.GAUSS_LEGENDRE_NMU
+    Pell = t(model.power(t.flatk, t.flatmu))
+    assert Pell.dims == ('k', 'ell')
+    np.testing.assert_allclose(Pell.values, exact, rtol=1e-6, atol=1e-8*abs(exact).max())
+
+    # the decorators, including len(k) equal to the number of nodes
+    k = np.linspace(0.01, 0.4, tools.GAUSS_LEGENDRE_NMU)
+    exact = exact_poles(model, k, [0, 2])
+    np.testing.assert_allclose(model.monopole(k), exact[:,0], rtol=1e-6)
+    np.testing.assert_allclose(model.quadrupole(k), exact[:,1], rtol=1e-6)
+
+def test_from_accuracy():
+
+    model = Model(sigma=10.)
+    k = np.linspace(0.01, 0.5, 10)
+    ells = [0, 2, 4]
+    power = lambda mu: model.power(k[:,None], mu[None,:]).values
+
+    proj = LegendreProjection.from_accuracy(power, ells, rtol=1e-8)
+    exact = exact_poles(model, k, ells)
+    scale = abs(power(np.linspace(0, 1, 100))).max(axis=-1)[:,None]
+    assert np.all(abs(proj(power(proj.mu)) - exact) < 1e-6*scale)
+
+    # fewer nodes for a lower accuracy
+    assert LegendreProjection.from_accuracy(power, ells, rtol=1e-3).Nmu < proj.Nmu
+
+    # warn if not converged
+    with pytest.warns(UserWarning):
+        LegendreProjection.from_accuracy(power, ells, rtol=1e-12, Nmax=8)
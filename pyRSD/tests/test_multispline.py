@@ -0,0 +1,47 @@
+from pyRSD.rsd._cache import Cache, parameter, interpolated_function
+from pyRSD.rsd._interpolate import MultiSpline, InterpolationDomainError
+from pyRSD.rsd.tools import RSDSpline
+import numpy as np
+import pytest
+
+class Model(Cache):
+    spline = RSDSpline
+    spline_kwargs = {'bounds_error' : True, 'fill_value' : 0}
+
+    def __init__(self, a=1.):
+        self.a = a
+        self.k = np.logspace(-3, 0, 200)
+
+    @parameter
+    def a(self, val):
+        return val
+
+    @interpolated_function("a", interp="k")
+    def terms(self, k):
+        return (self.a*np.sin(10*k), k**2, np.exp(-k))
+
+def test_multispline():
+
+    m = Model()
+    k = np.random.uniform(1e-3, 1., size=(50, 4))
+
+    # tuples are stored as a single spline
+    m.terms(0.1)
+    assert isinstance(m._cache['terms'].spline, MultiSpline)
+
+    # matches separate splines for each function
+    values = m.terms(k)
+    derivs = m.terms(k, derivative=True)
+    for i, y in enumerate(m.terms(m.k, ignore_cache=True)):
+        spl = RSDSpline(m.k, y)
+        assert values[i].shape == k.shape
+        np.testing.assert_allclose(values[i], spl(k), rtol=1e-10, atol=1e-12)
+        np.testing.assert_allclose(derivs[i], spl.derivative()(k), rtol=1e-8, atol=1e-8)
+
+    # outside the domain
+    with pytest.raises(InterpolationDomainError):
+        m.terms(2.)
+
+    # the spline is recomputed when a parameter changes
+    m.a = 2.
+    np.testing.assert_allclose(m.terms(k)[0], 2*values[0], rtol=1e-10, atol=1e-12)
@@ -0,0 +1,81 @@
+from pyRSD.rsdfit.util import pools
+from pyRSD.rsdfit.util.rsd_parser import rsdfit_parser
+from pyRSD.rsdfit import GlobalFittingDriver
+from pyRSD.rsd import tools
+import numpy as np
+import pytest
+import threading
+
+def square(x):
+    return x**2
+
+@pytest.mark.parametrize("pool_type", ['serial', 'thread', 'process'])
+def test_pool_map(pool_type):
+
+    pool = pools.create_pool(pool_type, nprocs=2)
+    try:
+        assert pool.map(square, range(10)) == [x**2 for x in range(10)]
+    finally:
+        pool.close()
+
+class APModel(object):
+    """
+    A model with the AP effect, whose power waits for the other thread
+    """
+    alpha_perp = 1.0
+    alpha_drag = 1.0
+    barrier = None
+
+    def __init__(self, alpha_par):
+        self.alpha_par = alpha_par
+
+    @tools.alcock_paczynski
+    def power(self, k, mu):
+        if self.barrier is not None:
+            self.barrier.wait(timeout=10)
+        return k**2 * (1 + mu**2)
+
+def test_thread_ap():
+
+    k = np.linspace(0.01, 0.4, 20); mu = np.linspace(0., 1., 20)
+    models = [APModel(0.9), APModel(1.1)]
+    def power(m): return m.power(k, mu)
+
+    serial = pools.create_pool('serial').map(power, models)
+
+    # both threads evaluate the power with the AP effect at the same time
+    APModel.barrier = threading.Barrier(2)
+    pool = pools.create_pool('thread', nprocs=2)
+    try:
+        threaded = pool.map(power, models)
+    finally:
+        pool.close()
+        APModel.barrier = None
+
+    for a, b in zip(threaded, serial):
+        np.testing.assert_allclose(a, b)
+    assert not np.allclose(serial[0], k**2 * (1 + mu**2))
+
+def test_local_driver():
+
+    GlobalFittingDriver.set('global')
+    try:
+        def set_local(): GlobalFittingDriver.set('local', local=True)
+
+        # the driver set by a thread initializer is only seen by that thread
+        pool = pools.create_pool('thread', nprocs=1, initializer=set_local)
+        assert pool.map(lambda x: GlobalFittingDriver.get(), [0]) == ['local']
+        pool.close()
+        assert GlobalFittingDriver.get() == 'global'
+    finally:
+        GlobalFittingDriver.set(None)
+
+def test_parser(tmpdir):
+
+    params = tmpdir.join('params.dat'); params.write('')
+    args = ['nlopt', '-p', str(params), '-i', '10', '-o', str(tmpdir.join('out')), '--pool', 'process']
+    ns = rsdfit_parser().parse_args(args)
+    assert ns.pool_type == 'process' and ns.nprocs is None
+
+    with pytest.raises(SystemExit):
+        rsdfit_parser().parse_args(args[:-1] + ['openmp'])
@@ -0,0 +1,76 @@
+from pyRSD.rsd import tools
+from pyRSD.rsd.power_extrapolator import ExtrapolatedPowerSpectrum, fit_power_law, power_law_extrapolation
+import scipy.optimize as opt
+import numpy as np
+import pytest
+
+class Model(object):
+    """
+    A toy model with a mu-dependent, running power-law slope
+    """
+    kmin, kmax = 1e-3, 1.
+
+    @tools.broadcast_kmu
+    def Pgal(self, k, mu):
+        return (1 + mu**2) * k**(-1.5 + 0.5*mu - 0.3*np.log10(k)) * (1 + 0.01*np.sin(20*k))
+
+def test_fit_power_law():
+
+    x = np.logspace(-0.3, 0, 50)
+    mus = np.linspace(0, 1, 20)
+    amplitude = 1 + mus**2
+    noise = 1 + 0.01*np.sin(50*x)[:,None]
+    alpha, beta = -1.5 + 0.5*mus, -0.3 + 0.1*mus
+    y = amplitude * power_law_extrapolation(x[:,None], alpha, beta) * noise
+
+    # the same best-fit as curve_fit for each column
+    params = fit_power_law(x, y, amplitude)
+    for i in range(len(mus)):
+        f = lambda x, alpha, beta: amplitude[i]*power_law_extrapolation(x, alpha, beta)
+        popt, pcov = opt.curve_fit(f, x, y[:,i])
+        np.testing.assert_allclose(params[i], popt, rtol=1e-6)
+
+    # constant slope
+    params = fit_power_law(x, y[:,0], amplitude[0], fit_beta=False)
+    f = lambda x, alpha: amplitude[0]*power_law_extrapolation(x, alpha)
+    popt, pcov = opt.curve_fit(f, x, y[:,0])
+    assert params.shape == (1, 1)
+    np.testing.assert_allclose(params[0], popt, rtol=1e-6)
+
+def test_fit_power_law_zeros():
+
+    x = np.logspace(-0.3, 0, 50)
+    amplitude = np.array([1., 2.])
+    y = amplitude * power_law_extrapolation(x[:,None], -1.5, -0.3) * (1 + 0.01*np.sin(50*x)[:,None])
+    y[10,0] = 0.
+
+    # zeros are excluded from the starting point, but still fit
+    params = fit_power_law(x, y, amplitude)
+    assert np.all(np.isfinite(params))
+    for i in range(len(amplitude)):
+        f = lambda x, alpha, beta: amplitude[i]*power_law_extrapolation(x, alpha, beta)
+        popt, pcov = opt.curve_fit(f, x, y[:,i])
+        np.testing.assert_allclose(params[i], popt, rtol=1e-3)
+        chi2 = lambda p: ((y[:,i] - f(x, *p))**2).sum()
+        assert chi2(params[i]) <= chi2(popt) * (1 + 1e-10)
+
+def test_extrapolation():
+
+    model = Model()
+    extrap = ExtrapolatedPowerSpectrum(model, k_lo=0.01, k_hi=0.5)
+
+    with tools.raw_output():
+
+        # exact within the range of the model
+        k = np.logspace(-2, np.log10(0.5), 10)
+        mu = np.linspace(0, 1, 5)
+        np.testing.assert_allclose(extrap(k, mu), model.Pgal(k, mu))
+
+        # extrapolated outside, with the running slope at high k
+        alpha, beta = extrap.high_k_params(0.5)
+        assert alpha == pytest.approx(-1.25-0.6*np.log10(0.5), rel=0.05)
+        assert beta == pytest.approx(-0.3, rel=0.05)
+
+        k = np.logspace(-4, 1, 20)
+        assert np.all(np.isfinite(extrap(k, mu)))
+        np.testing.assert_allclose(extrap([0.005, 0.6], 0.5), model.Pgal([0.005, 0.6], 0.5), rtol=0.05)
@@ -0,0 +1,40 @@
+from pyRSD.rsd import DarkMatterSpectrum
+from pyRSD.rsd.pt_expansion import IntegralsEvaluator
+import numpy as np
+import pytest
+
+def test_pt_expansion():
+
+    model = DarkMatterSpectrum(transfer_fit='EH')
+    fiducial = model.params
+    expansion = model.expand_integrals(['Om0', 'n_s'], pool='serial')
+    assert expansion.points.shape == (9, 2)
+
+    # the fiducial point is exact
+    dx = expansion.offset(fiducial)
+    np.testing.assert_allclose(dx, 0.)
+    assert expansion.predict(fiducial) is not None
+
+    # a small change of the cosmology is predicted from the expansion
+    params = fiducial.clone(Om0=1.02*fiducial['Om0'], n_s=0.99*fiducial['n_s'])
+    model.params = params
+    k = model.k_interp
+    exact = IntegralsEvaluator(params.to_class(transfer=model.transfer_fit_int), k)
+    I00 = model._unnormalized_I00(k)
+    np.testing.assert_allclose(I00, exact._unnormalized_I00(k), rtol=1e-3)
+    assert model.integrals_store is None
+
+    # the last prediction is keyed by the parameter values, not the object
+    x = expansion.predict(params)
+    assert expansion.predict(params.clone()) is x
+    assert expansion.predict(fiducial) is not x
+
+    # outside the trust region, or changing other parameters, recomputes the integrals
+    assert expansion.predict(fiducial.clone(Om0=1.2*fiducial['Om0'])) is None
+    assert expansion.predict(fiducial.clone(h=0.65)) is None
+
+def test_expansion_errors():
+
+    model = DarkMatterSpectrum(transfer_fit='EH')
+    with pytest.raises(ValueError):
+        model.expand_integrals(['Om0'], steps=[-0.01], pool='serial')
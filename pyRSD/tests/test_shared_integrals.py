@@ -0,0 +1,60 @@
+from pyRSD.rsd import DarkMatterSpectrum
+from pyRSD.rsd.pt_integrals import PTIntegralsStore
+import numpy as np
+import pickle
+import gc
+
+def test_shared_integrals():
+
+    m1 = DarkMatterSpectrum(z=0.5, transfer_fit='EH')
+    m2 = DarkMatterSpectrum(z=1.0, transfer_fit='EH')
+    k = np.logspace(-2, np.log10(0.4), 20)
+
+    # the integrals are computed once, and normalized by each model
+    np.testing.assert_allclose(m1.I00(k)/m1._power_norm**2, m2.I00(k)/m2._power_norm**2)
+    assert m1._Imn is m2._Imn
+    assert m1.integrals_store is m2.integrals_store
+    store = m1.integrals_store
+    assert store.refcount == 2
+
+    # pickled models hold their own copy
+    m3 = pickle.loads(pickle.dumps(m2))
+    np.testing.assert_allclose(m3.I00(k), m2.I00(k))
+    assert m3.integrals_store is None
+
+    # a different linear power spectrum uses a different store
+    m2.params = m2.params.clone(h=0.65)
+    assert m2.I00(k).shape == k.shape
+    assert m2.integrals_store is not store
+    assert store.refcount == 1
+
+    # released when the models are deleted
+    del m1, m2, m3
+    gc.collect()
+    assert store.refcount == 0
+    assert store not in PTIntegralsStore.active()
+
+def test_no_sharing():
+
+    m1 = DarkMatterSpectrum(transfer_fit='EH')
+    m2 = DarkMatterSpectrum(transfer_fit='EH')
+    m2.share_integrals = False
+    m1.P00.mu0(0.1)
+    m2.P00.mu0(0.1)
+    assert m1._Jmn is not m2._Jmn
+    assert m2.integrals_store is None
+
+def test_integrals_key(monkeypatch):
+
+    from pyRSD.rsd import pt_integrals
+
+    m1 = DarkMatterSpectrum(z=0.5, transfer_fit='EH')
+    m2 = DarkMatterSpectrum(z=1.0, transfer_fit='EH')
+    key = m1._pt_integrals_key
+    assert m2._pt_integrals_key == key
+
+    # the key depends on the integration settings
+    epsrel = dict(pt_integrals.INTEGRALS_EPSREL, Imn=1e-5)
+    monkeypatch.setattr(pt_integrals, 'INTEGRALS_EPSREL', epsrel)
+    del m2.power_lin
+    assert m2._pt_integrals_key != key
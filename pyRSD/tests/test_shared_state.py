@@ -0,0 +1,44 @@
+from pyRSD.rsdfit.util import shared_state
+import numpy as np
+import pickle
+
+def test_shared_state():
+
+    k = np.linspace(0.01, 0.4, 1000)
+    mu = np.linspace(0., 1., 1000)
+
+    try:
+        # without a communicator, the arrays are only registered
+        shared = shared_state.share(None, {'k':k, 'mu':mu})
+        np.testing.assert_array_equal(shared['k'], k)
+
+        # the arrays can be computed by the first rank only
+        shared = shared_state.share(None, {'mu2':lambda: mu**2})
+        np.testing.assert_array_equal(shared['mu2'], mu**2)
+
+        # the handle pickles without the array
+        k2 = k.copy()
+        h = shared_state.handle(k2)
+        assert isinstance(h, shared_state.SharedArray)
+
+        # the key of an array is only computed once
+        assert shared_state.handle(k2).key == h.key
+        assert len(shared_state._handles) == 1
+        s = pickle.dumps(h)
+        assert len(s) < 200
+        np.testing.assert_array_equal(shared_state.resolve(pickle.loads(s)), k)
+
+        # arrays not in the shared state are passed through
+        x = np.ones(10)
+        assert shared_state.handle(x) is x
+        assert shared_state.resolve(x) is x
+    finally:
+        shared_state.clear()
+
+    # handles can no longer be resolved
+    try:
+        h.resolve()
+    except RuntimeError:
+        pass
+    else:
+        assert False
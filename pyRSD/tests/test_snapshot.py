@@ -0,0 +1,111 @@
+from pyRSD.rsd import DarkMatterSpectrum, GalaxySpectrum, QuasarSpectrum, load_model
+from pyRSD.rsd import snapshot
+from pyRSD import pygcl
+import numpy as np
+import json
+import os
+import pytest
+
+def test_encode_decode():
+
+    arrays = {}
+    def save(value):
+        name = 'array_%d' %len(arrays)
+        arrays[name] = np.asarray(value)
+        return {'__array__': name}
+
+    value = {'a':1, 'b':[0.5, None, 'x'], 'c':(1, 2), 'd':np.linspace(0., 1., 5), 'e':np.float64(2.)}
+    encoded = json.loads(json.dumps(snapshot.encode(value, save)))
+    decoded = snapshot.decode(encoded, arrays.__getitem__)
+
+    assert decoded['a'] == 1 and decoded['b'] == [0.5, None, 'x']
+    assert decoded['c'] == (1, 2) and decoded['e'] == 2.
+    np.testing.assert_array_equal(decoded['d'], value['d'])
+
+    with pytest.raises(TypeError):
+        snapshot.encode(object(), save)
+
+def test_snapshot(tmpdir):
+
+    model = DarkMatterSpectrum(transfer_fit='EH')
+    k = np.logspace(-2, np.log10(0.3), 20)
+    P00 = model.P_mu0(k)
+
+    path = str(tmpdir.join('model.snapshot'))
+    model.to_snapshot(path)
+    assert snapshot.is_snapshot(path)
+
+    # the loaded model does not recompute the linear power
+    loaded = load_model(path)
+    assert isinstance(loaded, DarkMatterSpectrum)
+    assert 'cosmo' not in loaded._cache
+    np.testing.assert_allclose(loaded.P_mu0(k), P00, rtol=1e-4)
+    assert loaded._cache['power_lin']._gcl is None
+
+    # the gcl objects are rebuilt when needed by the integrals
+    np.testing.assert_allclose(loaded._Jmn(k, 0, 0), model._Jmn(k, 0, 0), rtol=1e-6)
+    np.testing.assert_allclose(loaded._Imn1Loop_vvdd(k, 0, 0), model._Imn1Loop_vvdd(k, 0, 0), rtol=1e-6)
+    assert isinstance(loaded._cache['power_lin'].gcl, pygcl.LinearPS)
+
+    # changing a parameter recomputes the model, without the cosmology
+    loaded.sigma8_z = 0.9*model.sigma8_z
+    model.sigma8_z = 0.9*model.sigma8_z
+    np.testing.assert_allclose(loaded.P_mu0(k), model.P_mu0(k), rtol=1e-4)
+    assert 'cosmo' not in loaded._cache
+    loaded.f = 0.9*model.f
+    model.f = 0.9*model.f
+    np.testing.assert_allclose(loaded.P_mu2(k), model.P_mu2(k), rtol=1e-4)
+    assert 'cosmo' not in loaded._cache
+
+@pytest.mark.parametrize("cls", [GalaxySpectrum, QuasarSpectrum])
+def test_snapshot_tracers(cls, tmpdir):
+
+    model = cls(transfer_fit='EH')
+    k = np.logspace(-2, np.log10(0.3), 20)
+    Pkmu = model.power(k, 0.5)
+
+    path = str(tmpdir.join('model.snapshot'))
+    model.to_snapshot(path)
+
+    # the derived attributes are rebuilt for the loaded model
+    loaded = cls.from_snapshot(path)
+    for name in cls._derived_attributes:
+        assert getattr(loaded, name).model is loaded
+    np.testing.assert_allclose(loaded.power(k, 0.5), Pkmu, rtol=1e-4)
+
+    loaded.sigma8_z = 0.9*model.sigma8_z
+    model.sigma8_z = 0.9*model.sigma8_z
+    np.testing.assert_allclose(loaded.power(k, 0.5), model.power(k, 0.5), rtol=1e-4)
+
+def test_snapshot_overwrite(tmpdir):
+
+    model = DarkMatterSpectrum(transfer_fit='EH')
+    path = str(tmpdir.join('model.snapshot'))
+    model.to_snapshot(path)
+    stale = os.path.join(path, 'array_9999.npy')
+    np.save(stale, np.zeros(1))
+
+    # a new snapshot replaces the whole directory
+    model.to_snapshot(path)
+    assert not os.path.exists(stale)
+    assert os.listdir(str(tmpdir)) == ['model.snapshot']
+
+    # other directories are not overwritten
+    other = tmpdir.mkdir('other')
+    other.join('data.txt').write('data')
+    with pytest.raises(ValueError):
+        model.to_snapshot(str(other))
+
+def test_snapshot_version(tmpdir):
+
+    model = DarkMatterSpectrum(transfer_fit='EH')
+    path = str(tmpdir.join('model.snapshot'))
+    model.to_snapshot(path)
+
+    filename = os.path.join(path, snapshot.SNAPSHOT_FILE)
+    meta = json.load(open(filename))
+    meta['format_version'] = snapshot.FORMAT_VERSION + 1
+    json.dump(meta, open(filename, 'w'))
+
+    with pytest.raises(ValueError):
+        DarkMatterSpectrum.from_snapshot(path)
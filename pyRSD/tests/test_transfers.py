@@ -0,0 +1,93 @@
+from . import data_dir, os
+from pyRSD.rsd.transfers import PkmuGrid, GriddedMultipoleTransfer, GriddedWedgeTransfer, MultipoleTransfer
+import numpy as np
+
+def test_gridded_multipole_apply_flat():
+
+    filename = os.path.join(data_dir, 'examples', 'runPB_pkmu_grid.dat')
+    grid = PkmuGrid.from_plaintext(filename)
+
+    ells = [0, 2, 4]
+    transfer = GriddedMultipoleTransfer(grid, ells, kmin=0.01, kmax=[0.4, 0.3, 0.2])
+    P = np.random.random(size=grid.notnull.sum())
+
+    def expected():
+        r = transfer(P)
+        return np.concatenate([r.sel(ell=ell).values[r.sel(ell=ell).notnull()] for ell in ells])
+
+    # the sparse projection matches the DataArray result
+    np.testing.assert_allclose(transfer.apply_flat(P), expected())
+
+    # a batch of power spectra is projected at once
+    batch = transfer.apply_flat(np.array([P, 2*P]))
+    np.testing.assert_allclose(batch[1], 2*expected())
+
+    # the projection is rebuilt when the k range changes
+    transfer.kmax = 0.25
+    np.testing.assert_allclose(transfer.apply_flat(P), expected())
+
+def test_gridded_wedge_apply_flat():
+
+    filename = os.path.join(data_dir, 'examples', 'runPB_pkmu_grid.dat')
+    grid = PkmuGrid.from_plaintext(filename)
+
+    mu_bounds = [(0., 0.2), (0.2, 0.4), (0.4, 0.6), (0.6, 0.8), (0.8, 1.0)]
+    transfer = GriddedWedgeTransfer(grid, mu_bounds, kmin=0.01, kmax=0.3)
+    P = np.random.random(size=grid.notnull.sum())
+
+    # the sparse projection matches the DataArray result
+    r = transfer(P)
+    expected = np.concatenate([r.values[:,i][r.notnull().values[:,i]] for i in range(len(mu_bounds))])
+    np.testing.assert_allclose(transfer.apply_flat(P), expected)
+    np.testing.assert_allclose(transfer.apply_flat(np.array([P, 2*P]))[1], 2*expected)
+
+def test_multipole_apply_flat():
+
+    k = np.linspace(0.01, 0.3, 20)
+    transfer = MultipoleTransfer(k, [0, 2, 4])
+
+    k, mu = transfer.flatk, transfer.flatmu
+    P = 1e4*(k/0.02)/(1+(k/0.02)**2.5) * (1 + 0.8*mu**2)**2
+
+    # the batched projection matches the DataArray result
+    expected = transfer(P).values
+    np.testing.assert_allclose(transfer.apply_flat(P), expected)
+    np.testing.assert_allclose(transfer.apply_flat(np.array([P, 2*P]))[1], 2*expected)
+
+def test_window_convolution_matrix(tmpdir, monkeypatch):
+
+    from pyRSD.rsd.transfers import WindowFunctionTransfer
+    monkeypatch.setenv('PYRSD_CACHE_DIR', str(tmpdir))
+
+    # a smooth window function
+    s = np.logspace(-1, 3.5, 500)
+    W = [np.exp(-s/1000.), 0.1*np.exp(-s/500.), 0.05*np.exp(-s/300.),
+         0.01*np.exp(-s/200.), 0.005*np.exp(-s/100)]
+    window = np.column_stack([s] + W)
+
+    # make sure the full grid is within the k range
+    transfer = WindowFunctionTransfer(window, [0, 2, 4], Nk=256, use_matrix=True)
+    transfer.kmin = 0.99e-4; transfer.kmax = 0.71
+
+    k, mu = transfer.grid.k, transfer.grid.mu
+    P = 1e4*(k/0.02)/(1+(k/0.02)**2.5) * (1 + 0.8*mu**2)**2
+    P = P[transfer.grid.notnull]
+
+    # the matrix result matches the FFTLog result
+    k_out = np.linspace(0.01, 0.3, 30)
+    expected = transfer(P, k_out=k_out).values
+    np.testing.assert_allclose(transfer.apply_flat(P, k_out), expected, rtol=1e-8, atol=1e-8*abs(expected).max())
+    batch = transfer.apply_flat(np.array([P, 2*P]), k_out)
+    np.testing.assert_allclose(batch[1], 2*expected, rtol=1e-8, atol=1e-8*abs(expected).max())
+
+    # the matrix is reloaded from disk
+    transfer._matrices.clear()
+    np.testing.assert_allclose(transfer.apply_flat(P, k_out), expected, rtol=1e-8, atol=1e-8*abs(expected).max())
+    assert len(os.listdir(os.path.join(str(tmpdir), 'window_matrices'))) == 1
+
+    # the stored matrices are only invalidated when the inputs change
+    matrices = transfer._matrices
+    transfer.use_matrix = True
+    assert transfer._matrices is matrices
+    transfer.kmax = 0.7
+    assert transfer._matrices is not matrices
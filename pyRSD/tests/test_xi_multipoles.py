@@ -0,0 +1,51 @@
+from pyRSD.rsd.correlation import XiMultipoleTransform
+from scipy.special import spherical_jn
+import numpy as np
+import pytest
+
+ells = [0, 2, 4]
+
+def power(k, ell):
+    return (1 + ell) * k**0.5 * np.exp(-k**2) / (1 + k**2)
+
+def exact_xi(r, ell, R):
+    k = np.logspace(-5, 1, 200000)
+    dk = np.diff(k)
+    def f(r):
+        integrand = k**2*power(k, ell)*np.exp(-(k*R)**2)*spherical_jn(ell, k*r)
+        return np.sum(0.5*dk*(integrand[1:] + integrand[:-1]))
+    return (-1)**(ell//2) * np.array([f(rr) for rr in r]) / (2*np.pi**2)
+
+@pytest.mark.parametrize("R", [0., 2.])
+def test_quadrature(R):
+
+    k = np.logspace(-5, 1, 1000)
+    r = np.linspace(10, 150, 20)
+    Pell = np.column_stack([power(k, ell) for ell in ells])
+
+    xi = XiMultipoleTransform(k, ells, r=r, R=R)(Pell)
+    assert xi.shape == (len(r), len(ells))
+    for i, ell in enumerate(ells):
+        expected = exact_xi(r, ell, R)
+        np.testing.assert_allclose(xi[:,i], expected, atol=1e-6*abs(expected).max())
+
+def test_batched():
+
+    k = np.logspace(-5, 1, 1000)
+    r = np.linspace(10, 150, 20)
+    Pell = np.column_stack([power(k, ell) for ell in ells])
+
+    # a stack of models and smoothing radii in one call
+    R = [0., 2., 5.]
+    stack = np.stack([Pell, 2*Pell, Pell**2])
+    xi = XiMultipoleTransform(k, ells, r=r, R=R)(stack)
+    assert xi.shape == (3, len(R), len(r), len(ells))
+    for i in range(len(stack)):
+        for j in range(len(R)):
+            np.testing.assert_allclose(xi[i,j], XiMultipoleTransform(k, ells, r=r, R=R[j])(stack[i]))
+
+    # wrong shape, or r out of range
+    with pytest.raises(ValueError):
+        XiMultipoleTransform(k, ells, r=r)(Pell[:,:2])
+    with pytest.raises(ValueError):
+        XiMultipoleTransform(k, ells, r=[1e-3])
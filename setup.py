@@ -89,6 +89,24 @@ def find_version(path):
         return version_match.group(1)
     raise RuntimeError("Version not found")
 
+def write_githash(path='pyRSD/rsd/_githash.py'):
+    """
+    Write the git hash of the source tree, which is part of the RSD model
+    version, such that it is not computed when importing the package
+    """
+    try:
+        output = subprocess.check_output(['git', 'rev-parse', 'HEAD'],
+                                         cwd=package_basedir, stderr=subprocess.STDOUT)
+        githash = output.decode().strip()[:7]
+    except (OSError, subprocess.CalledProcessError):
+        # keep the hash of a source distribution
+        if os.path.exists(path):
+            return
+        githash = ''
+
+    with open(path, 'w') as ff:
+        ff.write("# this file is generated by setup.py\ngithash = '%s'\n" %githash)
+
 class build_external_clib(build_clib):
     """
     Custom command to build CLASS first, and then GCL library
@@ -170,6 +188,7 @@ class custom_clean(clean):
         # remove the CLASS tmp directories
         os.system("rm -rf depends/tmp*")
         os.system("rm -f pyRSD/*.so*")
+        os.system("rm -f pyRSD/rsd/_githash.py")
 
         # remove build directory
         if os.path.exists('build'):
@@ -254,6 +273,7 @@ pkg_data = ['data/dark_matter/pkmu_P*',
 if __name__ == '__main__':
 
     from numpy.distutils.core import setup
+    write_githash()
     setup(name=DISTNAME,
           version=find_version("pyRSD/version.py"),
           description=DESCRIPTION,